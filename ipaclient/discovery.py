@@ -19,8 +19,10 @@
 
 from __future__ import absolute_import
 
+import concurrent.futures
 import logging
 import socket
+import threading
 
 import six
 
@@ -56,6 +58,9 @@ UNKNOWN_ERROR = -15
 
 IPA_BASEDN_INFO = 'ipa v2.0'
 
+# maximum number of concurrent DNS queries and LDAP server checks
+MAX_DISCOVERY_WORKERS = 8
+
 error_names = {
     SUCCESS: 'Success',
     NOT_FQDN: 'NOT_FQDN',
@@ -111,6 +116,44 @@ def get_ipa_basedn(conn):
     return None
 
 
+class _DiscoveryExecutor:
+    """
+    Run DNS lookups and LDAP server checks concurrently in daemon threads.
+
+    Unlike concurrent.futures.ThreadPoolExecutor, the interpreter does not
+    wait at exit for calls whose results are not needed anymore, e.g. LDAP
+    checks of unreachable servers which have not timed out yet.
+    """
+    def __init__(self, max_workers):
+        self._semaphore = threading.BoundedSemaphore(max_workers)
+        self._futures = []
+
+    def submit(self, fn, *args, **kwargs):
+        future = concurrent.futures.Future()
+        self._futures.append(future)
+        thread = threading.Thread(
+            target=self._run, args=(future, fn, args, kwargs))
+        thread.daemon = True
+        thread.start()
+        return future
+
+    def _run(self, future, fn, args, kwargs):
+        with self._semaphore:
+            if not future.set_running_or_notify_cancel():
+                return
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+    def shutdown(self):
+        """Cancel the calls which have not started yet"""
+        for future in self._futures:
+            future.cancel()
+
+
 class IPADiscovery:
 
     def __init__(self):
@@ -178,27 +221,85 @@ class IPADiscovery:
         :param tried: A set of domains that were tried already
         :param reason: Reason this domain is searched (included in the log)
         """
-        servers = None
-        logger.debug('Start searching for LDAP SRV record in "%s" (%s) '
-                     'and its sub-domains', domain, reason)
-        while not servers:
-            if domain in tried:
-                logger.debug("Already searched %s; skipping", domain)
-                break
-            tried.add(domain)
+        executor = _DiscoveryExecutor(MAX_DISCOVERY_WORKERS)
+        try:
+            found = self._discover_domain(
+                [(domain, reason)], executor, tried=tried, kerberos=False)
+        finally:
+            executor.shutdown()
+        if found is None:
+            return None, None
+        return found[0], found[1]
+
+    def _candidate_domains(self, domains, tried=None):
+        """
+        Get the given domains and all their parent domains, in order.
 
-            servers = self.ipadns_search_srv(domain, '_ldap._tcp', 389,
-                                             break_on_first=False)
-            if servers:
-                return (servers, domain)
-            else:
+        :param domains: list of (domain, reason) pairs
+        :param tried: set of domains which were searched already, the
+                      candidates are added to it
+        :returns: list of (domain, reason) pairs including all parent
+                  domains
+        """
+        candidates = []
+        if tried is None:
+            tried = set()
+        for domain, reason in domains:
+            # Domain name should not be single-label
+            try:
+                validate_domain_name(domain)
+            except ValueError as e:
+                logger.debug("Skipping invalid domain '%s' (%s)", domain, e)
+                continue
+            while domain not in tried:
+                tried.add(domain)
+                candidates.append((domain, reason))
                 p = domain.find(".")
                 if p == -1:
-                    # no ldap server found and last component of the domain
-                    # already tested
-                    return None, None
+                    break
                 domain = domain[p + 1:]
-        return None, None
+        return candidates
+
+    def _discover_domain(self, domains, executor, tried=None,
+                         kerberos=True):
+        """
+        Search all candidate domains for LDAP SRV records concurrently.
+
+        Unless kerberos is False, Kerberos TXT and KDC SRV records of every
+        candidate domain are looked up at the same time, so they are already
+        resolved when the domain is chosen.
+
+        Returns a tuple (servers, domain, reason, realm_future, kdc_future)
+        for the first domain in order with LDAP SRV records, or None.
+        """
+        candidates = self._candidate_domains(domains, tried)
+        logger.debug('Searching for LDAP SRV records in %s',
+                     ', '.join(domain for domain, _reason in candidates))
+        futures = []
+        for domain, reason in candidates:
+            ldap_future = executor.submit(
+                self.ipadns_search_srv, domain, '_ldap._tcp', 389,
+                break_on_first=False)
+            if kerberos:
+                realm_future = executor.submit(
+                    self.ipadnssearchkrbrealm, domain)
+                kdc_future = executor.submit(self.ipadnssearchkrbkdc, domain)
+            else:
+                realm_future = kdc_future = None
+            futures.append(
+                (domain, reason, ldap_future, realm_future, kdc_future))
+        for i, (domain, reason, ldap_future, realm_future,
+                kdc_future) in enumerate(futures):
+            servers = ldap_future.result()
+            if servers:
+                # lookups in the other domains are not needed anymore
+                for j, pending in enumerate(futures):
+                    if j != i:
+                        for future in pending[2:]:
+                            if future is not None:
+                                future.cancel()
+                return servers, domain, reason, realm_future, kdc_future
+        return None
 
     def search(self, domain="", servers="", realm=None, hostname=None,
                ca_cert_path=None):
@@ -216,7 +317,19 @@ class IPADiscovery:
             domain, servers, hostname)
 
         self.server = None
+
+        executor = _DiscoveryExecutor(MAX_DISCOVERY_WORKERS)
+        try:
+            return self._search(domain, servers, realm, hostname,
+                                ca_cert_path, executor)
+        finally:
+            # lookups and checks which are not needed anymore
+            executor.shutdown()
+
+    def _search(self, domain, servers, realm, hostname, ca_cert_path,
+                executor):
         autodiscovered = False
+        realm_future = kdc_future = None
 
         if not servers:
             if not domain:  # domain not provided do full DNS discovery
@@ -243,23 +356,14 @@ class IPADiscovery:
                 # not first. We could end up with the wrong SRV record.
                 domains = self.__get_resolver_domains()
                 domains = [(domain, 'domain of the hostname')] + domains
-                tried = set()
-                for domain, reason in domains:
-                    # Domain name should not be single-label
-                    try:
-                        validate_domain_name(domain)
-                    except ValueError as e:
-                        logger.debug("Skipping invalid domain '%s' (%s)",
-                                     domain, e)
-                        continue
-                    servers, domain = self.check_domain(domain, tried, reason)
-                    if servers:
-                        autodiscovered = True
-                        self.domain = domain
-                        self.server_source = self.domain_source = (
-                            'Discovered LDAP SRV records from %s (%s)' %
-                            (domain, reason))
-                        break
+                found = self._discover_domain(domains, executor)
+                if found is not None:
+                    servers, domain, reason, realm_future, kdc_future = found
+                    autodiscovered = True
+                    self.domain = domain
+                    self.server_source = self.domain_source = (
+                        'Discovered LDAP SRV records from %s (%s)' %
+                        (domain, reason))
                 if not self.domain:  # no ldap server found
                     logger.debug('No LDAP server found')
                     return NO_LDAP_SERVER
@@ -290,7 +394,10 @@ class IPADiscovery:
             self.realm = realm
             self.realm_source = 'Forced'
         else:
-            realm = self.ipadnssearchkrbrealm()
+            if realm_future is not None:
+                realm = realm_future.result()
+            else:
+                realm = self.ipadnssearchkrbrealm()
             self.realm = realm
             self.realm_source = (
                 'Discovered Kerberos DNS records from %s' % self.domain)
@@ -299,7 +406,10 @@ class IPADiscovery:
             return REALM_NOT_FOUND
 
         if autodiscovered:
-            self.kdc = self.ipadnssearchkrbkdc()
+            if kdc_future is not None:
+                self.kdc = kdc_future.result()
+            else:
+                self.kdc = self.ipadnssearchkrbkdc()
             self.kdc_source = (
                 'Discovered Kerberos DNS records from %s' % self.domain)
         else:
@@ -312,13 +422,20 @@ class IPADiscovery:
         ldapaccess = True
         logger.debug("[LDAP server check]")
         valid_servers = []
-        for server in servers:
+        # check all servers concurrently, but evaluate the results in the
+        # priority and weight order of the SRV records
+        checks = [
+            (server, executor.submit(
+                self._check_ldap, server, self.realm, ca_cert_path))
+            for server in servers
+        ]
+        for server, check in checks:
             logger.debug('Verifying that %s (realm %s) is an IPA server',
                          server, self.realm)
             # check ldap now
-            ldapret = self.ipacheckldap(
-                server, self.realm, ca_cert_path=ca_cert_path
-            )
+            ldapret, basedn = check.result()
+            if basedn is not None:
+                self.basedn, self.basedn_source = basedn
 
             if ldapret[0] == SUCCESS:
                 # Make sure that realm is not single-label
@@ -339,6 +456,7 @@ class IPADiscovery:
                     if autodiscovered:
                         # No need to keep verifying servers if we discovered
                         # them via DNS
+                        self._cancel_checks(checks)
                         break
             elif ldapret[0] in (NO_ACCESS_TO_LDAP, NO_TLS_LDAP,
                                 PYTHON_LDAP_NOT_INSTALLED):
@@ -348,6 +466,7 @@ class IPADiscovery:
                 if autodiscovered:
                     # No need to keep verifying servers if we discovered them
                     # via DNS
+                    self._cancel_checks(checks)
                     break
             elif ldapret[0] == NOT_IPA_SERVER:
                 logger.warning(
@@ -396,6 +515,10 @@ class IPADiscovery:
 
         return ldapret[0]
 
+    def _cancel_checks(self, checks):
+        for _server, check in checks:
+            check.cancel()
+
     def ipacheckldap(self, thost, trealm, ca_cert_path=None):
         """
         Given a host and kerberos realm verify that it is an IPA LDAP
@@ -406,6 +529,23 @@ class IPADiscovery:
             0 means all ok
             negative number means something went wrong
         """
+        ldapret, basedn = self._check_ldap(thost, trealm, ca_cert_path)
+        if basedn is not None:
+            self.basedn, self.basedn_source = basedn
+        return ldapret
+
+    def _check_ldap(self, thost, trealm, ca_cert_path=None):
+        """
+        Thread-safe implementation of ipacheckldap().
+
+        Returns a tuple (ldapret, basedn) where basedn is a tuple
+        (basedn, basedn_source) if the IPA base DN was found, None otherwise.
+        """
+        found = []
+        ldapret = self._ipacheckldap(thost, trealm, ca_cert_path, found)
+        return ldapret, (found[0] if found else None)
+
+    def _ipacheckldap(self, thost, trealm, ca_cert_path, found):
         if ipaldap is None:
             return [PYTHON_LDAP_NOT_INSTALLED]
 
@@ -446,16 +586,15 @@ class IPADiscovery:
                 logger.debug("The server is not an IPA server")
                 return [NOT_IPA_SERVER]
 
-            self.basedn = basedn
-            self.basedn_source = 'From IPA server %s' % lh.ldap_uri
+            found.append((basedn, 'From IPA server %s' % lh.ldap_uri))
 
             # search and return known realms
             logger.debug(
                 "Search for (objectClass=krbRealmContainer) in %s (sub)",
-                self.basedn)
+                basedn)
             try:
                 lret = lh.get_entries(
-                    DN(('cn', 'kerberos'), self.basedn),
+                    DN(('cn', 'kerberos'), basedn),
                     lh.SCOPE_SUBTREE, "(objectClass=krbRealmContainer)")
             except errors.NotFound:
                 # something very wrong
@@ -117,14 +117,26 @@ class ClientMethod(ClientCommand, Method):
 class CommandOverride(Command):
     def __init__(self, api):
         super(CommandOverride, self).__init__(api)
-
-        next_class = self.__get_next()
-        self.next = next_class(api)
+        self.__next = None
 
     @classmethod
     def __get_next(cls):
         return api.get_plugin_next(cls)
 
+    @classmethod
+    def _get_next_class(cls):
+        return cls.__get_next()
+
+    @property
+    def next(self):
+        # The overridden plugin is constructed on first use. For schema
+        # plugins this means building the whole class with its params, which
+        # is not necessary just to list the plugin.
+        if self.__next is None:
+            next_class = self.__get_next()
+            self.__next = next_class(self.api)
+        return self.__next
+
     @classmethod
     def __doc_getter(cls):
         return cls.__get_next().doc
@@ -188,6 +200,10 @@ class CommandOverride(Command):
 class MethodOverride(CommandOverride, Method):
     @property
     def obj_name(self):
+        # Schema plugins know the object name without being constructed.
+        obj_name = getattr(self._get_next_class(), 'obj_name', None)
+        if not isinstance(obj_name, property):
+            return obj_name
         try:
             return self.next.obj_name
         except AttributeError:
@@ -50,4 +50,23 @@ class topologysuffix_verify(MethodOverride):
                 for replica in err[1]:
                     textui.print_indented(replica, 2)
 
+        # servers older than API 2.242 do not report path lengths
+        if output['result'].get('path_lengths'):
+            textui.print_dashed(unicode(_('Replication path lengths')))
+            textui.print_attribute(
+                unicode(_("Longest replication path (hops)")),
+                [output['result']['max_hops']]
+            )
+            for srv, hops in output['result']['path_lengths']:
+                msg = _('Server "%(srv)s": %(n)d hops to the most distant '
+                        'server')
+                textui.print_indented(msg % {'srv': srv, 'n': hops})
+
+        single_points = output['result'].get('single_points_of_failure')
+        if single_points:
+            textui.print_dashed(unicode(_('Removal of these servers would '
+                                          'disconnect the topology')))
+            for srv in single_points:
+                textui.print_indented(srv)
+
         return 0
@@ -5,11 +5,13 @@
 import errno
 import json
 import logging
+import mmap
 import os
+import struct
 import sys
 import tempfile
 import types
-import zipfile
+import zlib
 
 from cryptography import x509 as crypto_x509
 
@@ -36,7 +38,14 @@ else:
 
 logger = logging.getLogger(__name__)
 
-FORMAT = '1'
+FORMAT = '3'
+
+# Schema cache file layout: magic, length of the index, JSON index and
+# separately compressed JSON members. The index maps every namespace member
+# to the offset and length of its data, so that the file can be mapped into
+# memory and members decoded only when they are used.
+_MAGIC = b'IPASCHEMA\n'
+_INDEX_LEN = struct.Struct('!I')
 
 if six.PY3:
     unicode = str
@@ -264,6 +273,14 @@ class _SchemaCommandPlugin(_SchemaPlugin):
             halp = self._schema[self.schema_key].get_help(self.full_name)
             return 'cli' in halp.get('exclude', [])
 
+    @property
+    def obj_name(self):
+        halp = self._schema[self.schema_key].get_help(self.full_name)
+        try:
+            return str(halp['obj_class']).partition('/')[0]
+        except KeyError:
+            return None
+
     def _create_output(self, api, schema):
         if schema.get('multivalue', False):
             type_type = (tuple, list)
@@ -379,6 +396,8 @@ class Schema:
         self._dict = {}
         self._namespaces = {}
         self._help = None
+        self._data = None
+        self._data_start = 0
 
         for ns in self.namespaces:
             self._dict[ns] = {}
@@ -444,16 +463,35 @@ class Schema:
         return (fp, ttl,)
 
     def _read_schema(self, fingerprint):
-        # It's more efficient to read zip file members at once than to open
-        # the zip file a couple of times, see #6690.
+        # Only the index is decoded here, see _read_member().
         filename = os.path.join(self._DIR, fingerprint)
-        with zipfile.ZipFile(filename, 'r') as schema:
-            for name in schema.namelist():
-                ns, _slash, key = name.partition('/')
-                if ns in self.namespaces:
-                    self._dict[ns][key] = schema.read(name)
-                elif name == '_help':
-                    self._help = schema.read(name)
+        with open(filename, 'rb') as f:
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        try:
+            if data[:len(_MAGIC)] != _MAGIC:
+                raise ValueError("invalid schema file {}".format(filename))
+            start = len(_MAGIC) + _INDEX_LEN.size
+            index_len = _INDEX_LEN.unpack_from(data, len(_MAGIC))[0]
+            index = json.loads(data[start:start + index_len].decode('utf-8'))
+        except Exception:
+            data.close()
+            raise
+
+        self._data = data
+        self._data_start = start + index_len
+        for key, value in index['keys'].items():
+            self._dict[key] = value
+        for ns, members in index['members'].items():
+            if ns in self.namespaces:
+                self._dict[ns] = members
+        self._help = index['help']
+
+    def _read_member(self, location):
+        offset, length = location
+        offset += self._data_start
+        value = zlib.decompress(self._data[offset:offset + length])
+        return json.loads(value.decode('utf-8'))
 
     def __getitem__(self, key):
         try:
@@ -479,6 +517,8 @@ class Schema:
                     topic['topic_topic'] = member_schema['topic_topic']
                 if 'exclude' in member_schema:
                     topic['exclude'] = member_schema['exclude']
+                if 'obj_class' in member_schema:
+                    topic['obj_class'] = member_schema['obj_class']
 
         return halp
 
@@ -502,27 +542,40 @@ class Schema:
                 os.rename(f.name, os.path.join(self._DIR, fingerprint))
 
     def _write_schema_data(self, fileobj):
-        with zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as schema:
-            for key, value in self._dict.items():
-                if key in self.namespaces:
-                    ns = value
-                    for member in ns:
-                        path = '{}/{}'.format(key, member)
-                        s = json.dumps(ns[member], default=json_default)
-                        schema.writestr(path, s.encode('utf-8'))
-                else:
-                    schema.writestr(key, json.dumps(value).encode('utf-8'))
+        index = {'keys': {}, 'members': {}}
+        chunks = []
+        offset = 0
+
+        for key, value in self._dict.items():
+            if key in self.namespaces:
+                members = index['members'][key] = {}
+                for member in value:
+                    chunks.append(self._encode_member(value[member]))
+                    members[member] = (offset, len(chunks[-1]))
+                    offset += len(chunks[-1])
+            else:
+                index['keys'][key] = value
+
+        chunks.append(self._encode_member(self._help))
+        index['help'] = (offset, len(chunks[-1]))
+
+        index = json.dumps(index, default=json_default).encode('utf-8')
+        fileobj.write(_MAGIC)
+        fileobj.write(_INDEX_LEN.pack(len(index)))
+        fileobj.write(index)
+        for chunk in chunks:
+            fileobj.write(chunk)
 
-            schema.writestr(
-                '_help',
-                json.dumps(self._help, default=json_default).encode('utf-8')
-            )
+    @staticmethod
+    def _encode_member(value):
+        s = json.dumps(value, default=json_default)
+        return zlib.compress(s.encode('utf-8'))
 
     def read_namespace_member(self, namespace, member):
         value = self._dict[namespace][member]
 
-        if isinstance(value, bytes):
-            value = json.loads(value.decode('utf-8'))
+        if isinstance(value, list):
+            value = self._read_member(value)
             self._dict[namespace][member] = value
 
         return value
@@ -531,10 +584,8 @@ class Schema:
         return iter(self._dict[namespace])
 
     def get_help(self, namespace, member):
-        if isinstance(self._help, bytes):
-            self._help = json.loads(
-                self._help.decode('utf-8')  # pylint: disable=no-member
-            )
+        if isinstance(self._help, list):
+            self._help = self._read_member(self._help)
 
         return self._help[namespace][member]
 
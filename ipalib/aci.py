@@ -17,11 +17,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
-import shlex
+import functools
 import re
 
-import six
-
 # The Python re module doesn't do nested parenthesis
 
 # Break the ACI into 3 pieces: target, name, permissions/bind_rules
@@ -40,6 +38,63 @@ ACTIONS = ["allow", "deny"]
 PERMISSIONS = ["read", "write", "add", "delete", "search", "compare",
                "selfwrite", "proxy", "all"]
 
+# Tokens of the target part, split the same way as shlex.shlex with '.'
+# added to word characters: words may carry quotes, quoted strings have no
+# escapes, '#' starts a comment and other characters are tokens of their own
+_WHITESPACE = re.compile(r'[ \t\r\n]*')
+_WORD = re.compile(r'[a-zA-Z0-9_.][a-zA-Z0-9_.\'"]*')
+_WORD_CONT = re.compile(r'[a-zA-Z0-9_.\'"]*')
+_COMMENT = re.compile(r'#[^\n]*\n?')
+_QUOTED = {
+    '"': re.compile(r'"[^"]*"'),
+    "'": re.compile(r"'[^']*'"),
+}
+
+# Number of parsed ACI strings to remember
+PARSE_CACHE_SIZE = 4096
+
+
+def _tokenize_target(aci):
+    """Split target part of ACI string into tokens in a single pass"""
+    pos = 0
+    end = len(aci)
+    while True:
+        pos = _WHITESPACE.match(aci, pos).end()
+        if pos >= end:
+            return
+        char = aci[pos]
+        if char == '#':
+            pos = _COMMENT.match(aci, pos).end()
+            continue
+        match = _WORD.match(aci, pos)
+        if match:
+            token = match.group()
+            pos = match.end()
+            # a comment does not end the word
+            while pos < end and aci[pos] == '#':
+                pos = _COMMENT.match(aci, pos).end()
+                match = _WORD_CONT.match(aci, pos)
+                token += match.group()
+                pos = match.end()
+            yield token
+        elif char in _QUOTED:
+            match = _QUOTED[char].match(aci, pos)
+            if not match:
+                raise SyntaxError("No closing quotation in target")
+            yield match.group()
+            pos = match.end()
+        else:
+            yield char
+            pos += 1
+
+
+@functools.lru_cache(maxsize=PARSE_CACHE_SIZE)
+def _parse_aci(acistr):
+    """Parse ACI string, the result is shared and must not be modified"""
+    aci = ACI()
+    aci._parse_acistr_uncached(acistr)  # pylint: disable=protected-access
+    return aci
+
 
 class ACI:
     """
@@ -101,29 +156,31 @@ class ACI:
         return s
 
     def _parse_target(self, aci):
-        if six.PY2:
-            aci = aci.encode('utf-8')
-        lexer = shlex.shlex(aci)
-        lexer.wordchars = lexer.wordchars + "."
-
-        var = False
-        op = "="
-        for token in lexer:
-            # We should have the form (a = b)(a = b)...
-            if token == "(":
-                var = next(lexer).strip()
-                operator = next(lexer)
+        tokens = _tokenize_target(aci)
+
+        def next_token():
+            token = next(tokens, None)
+            if token is None:
+                raise SyntaxError("Incomplete target '%s'" % aci)
+            return token
+
+        # We should have the form (a = b)(a = b)...
+        for token in tokens:
+            if token != "(":
+                raise SyntaxError(
+                    "No start parenthesis in target, got %s" % token)
+            var = next_token()
+            operator = next_token()
+            if operator not in ("=", "!="):
+                # Peek at the next char before giving up
+                operator = operator + next_token()
                 if operator not in ("=", "!="):
-                    # Peek at the next char before giving up
-                    operator = operator + next(lexer)
-                    if operator not in ("=", "!="):
-                        raise SyntaxError("No operator in target, got '%s'" % operator)
-                op = operator
-                val = next(lexer).strip()
-                val = self._remove_quotes(val)
-                end = next(lexer)
-                if end != ")":
-                    raise SyntaxError('No end parenthesis in target, got %s' % end)
+                    raise SyntaxError("No operator in target, got '%s'" % operator)
+            op = operator
+            val = self._remove_quotes(next_token())
+            end = next_token()
+            if end != ")":
+                raise SyntaxError('No end parenthesis in target, got %s' % end)
 
             if var == 'targetattr':
                 # Make a string of the form attr || attr || ... into a list
@@ -137,6 +194,22 @@ class ACI:
                 self.target[var]['expression'] = val
 
     def _parse_acistr(self, acistr):
+        parsed = _parse_aci(acistr)
+        self.name = parsed.name
+        self.action = parsed.action
+        self.permissions = list(parsed.permissions)
+        self.bindrule = dict(parsed.bindrule)
+        self.target = {}
+        for var, value in parsed.target.items():
+            expression = value['expression']
+            if isinstance(expression, list):
+                expression = list(expression)
+            self.target[var] = {
+                'operator': value['operator'],
+                'expression': expression,
+            }
+
+    def _parse_acistr_uncached(self, acistr):
         vstart = acistr.find('version 3.0')
         if vstart < 0:
             raise SyntaxError("malformed ACI, unable to find version %s" % acistr)
@@ -1218,19 +1218,50 @@ class cli(backend.Executioner):
             kw = self.process_keyword_arguments(cmd, kw)
             result = self.execute(name, **kw)
             if callable(cmd.output_for_cli):
+                execute_kw = dict(kw)
                 for param in cmd.params():
                     if param.password and param.name in kw:
                         del kw[param.name]
                 (args, options) = cmd.params_2_args_options(**kw)
-                rv = cmd.output_for_cli(self.api.Backend.textui, result, *args, **options)
-                if rv:
-                    return rv
-                else:
-                    return 0
+                paged = bool(kw.get('pagesize'))
+                count = 0
+                while True:
+                    # fetch and print the following pages of a paged search
+                    continuation = None
+                    if paged:
+                        continuation = self.pop_continuation(result)
+                        count += result.get('count', 0)
+                    rv = cmd.output_for_cli(
+                        self.api.Backend.textui, result, *args, **options
+                    )
+                    if continuation is None:
+                        break
+                    execute_kw['continuation'] = continuation
+                    result = self.execute(name, **execute_kw)
+                if paged and count:
+                    # entries were found even if a page was left empty,
+                    # e.g. by a post callback
+                    rv = 0
+                return rv
         finally:
             self.destroy_context()
         return None
 
+    @staticmethod
+    def pop_continuation(result):
+        """
+        Remove the SearchResultPaged message from a command result and
+        return its continuation token, or None for the last page.
+        """
+        if not isinstance(result, dict):
+            return None
+        messages = result.get('messages', [])
+        for message in messages:
+            if message.get('name') == 'SearchResultPaged':
+                messages.remove(message)
+                return message['data']['continuation']
+        return None
+
     def parse(self, cmd, argv):
         parser = self.build_parser(cmd)
         (collector, args) = parser.parse_args(argv, Collector())
@@ -173,6 +173,14 @@ DEFAULT_CONFIG = (
     ('startup_timeout', 120),
     # How long http connection should wait for reply [seconds].
     ('http_timeout', 30),
+    # Minimum size of RPC responses compressed by the server [bytes],
+    # 0 disables compression
+    ('rpc_compress_min_size', 16384),
+    # Number of idle proxied LDAP connections kept per server process,
+    # 0 disables the pool
+    ('ldap_pool_size', 0),
+    # How long a pooled LDAP connection may stay idle [seconds].
+    ('ldap_pool_idle_timeout', 300),
     # How long to wait for an entry to appear on a replica
     ('replication_wait_timeout', 300),
     # How long to wait for a certmonger request to finish
@@ -202,6 +210,10 @@ DEFAULT_CONFIG = (
     # Dogtag version.
     ('ca_install_port', None),
 
+    # Batch plugin
+    ('batch_max_workers', 4),  # Maximum number of worker threads used by
+                               # batch --parallel
+
     # Topology plugin
     ('recommended_max_agmts', 4),  # Recommended maximum number of replication
                                    # agreements
@@ -496,6 +496,16 @@ class LightweightCACertificateNotAvailable(PublicMessage):
     format = _("The certificate for %(ca)s is not available on this server.")
 
 
+class SearchResultPaged(PublicMessage):
+    """
+    **13032** More search results are available
+    """
+    errno = 13032
+    type = "info"
+    format = _("More results are available, continue the search with "
+               "--continuation=%(continuation)s")
+
+
 def iter_messages(variables, base):
     """Return a tuple with all subclasses
     """
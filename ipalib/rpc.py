@@ -38,10 +38,14 @@ import logging
 import os
 import locale
 import base64
+import collections
 import json
+import queue
 import re
 import socket
 import gzip
+import threading
+import time
 import urllib
 from ssl import SSLError
 
@@ -81,6 +85,11 @@ except ImportError:
     from xmlrpc.client import (Binary, Fault, DateTime, dumps, loads, ServerProxy,
             Transport, ProtocolError, MININT, MAXINT)
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # pylint: disable=import-error
 if six.PY3:
     from http.client import RemoteDisconnected
@@ -97,6 +106,9 @@ logger = logging.getLogger(__name__)
 COOKIE_NAME = 'ipa_session'
 CCACHE_COOKIE_KEY = 'X-IPA-Session-Cookie'
 
+# session data read from the persistent storage, keyed by principal
+_session_data_cache = {}
+
 
 def update_persistent_client_session_data(principal, data):
     '''
@@ -106,6 +118,7 @@ def update_persistent_client_session_data(principal, data):
     Raises ValueError if unable to perform the action for any reason.
     '''
 
+    _session_data_cache.pop(principal, None)
     try:
         session_storage.store_data(principal, CCACHE_COOKIE_KEY, data)
     except Exception as e:
@@ -116,13 +129,23 @@ def read_persistent_client_session_data(principal):
     Given a principal return the stored session data for that
     principal from the persistent secure storage.
 
+    The data is cached in memory for the lifetime of the process.
+
     Raises ValueError if unable to perform the action for any reason.
     '''
 
     try:
-        return session_storage.get_data(principal, CCACHE_COOKIE_KEY)
+        return _session_data_cache[principal]
+    except KeyError:
+        pass
+
+    try:
+        data = session_storage.get_data(principal, CCACHE_COOKIE_KEY)
     except Exception as e:
         raise ValueError(str(e))
+    if data is not None:
+        _session_data_cache[principal] = data
+    return data
 
 def delete_persistent_client_session_data(principal):
     '''
@@ -132,6 +155,7 @@ def delete_persistent_client_session_data(principal):
     Raises ValueError if unable to perform the action for any reason.
     '''
 
+    _session_data_cache.pop(principal, None)
     try:
         session_storage.remove_data(principal, CCACHE_COOKIE_KEY)
     except Exception as e:
@@ -277,6 +301,21 @@ def xml_dumps(params, version, methodname=None, methodresponse=False,
     )
 
 
+class PreEncodedDict(dict):
+    """Dictionary carrying its own JSON serialization
+
+    json_encode_binary() emits ``json_text`` verbatim instead of priming and
+    encoding the dictionary again. Use it for large, immutable results which
+    are served many times. The cached text must be version independent, i.e.
+    the dictionary must not contain bytes, datetime or DNSName values.
+    """
+    __slots__ = ('json_text',)
+
+    def __init__(self, data, json_text):
+        super(PreEncodedDict, self).__init__(data)
+        self.json_text = json_text
+
+
 class _JSONPrimer(dict):
     """Fast JSON primer and pre-converter
 
@@ -306,7 +345,7 @@ class _JSONPrimer(dict):
 
     :see: _ipa_obj_hook
     """
-    __slots__ = ('version', '_cap_datetime', '_cap_dnsname')
+    __slots__ = ('version', '_cap_datetime', '_cap_dnsname', 'preencoded')
 
     _identity = object()
 
@@ -315,6 +354,7 @@ class _JSONPrimer(dict):
         self.version = version
         self._cap_datetime = None
         self._cap_dnsname = None
+        self.preencoded = []
         self.update({
             unicode: _identity,
             bool: _identity,
@@ -330,6 +370,7 @@ class _JSONPrimer(dict):
             list: self._enc_list,
             tuple: self._enc_list,
             dict: self._enc_dict,
+            PreEncodedDict: self._enc_preencoded,
             crypto_x509.Certificate: self._enc_certificate,
             crypto_x509.CertificateSigningRequest: self._enc_certificate,
         })
@@ -398,6 +439,104 @@ class _JSONPrimer(dict):
     def _enc_certificate(self, val):
         return self._enc_bytes(val.public_bytes(x509_Encoding.DER))
 
+    def _enc_preencoded(self, val):
+        # replaced by the pre-encoded text after json.dumps()
+        placeholder = u'__ipa_preencoded_{}_{}__'.format(
+            id(self), len(self.preencoded))
+        self.preencoded.append((placeholder, val.json_text))
+        return placeholder
+
+
+class _JSONCodec:
+    """JSON codec based on Python's json module
+
+    Codecs only serialize primed data structures (see _JSONPrimer) and
+    unserialize JSON text using an object hook (see _ipa_obj_hook).
+    """
+    name = 'json'
+
+    def dumps(self, obj, pretty_print=False):
+        if pretty_print:
+            return json.dumps(obj, indent=4, sort_keys=True)
+        else:
+            return json.dumps(obj)
+
+    def loads(self, text, object_hook):
+        return json.loads(text, object_hook=object_hook)
+
+
+class _ORJSONCodec(_JSONCodec):
+    """JSON codec based on the accelerated orjson library
+
+    orjson has no object hook, the hook is applied to all JSON objects in
+    a single pass after parsing. Data structures which orjson cannot handle
+    (e.g. integers larger than 64 bits, which it would parse as floats)
+    fall back to Python's json module.
+    """
+    name = 'orjson'
+
+    # any run of 19 digits may be an integer which does not fit 64 bits,
+    # e.g. -9223372036854775809 is below the int64 range
+    _maybe_bigint = re.compile(r'-?[0-9]{19,}').search
+
+    def dumps(self, obj, pretty_print=False):
+        if pretty_print:
+            option = orjson.OPT_INDENT_2 | orjson.OPT_SORT_KEYS
+        else:
+            option = None
+        try:
+            return orjson.dumps(obj, option=option).decode('utf-8')
+        except orjson.JSONEncodeError:
+            return super(_ORJSONCodec, self).dumps(obj, pretty_print)
+
+    def loads(self, text, object_hook):
+        if self._maybe_bigint(text):
+            return super(_ORJSONCodec, self).loads(text, object_hook)
+        try:
+            obj = orjson.loads(text)
+        except orjson.JSONDecodeError:
+            return super(_ORJSONCodec, self).loads(text, object_hook)
+        return self._apply_hook(obj, object_hook)
+
+    def _apply_hook(self, obj, object_hook, _dict=dict, _list=list):
+        cls = obj.__class__
+        if cls is _dict:
+            for k, v in obj.items():
+                if v.__class__ is _dict or v.__class__ is _list:
+                    obj[k] = self._apply_hook(v, object_hook)
+            return object_hook(obj)
+        elif cls is _list:
+            for i, v in enumerate(obj):
+                if v.__class__ is _dict or v.__class__ is _list:
+                    obj[i] = self._apply_hook(v, object_hook)
+        return obj
+
+
+JSON_CODECS = {
+    codec.name: codec for codec in (_JSONCodec(), _ORJSONCodec())
+}
+
+
+def _get_json_codec():
+    """Get the JSON codec used by json_encode_binary and json_decode_binary
+
+    The accelerated codec is used when its library is installed. The
+    IPA_JSON_CODEC environment variable selects a codec explicitly.
+    """
+    name = os.environ.get('IPA_JSON_CODEC')
+    if name is None:
+        name = 'orjson' if orjson is not None else 'json'
+    if name == 'orjson' and orjson is None:
+        logger.debug("JSON codec orjson is not available, using json")
+        name = 'json'
+    try:
+        return JSON_CODECS[name]
+    except KeyError:
+        raise ValueError("Unknown JSON codec '{}'".format(name))
+
+
+json_codec = _get_json_codec()
+
 
 def json_encode_binary(val, version, pretty_print=False):
     """Serialize a Python object structure to JSON
@@ -409,11 +548,28 @@ def json_encode_binary(val, version, pretty_print=False):
     :note: pretty printing triggers a slow path in Python's JSON module. Only
            use pretty_print in debug mode.
     """
-    result = _JSONPrimer(version).convert(val)
-    if pretty_print:
-        return json.dumps(result, indent=4, sort_keys=True)
+    primer = _JSONPrimer(version)
+    result = primer.convert(val)
+    dump = json_codec.dumps(result, pretty_print)
+    for placeholder, json_text in primer.preencoded:
+        dump = dump.replace(u'"{}"'.format(placeholder), json_text, 1)
+    return dump
+
+
+def _ipa_obj_hook_lists(dct):
+    """JSON object hook which keeps JSON arrays as lists
+
+    :see: _JSONPrimer
+    """
+    if '__base64__' in dct:
+        return base64.b64decode(dct['__base64__'])
+    elif '__datetime__' in dct:
+        return datetime.datetime.strptime(dct['__datetime__'],
+                                          LDAP_GENERALIZED_TIME_FORMAT)
+    elif '__dns_name__' in dct:
+        return DNSName(dct['__dns_name__'])
     else:
-        return json.dumps(result)
+        return dct
 
 
 def _ipa_obj_hook(dct, _iteritems=six.iteritems, _list=list):
@@ -436,18 +592,23 @@ def _ipa_obj_hook(dct, _iteritems=six.iteritems, _list=list):
         return dct
 
 
-def json_decode_binary(val):
+def json_decode_binary(val, tuples=True):
     """Convert serialized JSON string back to Python data structure
 
     :param val: JSON string
     :type val: str, bytes
+    :param bool tuples: convert JSON arrays in objects to tuples
     :return: Python data structure
     :see: _ipa_obj_hook, _JSONPrimer
     """
     if isinstance(val, bytes):
         val = val.decode('utf-8')
 
-    return json.loads(val, object_hook=_ipa_obj_hook)
+    if tuples:
+        object_hook = _ipa_obj_hook
+    else:
+        object_hook = _ipa_obj_hook_lists
+    return json_codec.loads(val, object_hook)
 
 
 def decode_fault(e, encoding='UTF-8'):
@@ -579,6 +740,7 @@ class KerbTransport(SSLTransport):
     """
     flags = [gssapi.RequirementFlag.mutual_authentication,
              gssapi.RequirementFlag.out_of_sequence_detection]
+    reuse_session_cookie = True
 
     def __init__(self, *args, **kwargs):
         SSLTransport.__init__(self, *args, **kwargs)
@@ -831,6 +993,10 @@ class KerbTransport(SSLTransport):
         cookie_string = self._slice_session_cookie(session_cookie)
         logger.debug("storing cookie '%s' for principal %s",
                      cookie_string, principal)
+        if self.reuse_session_cookie:
+            # authenticate further requests of this connection with the
+            # session cookie instead of a new Negotiate exchange
+            setattr(context, 'session_cookie', session_cookie.http_cookie())
         try:
             update_persistent_client_session_data(principal, cookie_string)
         except Exception as e:
@@ -854,6 +1020,8 @@ class DelegatedKerbTransport(KerbTransport):
     flags = [gssapi.RequirementFlag.delegate_to_peer,
              gssapi.RequirementFlag.mutual_authentication,
              gssapi.RequirementFlag.out_of_sequence_detection]
+    # every request has to delegate the TGT
+    reuse_session_cookie = False
 
 
 class RPCClient(Connectible):
@@ -869,6 +1037,133 @@ class RPCClient(Connectible):
     protocol = None
     env_rpc_uri_key = None
 
+    # maximum number of idle transports kept open for reuse
+    max_idle_transports = 4
+    # timeout of the TCP probes of fallback servers [seconds]
+    probe_timeout = 5
+
+    def __init__(self, api, shared_instance=False):
+        super(RPCClient, self).__init__(api, shared_instance=shared_instance)
+        self._idle_transports = collections.OrderedDict()
+        self._idle_lock = threading.Lock()
+        self._preferred_netloc = None
+
+    def _get_transport(self, transport_class, url, ccache):
+        """
+        Get a transport for url, reusing an idle one if possible.
+
+        Idle transports keep their HTTP connection open, so a new connection
+        to the same server skips the TLS handshake.
+        """
+        key = (transport_class, urllib.parse.urlparse(url).netloc, ccache)
+        with self._idle_lock:
+            transport = self._idle_transports.pop(key, None)
+        if transport is None:
+            transport = transport_class(
+                protocol=self.protocol, service='HTTP', ccache=ccache)
+        else:
+            logger.debug('reusing transport for %s', url)
+        transport.reuse_key = key
+        return transport
+
+    def _release_transport(self, transport):
+        """
+        Keep transport open for reuse by the next connection.
+        """
+        key = getattr(transport, 'reuse_key', None)
+        if key is None:
+            transport.close()
+            return
+        evicted = []
+        with self._idle_lock:
+            old = self._idle_transports.pop(key, None)
+            if old is not None:
+                evicted.append(old)
+            self._idle_transports[key] = transport
+            while len(self._idle_transports) > self.max_idle_transports:
+                evicted.append(self._idle_transports.popitem(last=False)[1])
+        for old in evicted:
+            old.close()
+
+    def _probe_server(self, url):
+        parsed = urllib.parse.urlparse(url)
+        port = parsed.port or (443 if parsed.scheme == 'https' else 80)
+        start = time.time()
+        sock = socket.create_connection(
+            (parsed.hostname, port), self.probe_timeout)
+        sock.close()
+        return time.time() - start
+
+    def _probe_servers(self, urls):
+        """
+        Probe servers concurrently, yield (url, latency) as probes finish.
+
+        The latency is None for unreachable servers. The probes run in
+        daemon threads, so the caller may stop iterating at any time
+        without waiting for the remaining probes.
+        """
+        results = queue.Queue()
+
+        def probe(url):
+            try:
+                latency = self._probe_server(url)
+            except (socket.error, ValueError) as e:
+                logger.debug('probe of %s failed: %s', url, e)
+                latency = None
+            results.put((url, latency))
+
+        for i, url in enumerate(urls):
+            thread = threading.Thread(
+                target=probe, args=(url,), name='probe-%d' % i)
+            thread.daemon = True
+            thread.start()
+
+        for _i in range(len(urls)):
+            try:
+                yield results.get(timeout=self.probe_timeout + 1)
+            except queue.Empty:
+                return
+
+    def order_urls(self, urls):
+        """
+        Order urls of fallback servers by preference.
+
+        The server which answered last is tried first. Otherwise the
+        configured server, which is the first url, keeps its place when it
+        accepts connections. All servers are probed concurrently, so when
+        the configured server is unreachable, the first server to accept
+        a connection is tried first without waiting for the other probes.
+        Unreachable servers come last.
+        """
+        netlocs = [urllib.parse.urlparse(url).netloc for url in urls]
+        if self._preferred_netloc in netlocs:
+            index = netlocs.index(self._preferred_netloc)
+            return [urls[index]] + urls[:index] + urls[index + 1:]
+
+        configured = urls[0]
+        configured_down = False
+        first = None
+        unreachable = []
+        for url, latency in self._probe_servers(urls):
+            if latency is None:
+                unreachable.append(url)
+                configured_down = configured_down or url == configured
+            elif url == configured:
+                logger.debug('configured server %s is reachable', url)
+                return urls
+            elif first is None:
+                first = url
+            if configured_down and first is not None:
+                break
+        logger.debug('first reachable server: %s, unreachable: %s',
+                     first, unreachable)
+
+        ordered = [url for url in urls if url not in unreachable]
+        if first is not None:
+            ordered.remove(first)
+            ordered.insert(0, first)
+        return ordered + [url for url in urls if url in unreachable]
+
     def get_url_list(self, rpc_uri):
         """
         Create a list of urls consisting of the available IPA servers.
@@ -1028,6 +1323,8 @@ class RPCClient(Connectible):
             # No session key, do full Kerberos auth
             pass
         urls = self.get_url_list(rpc_uri)
+        if len(urls) > 1 and fallback:
+            urls = self.order_urls(urls)
 
         proxy_kw = {
             'allow_none': True,
@@ -1047,8 +1344,8 @@ class RPCClient(Connectible):
                         transport_class = KerbTransport
                 else:
                     transport_class = LanguageAwareTransport
-                proxy_kw['transport'] = transport_class(
-                    protocol=self.protocol, service='HTTP', ccache=ccache)
+                transport = self._get_transport(transport_class, url, ccache)
+                proxy_kw['transport'] = transport
                 logger.debug('trying %s', url)
                 setattr(context, 'request_url', url)
                 serverproxy = self.server_proxy_class(url, **proxy_kw)
@@ -1073,6 +1370,10 @@ class RPCClient(Connectible):
                                 server=url,
                             )
                     # We don't care about the response, just that we got one
+                    # bypass the plugin's locking
+                    object.__setattr__(
+                        self, '_preferred_netloc',
+                        urllib.parse.urlparse(url).netloc)
                     return serverproxy
                 # pylint: disable=try-except-raise
                 except errors.KerberosError:
@@ -1080,6 +1381,7 @@ class RPCClient(Connectible):
                     raise
                 # pylint: enable=try-except-raise
                 except ProtocolError as e:
+                    transport.close()
                     if hasattr(context, 'session_cookie') and e.errcode == 401:
                         # Unauthorized. Remove the session and try again.
                         delattr(context, 'session_cookie')
@@ -1099,6 +1401,7 @@ class RPCClient(Connectible):
                     # try the next url
                     break
                 except Exception as e:
+                    transport.close()
                     if not fallback:
                         raise
                     else:
@@ -1113,8 +1416,8 @@ class RPCClient(Connectible):
     def destroy_connection(self):
         conn = getattr(context, self.id, None)
         if conn is not None:
-            conn = conn.conn._ServerProxy__transport
-            conn.close()
+            transport = conn.conn._ServerProxy__transport
+            self._release_transport(transport)
 
     def _call_command(self, command, params):
         """Call the command with given params"""
@@ -45,5 +45,6 @@ if __name__ == '__main__':
         ],
         extras_require={
             "install": ["ipaplatform"],
+            "json": ["orjson"],  # ipalib.rpc accelerated JSON codec
         },
     )
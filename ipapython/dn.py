@@ -416,11 +416,15 @@ the object identity operator ("is") for comparisons.
 It is possible to "copy" an object by passing an object of the same type
 to the constructor. The result may share underlying structure.
 
+DN objects parsed from the same string share their RDN's while any of them
+is alive, and a DN computes its comparison key and hash value only once.
+
 '''
 from __future__ import print_function
 
 import sys
 import functools
+import weakref
 
 import cryptography.x509
 import six
@@ -438,6 +442,9 @@ if six.PY3:
 
 __all__ = 'AVA', 'RDN', 'DN'
 
+# Live DN objects by the string they were parsed from, see DN.__init__()
+_interned_dns = weakref.WeakValueDictionary()
+
 def _adjust_indices(start, end, length):
     'helper to fixup start/end slice values'
 
@@ -617,6 +624,8 @@ class AVA:
     The str method of an AVA returns the string representation in RFC 4514 DN
     syntax with proper escaping.
     '''
+    __slots__ = ('_ava',)
+
     def __init__(self, *args):
         self._ava = get_ava(*args)
 
@@ -820,6 +829,8 @@ class RDN:
 
     AVA_type = AVA
 
+    __slots__ = ('_avas',)
+
     def __init__(self, *args, **kwds):
         self._avas = self._avas_from_sequence(args, kwds.get('raw', False))
 
@@ -1109,7 +1120,27 @@ class DN:
     AVA_type = AVA
     RDN_type = RDN
 
+    __slots__ = ('rdns', '_key', '_hash', '__weakref__')
+
     def __init__(self, *args, **kwds):
+        self._key = None
+        self._hash = None
+
+        if len(args) == 1 and isinstance(args[0], str):
+            # DN objects are immutable, share the RDN's (and the comparison
+            # key and hash value, if known) with a live DN parsed from the
+            # same string instead of parsing it again
+            value = args[0]
+            interned = _interned_dns.get(value)
+            if interned is not None:
+                self.rdns = interned.rdns
+                self._key = interned._key
+                self._hash = interned._hash
+            else:
+                self.rdns = self._rdns_from_value(value)
+                _interned_dns[value] = self
+            return
+
         self.rdns = self._rdns_from_sequence(args)
 
     def _copy_rdns(self, rdns=None):
@@ -1192,6 +1223,8 @@ class DN:
             cls = self.__class__
             new_dn = cls.__new__(cls)
             new_dn.rdns = self.rdns[key]
+            new_dn._key = None
+            new_dn._hash = None
             return new_dn
         elif isinstance(key, str):
             for rdn in self.rdns:
@@ -1203,20 +1236,24 @@ class DN:
             raise TypeError("unsupported type for DN indexing, must be int, basestring or slice; not %s" % \
                                 (key.__class__.__name__))
 
+    def _get_key(self):
+        # Normalized comparison key, a tuple of rdn_key() of all RDN's.
+        # Equal DN's have equal keys even if they differ in case.
+        key = self._key
+        if key is None:
+            key = self._key = tuple(rdn_key(rdn) for rdn in self.rdns)
+        return key
+
     def __hash__(self):
-        # Hash is computed from DN's string representation.
+        # Hash is computed from the normalized comparison key.
         #
         # Because attrs & values are comparison case-insensitive the
         # hash value between two objects which compare as equal but
         # differ in case must yield the same hash value.
-
-        str_dn = ';,'.join([
-            '++'.join([
-                '=='.join((atype, avalue or ''))
-                for atype, avalue, _dummy in rdn
-            ]) for rdn in self.rdns
-        ])
-        return hash(str_dn.lower())
+        value = self._hash
+        if value is None:
+            value = self._hash = hash(self._get_key())
+        return value
 
     def __eq__(self, other):
         # Try coercing to DN, if successful compare to coerced object
@@ -1231,11 +1268,14 @@ class DN:
         if not isinstance(other, DN):
             return False
 
+        if self.rdns is other.rdns:
+            return True
+
         if len(self) != len(other):
             return False
 
         # Perform comparison between objects of same type
-        return self._cmp_sequence(other, 0, len(self)) == 0
+        return self._get_key() == other._get_key()
 
     def __ne__(self, other):
         return not self.__eq__(other)
@@ -1247,7 +1287,7 @@ class DN:
         if len(self) != len(other):
             return len(self) < len(other)
 
-        return self._cmp_sequence(other, 0, len(self)) < 0
+        return self._get_key() < other._get_key()
 
     def _cmp_sequence(self, pattern, self_start, pat_len):
         self_idx = self_start
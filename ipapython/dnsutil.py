@@ -17,10 +17,12 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import concurrent.futures
 import copy
 import logging
 import operator
 import random
+import threading
 
 import dns.name
 import dns.exception
@@ -41,6 +43,7 @@ logger = logging.getLogger(__name__)
 
 
 ipa_resolver = None
+ipa_caching_resolver = None
 
 
 def get_ipa_resolver():
@@ -50,6 +53,28 @@ def get_ipa_resolver():
     return ipa_resolver
 
 
+def get_ipa_caching_resolver():
+    """Get resolver which caches answers in process memory.
+
+    Use it for lookups which are repeated many times within a short time
+    and which do not have to observe records added by the caller, e.g. zone
+    lookups during certificate SAN validation.
+    """
+    global ipa_caching_resolver
+    if ipa_caching_resolver is None:
+        resolver = DNSResolver()
+        resolver.cache = DNSCache()
+        ipa_caching_resolver = resolver
+    return ipa_caching_resolver
+
+
+def get_cache_statistics():
+    """Get hit and miss counters of the caching resolver.
+    """
+    resolver = get_ipa_caching_resolver()
+    return resolver.cache.get_statistics()
+
+
 def resolve(*args, **kwargs):
     return get_ipa_resolver().resolve(*args, **kwargs)
 
@@ -68,8 +93,9 @@ def zone_for_name(*args, **kwargs):
 def reset_default_resolver():
     """Re-initialize ipa resolver.
     """
-    global ipa_resolver
+    global ipa_resolver, ipa_caching_resolver
     ipa_resolver = DNSResolver()
+    ipa_caching_resolver = None
 
 
 class DNSResolver(dns.resolver.Resolver):
@@ -119,6 +145,39 @@ class DNSResolver(dns.resolver.Resolver):
         )
 
 
+class DNSCache(dns.resolver.Cache):
+    """Cache of DNS answers with hit and miss counters.
+
+    Answers expire with their TTL. Negative answers (NXDOMAIN and NoAnswer),
+    which dnspython >= 2.0 would keep for the negative TTL of the zone, are
+    not cached, so records added meanwhile are found by the next lookup.
+    """
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def put(self, key, value):
+        if value.rrset is None:
+            return
+        super().put(key, value)
+
+    def get(self, key):
+        value = super().get(key)
+        with self._stats_lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def get_statistics(self):
+        with self._stats_lock:
+            return dict(hits=self.hits, misses=self.misses,
+                        size=len(self.data))
+
+
 class DNSZoneAlreadyExists(dns.exception.DNSException):
     supp_kwargs = {'zone', 'ns'}
     fmt = (u"DNS zone {zone} already exists in DNS "
@@ -381,12 +440,13 @@ def has_empty_zone_addresses(hostname):
     )
 
 
-def resolve_rrsets(fqdn, rdtypes):
+def resolve_rrsets(fqdn, rdtypes, resolver=None):
     """
     Get Resource Record sets for given FQDN.
     CNAME chain is followed during resolution
     but CNAMEs are not returned in the resulting rrset.
 
+    :param resolver: resolver to use, the uncached default resolver if None
     :returns:
         set of dns.rrset.RRset objects, can be empty
         if the FQDN does not exist or if none of rrtypes exist
@@ -398,10 +458,18 @@ def resolve_rrsets(fqdn, rdtypes):
         fqdn = DNSName(fqdn)
 
     fqdn = fqdn.make_absolute()
+    if resolver is None:
+        resolver = get_ipa_resolver()
+
+    # query all record types at once, but process the answers in order
+    with concurrent.futures.ThreadPoolExecutor(len(rdtypes)) as executor:
+        futures = [executor.submit(resolver.resolve, fqdn, rdtype)
+                   for rdtype in rdtypes]
+
     rrsets = []
-    for rdtype in rdtypes:
+    for rdtype, future in zip(rdtypes, futures):
         try:
-            answer = resolve(fqdn, rdtype)
+            answer = future.result()
             logger.debug('found %d %s records for %s: %s',
                          len(answer),
                          rdtype,
@@ -21,6 +21,7 @@ import collections
 import gzip
 import io
 import logging
+import threading
 from urllib.parse import urlencode
 import xml.dom.minidom
 import zlib
@@ -150,13 +151,125 @@ def ca_status(ca_host=None):
     return _parse_ca_status(body)
 
 
+class ConnectionPool:
+    """
+    Per-process pool of idle keep-alive HTTP(S) connections
+
+    Connections are kept per host, port and TLS client configuration. A
+    request on a pooled connection which the server has closed in the
+    meantime is retried once on a new connection.
+    """
+    # errors of a request sent over a connection closed by the server
+    stale_errors = (
+        httplib.BadStatusLine,
+        httplib.CannotSendRequest,
+        ConnectionResetError,
+        BrokenPipeError,
+    )
+
+    def __init__(self, maxsize=4):
+        self.maxsize = maxsize
+        self._idle = collections.defaultdict(list)
+        self._lock = threading.Lock()
+        self._stats = collections.Counter()
+
+    def _get(self, key):
+        with self._lock:
+            idle = self._idle[key]
+            if idle:
+                self._stats['reused'] += 1
+                return idle.pop()
+            return None
+
+    def _put(self, key, conn):
+        with self._lock:
+            idle = self._idle[key]
+            if len(idle) < self.maxsize:
+                idle.append(conn)
+                return
+            self._stats['discarded'] += 1
+        conn.close()
+
+    def _new(self, connection_factory, host, port, connection_options):
+        conn = connection_factory(host, port, **connection_options)
+        with self._lock:
+            self._stats['created'] += 1
+        return conn
+
+    @staticmethod
+    def _send(conn, method, path, body, headers):
+        conn.request(method, path, body=body, headers=headers)
+        res = conn.getresponse()
+        return res, res.read()
+
+    def request(self, key, connection_factory, host, port, method, path,
+                body, headers, connection_options):
+        """
+        Perform a request on a pooled connection
+
+        :return: (response, response body)
+        """
+        conn = self._get(key)
+        reused = conn is not None
+        if conn is None:
+            conn = self._new(
+                connection_factory, host, port, connection_options)
+
+        try:
+            try:
+                res, res_body = self._send(conn, method, path, body, headers)
+            except self.stale_errors as e:
+                if not reused:
+                    raise
+                logger.debug("retrying request on a new connection: %s", e)
+                conn.close()
+                with self._lock:
+                    self._stats['retried'] += 1
+                conn = self._new(
+                    connection_factory, host, port, connection_options)
+                res, res_body = self._send(conn, method, path, body, headers)
+        except Exception:
+            conn.close()
+            raise
+
+        if res.will_close:
+            conn.close()
+        else:
+            self._put(key, conn)
+        return res, res_body
+
+    def clear(self):
+        """Close all idle connections"""
+        with self._lock:
+            idle = [c for conns in self._idle.values() for c in conns]
+            self._idle.clear()
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        """
+        :return: dict with the number of created, reused, retried and
+                 discarded connections and the number of idle connections
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats['idle'] = sum(len(c) for c in self._idle.values())
+        for key in ('created', 'reused', 'retried', 'discarded'):
+            stats.setdefault(key, 0)
+        return stats
+
+
+connection_pool = ConnectionPool()
+
+
 def https_request(
         host, port, url, cafile, client_certfile, client_keyfile,
-        method='POST', headers=None, body=None, **kw):
+        method='POST', headers=None, body=None, keep_alive=False, **kw):
     """
     :param method: HTTP request method (defalut: 'POST')
     :param url: The path (not complete URL!) to post to.
     :param body: The request body (encodes kw if None)
+    :param keep_alive: Reuse a connection from ``connection_pool``
     :param kw:  Keyword arguments to encode into POST body.
     :return:   (http_status, http_headers, http_body)
                as (integer, dict, str)
@@ -175,9 +288,13 @@ def https_request(
 
     if body is None:
         body = urlencode(kw)
+    if keep_alive:
+        pool_key = (host, port, cafile, client_certfile, client_keyfile)
+    else:
+        pool_key = None
     return _httplib_request(
         'https', host, port, url, connection_factory, body,
-        method=method, headers=headers)
+        method=method, headers=headers, pool_key=pool_key)
 
 
 def http_request(host, port, url, timeout=None, **kw):
@@ -203,7 +320,7 @@ def http_request(host, port, url, timeout=None, **kw):
 
 def _httplib_request(
         protocol, host, port, path, connection_factory, request_body,
-        method='POST', headers=None, connection_options=None):
+        method='POST', headers=None, connection_options=None, pool_key=None):
     """
     :param request_body: Request body
     :param connection_factory: Connection class to use. Will be called
@@ -211,6 +328,8 @@ def _httplib_request(
     :param method: HTTP request method (default: 'POST')
     :param connection_options: a dictionary that will be passed to
         connection_factory as keyword arguments.
+    :param pool_key: if not None, the connection is taken from and returned
+        to ``connection_pool`` under this key
 
     Perform a HTTP(s) request.
     """
@@ -229,14 +348,19 @@ def _httplib_request(
         headers['content-type'] = 'application/x-www-form-urlencoded'
 
     try:
-        conn = connection_factory(host, port, **connection_options)
-        conn.request(method, path, body=request_body, headers=headers)
-        res = conn.getresponse()
+        if pool_key is not None:
+            res, http_body = connection_pool.request(
+                pool_key, connection_factory, host, port, method, path,
+                request_body, headers, connection_options)
+        else:
+            conn = connection_factory(host, port, **connection_options)
+            conn.request(method, path, body=request_body, headers=headers)
+            res = conn.getresponse()
+            http_body = res.read()
+            conn.close()
 
         http_status = res.status
         http_headers = res.msg
-        http_body = res.read()
-        conn.close()
     except Exception as e:
         logger.debug("httplib request failed:", exc_info=True)
         raise NetworkError(uri=uri, error=str(e))
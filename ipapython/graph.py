@@ -15,11 +15,14 @@ class Graph:
     def __init__(self):
         self.vertices = set()
         self.edges = []
+        # adjacency lists: tail -> heads and head -> tails
         self._adj = dict()
+        self._radj = dict()
 
     def add_vertex(self, vertex):
         self.vertices.add(vertex)
-        self._adj[vertex] = []
+        self._adj.setdefault(vertex, [])
+        self._radj.setdefault(vertex, [])
 
     def add_edge(self, tail, head):
         if tail not in self.vertices:
@@ -30,15 +33,17 @@ class Graph:
 
         self.edges.append((tail, head))
         self._adj[tail].append(head)
+        self._radj[head].append(tail)
 
     def remove_edge(self, tail, head):
         try:
             self.edges.remove((tail, head))
-        except KeyError:
+        except ValueError:
             raise ValueError(
                 "graph does not contain edge: ({0}, {1})".format(tail, head)
             )
         self._adj[tail].remove(head)
+        self._radj[head].remove(tail)
 
     def remove_vertex(self, vertex):
         try:
@@ -49,26 +54,38 @@ class Graph:
             )
 
         # delete _adjacencies
-        del self._adj[vertex]
-        for adj in self._adj.values():
-            adj[:] = [v for v in adj if v != vertex]
+        for head in set(self._adj.pop(vertex)) - {vertex}:
+            self._radj[head][:] = [v for v in self._radj[head] if v != vertex]
+        for tail in set(self._radj.pop(vertex)) - {vertex}:
+            self._adj[tail][:] = [v for v in self._adj[tail] if v != vertex]
 
         # delete edges
         self.edges = [
             e for e in self.edges if vertex not in (e[0], e[1])
         ]
 
+    def copy(self):
+        """
+        Return a copy of the graph which can be modified independently
+        """
+        graph = Graph()
+        graph.vertices = set(self.vertices)
+        graph.edges = list(self.edges)
+        graph._adj = {v: list(adj) for v, adj in self._adj.items()}
+        graph._radj = {v: list(adj) for v, adj in self._radj.items()}
+        return graph
+
     def get_tails(self, head):
         """
         Get list of vertices where a vertex is on the right side of an edge
         """
-        return [e[0] for e in self.edges if e[1] == head]
+        return list(self._radj.get(head, []))
 
     def get_heads(self, tail):
         """
         Get list of vertices where a vertex is on the left side of an edge
         """
-        return [e[1] for e in self.edges if e[0] == tail]
+        return list(self._adj.get(tail, []))
 
     def bfs(self, start=None):
         """
@@ -86,3 +103,139 @@ class Graph:
                 visited.add(vertex)
                 queue.extend(set(self._adj.get(vertex, [])) - visited)
         return visited
+
+    def distances(self, start):
+        """
+        Return dict mapping each vertex reachable from `start` to the number
+        of edges on the shortest path from `start`
+        """
+        distances = {start: 0}
+        queue = deque([start])
+
+        while queue:
+            vertex = queue.popleft()
+            for head in self._adj.get(vertex, []):
+                if head not in distances:
+                    distances[head] = distances[vertex] + 1
+                    queue.append(head)
+        return distances
+
+    def strongly_connected_components(self):
+        """
+        Return list of strongly connected components, each a set of vertices
+
+        Uses Tarjan's algorithm in linear time. Components are returned in
+        reverse topological order, i.e. a component comes before all
+        components that have an edge into it.
+        """
+        index = {}
+        lowlink = {}
+        stack = []
+        on_stack = set()
+        components = []
+
+        for root in sorted(self.vertices):
+            if root in index:
+                continue
+            index[root] = lowlink[root] = len(index)
+            stack.append(root)
+            on_stack.add(root)
+            work = [(root, iter(self._adj[root]))]
+            while work:
+                vertex, heads = work[-1]
+                for head in heads:
+                    if head not in index:
+                        index[head] = lowlink[head] = len(index)
+                        stack.append(head)
+                        on_stack.add(head)
+                        work.append((head, iter(self._adj[head])))
+                        break
+                    elif head in on_stack:
+                        lowlink[vertex] = min(lowlink[vertex], index[head])
+                else:
+                    work.pop()
+                    if work:
+                        parent = work[-1][0]
+                        lowlink[parent] = min(lowlink[parent],
+                                              lowlink[vertex])
+                    if lowlink[vertex] == index[vertex]:
+                        component = set()
+                        while True:
+                            member = stack.pop()
+                            on_stack.discard(member)
+                            component.add(member)
+                            if member == vertex:
+                                break
+                        components.append(component)
+        return components
+
+    def reachable_sets(self):
+        """
+        Return dict mapping each vertex to the set of vertices reachable
+        from it, the vertex itself included
+
+        Vertices of a strongly connected component share the same set.
+        """
+        components = self.strongly_connected_components()
+        component_of = {}
+        for i, component in enumerate(components):
+            for vertex in component:
+                component_of[vertex] = i
+
+        # successors come first in reverse topological order
+        reachable = []
+        for i, component in enumerate(components):
+            reach = set(component)
+            for vertex in component:
+                for head in self._adj[vertex]:
+                    j = component_of[head]
+                    if j != i:
+                        reach |= reachable[j]
+            reachable.append(frozenset(reach))
+
+        return {v: reachable[i] for v, i in component_of.items()}
+
+    def articulation_points(self):
+        """
+        Return set of vertices whose removal disconnects other vertices
+
+        Edges are taken as undirected. Uses the Hopcroft-Tarjan algorithm in
+        linear time.
+        """
+        neighbors = {v: set(self._adj[v]) | set(self._radj[v])
+                     for v in self.vertices}
+        for vertex in neighbors:
+            neighbors[vertex].discard(vertex)
+        depth = {}
+        low = {}
+        points = set()
+
+        for root in sorted(self.vertices):
+            if root in depth:
+                continue
+            depth[root] = low[root] = 0
+            root_children = 0
+            work = [(root, None, iter(neighbors[root]))]
+            while work:
+                vertex, parent, adjacent = work[-1]
+                for other in adjacent:
+                    if other == parent:
+                        continue
+                    if other in depth:
+                        low[vertex] = min(low[vertex], depth[other])
+                    else:
+                        depth[other] = low[other] = depth[vertex] + 1
+                        work.append((other, vertex, iter(neighbors[other])))
+                        break
+                else:
+                    work.pop()
+                    if parent is None:
+                        continue
+                    low[parent] = min(low[parent], low[vertex])
+                    if parent == root:
+                        root_children += 1
+                    elif low[vertex] >= depth[parent]:
+                        points.add(parent)
+            if root_children > 1:
+                points.add(root)
+        return points
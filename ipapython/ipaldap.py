@@ -37,7 +37,9 @@ from cryptography.hazmat.primitives import serialization
 import ldap
 import ldap.sasl
 import ldap.filter
-from ldap.controls import SimplePagedResultsControl, GetEffectiveRightsControl
+from ldap.controls import (LDAPControl, SimplePagedResultsControl,
+                           GetEffectiveRightsControl)
+from ldap.controls.sss import SSSRequestControl
 import ldapurl
 import six
 
@@ -143,9 +145,27 @@ def ldap_initialize(uri, cacertfile=None):
     return conn
 
 
+def _attribute_key(name_or_oid):
+    """
+    Get the key of an attribute in the attribute tables of _ServerSchema.
+    """
+    if isinstance(name_or_oid, bytes):
+        name_or_oid = name_or_oid.decode('utf-8')
+    # attribute options (e.g. ;binary) are not part of the attribute type
+    return name_or_oid.split(';', 1)[0].strip().lower()
+
+
 class _ServerSchema:
     '''
     Properties of a schema retrieved from an LDAP server.
+
+    Walking the python-ldap schema is expensive, so the attribute type
+    properties needed to process entries are collected in flat tables
+    keyed by lowercased attribute names and OIDs:
+
+    attribute_names -- all names of the attribute type
+    attribute_syntaxes -- syntax OID of the attribute type
+    attribute_single_value -- whether the attribute type is single-valued
     '''
 
     def __init__(self, server, schema):
@@ -153,6 +173,22 @@ class _ServerSchema:
         self.schema = schema
         self.retrieve_timestamp = time.time()
 
+        self.attribute_names = {}
+        self.attribute_syntaxes = {}
+        self.attribute_single_value = {}
+        for oid in schema.listall(ldap.schema.AttributeType):
+            attrtype = schema.get_obj(ldap.schema.AttributeType, oid)
+            if attrtype is None:
+                continue
+            names = attrtype.names
+            if six.PY2:
+                names = tuple(name.decode('utf-8') for name in names)
+            for key in (oid,) + tuple(names):
+                key = _attribute_key(key)
+                self.attribute_names[key] = names
+                self.attribute_syntaxes[key] = attrtype.syntax
+                self.attribute_single_value[key] = attrtype.single_value
+
 
 class SchemaCache:
     '''
@@ -171,6 +207,14 @@ class SchemaCache:
         existing schema for the server from the cache and reacquires
         it.
         '''
+        return self.get_server_schema(url, conn, force_update).schema
+
+    def get_server_schema(self, url, conn, force_update=False):
+        '''
+        Return _ServerSchema belonging to a specific LDAP server.
+
+        See get_schema.
+        '''
 
         if force_update:
             self.flush(url)
@@ -180,7 +224,7 @@ class SchemaCache:
             schema = self._retrieve_schema_from_server(url, conn)
             server_schema = _ServerSchema(url, schema)
             self.servers[url] = server_schema
-        return server_schema.schema
+        return server_schema
 
     def flush(self, url):
         logger.debug('flushing %s from SchemaCache', url)
@@ -335,6 +379,42 @@ class LDAPEntry(MutableMapping):
     def copy(self):
         return LDAPEntry(self)
 
+    def _load_result(self, attrs):
+        """
+        Initialize attributes from a python-ldap search result.
+
+        The raw value lists are shared with the original values used by
+        generate_modlist() and are only copied when they are modified.
+        Nice values are decoded on first access.
+        """
+        for name, value in attrs.items():
+            name = self._add_attr_name(self._attr_name(name))
+            self._raw[name] = value
+            self._nice[name] = None
+            self._orig_raw[name] = value
+
+    def _own_raw(self, name):
+        # copy-on-write of raw values shared with _orig_raw
+        raw = self._raw[name]
+        if raw is self._orig_raw.get(name):
+            raw = self._raw[name] = list(raw)
+        return raw
+
+    def _decode_attr(self, name, raw):
+        nice = []
+        seen = set()
+        for value in raw:
+            if value in seen:
+                continue
+            seen.add(value)
+            try:
+                value = self._conn.decode(value, name)
+            except ValueError as e:
+                raise ValueError("{error} in LDAP entry '{dn}'".format(
+                    error=e, dn=self._dn))
+            nice.append(value)
+        return nice
+
     def _sync_attr(self, name):
         nice = self._nice[name]
         assert isinstance(nice, list)
@@ -342,10 +422,21 @@ class LDAPEntry(MutableMapping):
         raw = self._raw[name]
         assert isinstance(raw, list)
 
+        if name not in self._sync and not nice:
+            # fast path for values which were not decoded yet; decoded
+            # values are immutable, so shallow copies suffice
+            nice.extend(self._decode_attr(name, raw))
+            self._sync[name] = (list(nice), list(raw))
+            if len(nice) > 1:
+                self._not_list.discard(name)
+            return
+
         nice_sync, raw_sync = self._sync.setdefault(name, ([], []))
         if nice == nice_sync and raw == raw_sync:
             return
 
+        raw = self._own_raw(name)
+
         nice_adds = set(nice) - set(nice_sync)
         nice_dels = set(nice_sync) - set(nice)
         raw_adds = set(raw) - set(raw_sync)
@@ -403,18 +494,8 @@ class LDAPEntry(MutableMapping):
         if name in self._names:
             return self._names[name]
 
-        if self._conn.schema is not None:
-            if six.PY2:
-                encoded_name = name.encode('utf-8')
-            else:
-                encoded_name = name
-            attrtype = self._conn.schema.get_obj(
-                ldap.schema.AttributeType, encoded_name)
-            if attrtype is not None:
-                for altname in attrtype.names:
-                    if six.PY2:
-                        altname = altname.decode('utf-8')
-                    self._names[altname] = name
+        for altname in self._conn.get_attribute_names(name):
+            self._names[altname] = name
 
         self._names[name] = name
 
@@ -508,7 +589,8 @@ class LDAPEntry(MutableMapping):
         if self._nice[name] is not None:
             self._sync_attr(name)
 
-        return value
+        # the caller may modify the returned list
+        return self._own_raw(name)
 
     def __getitem__(self, name):
         return self._get_nice(name)
@@ -796,6 +878,7 @@ class LDAPClient:
 
         self._has_schema = False
         self._schema = None
+        self._server_schema = None
 
         if ldap_uri is not None:
             self._conn = self._connect()
@@ -863,22 +946,30 @@ class LDAPClient:
         else:
             return None
 
-    def _get_schema(self):
+    def _get_server_schema(self):
         if self._no_schema:
             return None
 
         if not self._has_schema:
             try:
-                schema = schema_cache.get_schema(
+                server_schema = schema_cache.get_server_schema(
                     self.ldap_uri, self.conn,
                     force_update=self._force_schema_updates)
             except (errors.ExecutionError, IndexError):
-                schema = None
+                server_schema = None
 
             # bypass ldap2's locking
-            object.__setattr__(self, '_schema', schema)
+            object.__setattr__(self, '_server_schema', server_schema)
+            object.__setattr__(
+                self, '_schema',
+                server_schema.schema if server_schema is not None else None)
             object.__setattr__(self, '_has_schema', True)
 
+        return self._server_schema
+
+    def _get_schema(self):
+        if self._get_server_schema() is None:
+            return None
         return self._schema
 
     def _flush_schema(self):
@@ -909,6 +1000,7 @@ class LDAPClient:
         # bypass ldap2's locking
         object.__setattr__(self, '_has_schema', False)
         object.__setattr__(self, '_schema', None)
+        object.__setattr__(self, '_server_schema', None)
 
     def get_attribute_type(self, name_or_oid):
         if not self._decode_attrs:
@@ -922,12 +1014,13 @@ class LDAPClient:
         if name_or_oid in self._SYNTAX_OVERRIDE:
             return self._SYNTAX_OVERRIDE[name_or_oid]
 
-        schema = self._get_schema()
-        if schema is not None:
+        server_schema = self._get_server_schema()
+        if server_schema is not None:
             # Try to lookup the syntax in the schema returned by the server
-            obj = schema.get_obj(ldap.schema.AttributeType, name_or_oid)
-            if obj is not None and obj.syntax in self._SYNTAX_MAPPING:
-                return self._SYNTAX_MAPPING[obj.syntax]
+            syntax = server_schema.attribute_syntaxes.get(
+                _attribute_key(name_or_oid))
+            if syntax in self._SYNTAX_MAPPING:
+                return self._SYNTAX_MAPPING[syntax]
 
         return unicode
 
@@ -954,14 +1047,26 @@ class LDAPClient:
         if name_or_oid in self._SINGLE_VALUE_OVERRIDE:
             return self._SINGLE_VALUE_OVERRIDE[name_or_oid]
 
-        schema = self._get_schema()
-        if schema is not None:
-            obj = schema.get_obj(ldap.schema.AttributeType, name_or_oid)
-            if obj is not None:
-                return obj.single_value
+        server_schema = self._get_server_schema()
+        if server_schema is not None:
+            return server_schema.attribute_single_value.get(
+                _attribute_key(name_or_oid))
 
         return None
 
+    def get_attribute_names(self, name_or_oid):
+        """
+        Get all names of an attribute type.
+
+        Returns an empty tuple if the attribute is not in the schema.
+        """
+        server_schema = self._get_server_schema()
+        if server_schema is not None:
+            return server_schema.attribute_names.get(
+                _attribute_key(name_or_oid), ())
+
+        return ()
+
     def encode(self, val):
         """
         Encode attribute value to LDAP representation (str/bytes).
@@ -1063,10 +1168,7 @@ class LDAPClient:
                 continue
 
             ipa_entry = LDAPEntry(self, DN(original_dn))
-
-            for attr, original_values in original_attrs.items():
-                ipa_entry.raw[attr] = original_values
-            ipa_entry.reset_modlist()
+            ipa_entry._load_result(original_attrs)
 
             ipa_result.append(ipa_entry)
 
@@ -1464,7 +1566,8 @@ class LDAPClient:
     def find_entries(
             self, filter=None, attrs_list=None, base_dn=None,
             scope=ldap.SCOPE_SUBTREE, time_limit=None, size_limit=None,
-            paged_search=False, get_effective_rights=False):
+            paged_search=False, get_effective_rights=False,
+            sort_attrs=None):
         """
         Return a list of entries and indication of whether the results were
         truncated ([(dn, entry_attrs)], truncated) matching specified search
@@ -1482,6 +1585,8 @@ class LDAPClient:
                            (default unlimited)
         :param paged_search: search using paged results control
         :param get_effective_rights: use GetEffectiveRights control
+        :param sort_attrs: list of attributes the server sorts the entries
+                           by, using the server side sorting control
 
         :raises: errors.NotFound if result set is empty
                                  or base_dn doesn't exist
@@ -1510,9 +1615,13 @@ class LDAPClient:
         if attrs_list:
             attrs_list = [a.lower() for a in set(attrs_list)]
 
-        base_sctrls = []
+        # explicit server controls replace the connection defaults, keep them
+        base_sctrls = self._get_default_server_controls()
         if get_effective_rights:
             base_sctrls.append(self.__get_effective_rights_control())
+        if sort_attrs:
+            base_sctrls.append(
+                SSSRequestControl(True, ordering_rules=list(sort_attrs)))
 
         cookie = ''
         page_size = (size_limit if size_limit > 0 else 2000) - 1
@@ -1594,6 +1703,18 @@ class LDAPClient:
 
         return (res, truncated)
 
+    def _get_default_server_controls(self):
+        """
+        Get the server controls set as defaults on the connection
+        (e.g. the proxied authorization control of pooled connections).
+        """
+        try:
+            ctrls = self.conn.get_option(ldap.OPT_SERVER_CONTROLS)
+        except (ldap.LDAPError, ValueError):
+            return []
+        return [LDAPControl(oid, criticality, encodedControlValue=value)
+                for oid, criticality, value in ctrls or []]
+
     def __get_effective_rights_control(self):
         """Construct a GetEffectiveRights control for current user."""
         bind_dn = self.conn.whoami_s()[4:]
@@ -37,6 +37,13 @@ class ODSDBConnection(AbstractODSDBConnection):
         for row in cur:
             yield row
 
+    def get_hsm_keys(self):
+        cur = self._db.execute(
+            "SELECT DISTINCT kp.HSMkey_id "
+            "FROM keypairs AS kp "
+            "JOIN dnsseckeys AS dnsk ON kp.id = dnsk.keypair_id")
+        return {row[0] for row in cur}
+
 
 class ODSSignerConn(AbstractODSSignerConn):
     def read_cmd(self):
@@ -54,6 +54,13 @@ class ODSDBConnection(AbstractODSDBConnection):
             key['state'] = row['state']
             yield key
 
+    def get_hsm_keys(self):
+        cur = self._db.execute(
+            "SELECT DISTINCT hsmk.locator "
+            "FROM hsmKey AS hsmk "
+            "JOIN keyData AS kd ON hsmk.id = kd.hsmKeyId")
+        return {row[0] for row in cur}
+
 
 class ODSSignerConn(AbstractODSSignerConn):
     def read_cmd(self):
@@ -31,6 +31,10 @@ class AbstractODSDBConnection():
     def get_keys_for_zone(self, zone_id):
         """Returns a list of keys for the given zone_id."""
 
+    @abc.abstractmethod
+    def get_hsm_keys(self):
+        """Returns a set of HSM key ids used by any zone."""
+
     def close(self):
         """Closes the connection to the kasp database."""
         self._db.close()
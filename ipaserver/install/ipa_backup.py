@@ -19,14 +19,18 @@
 
 from __future__ import absolute_import, print_function
 
+import collections
+import concurrent.futures
 import logging
 import optparse  # pylint: disable=deprecated-module
 import os
 import shutil
+import subprocess
 import sys
 import tempfile
 import time
 import pwd
+import zlib
 
 import six
 
@@ -76,6 +80,151 @@ EOF
 """
 
 
+class ParallelGzipWriter:
+    """
+    File-like object compressing data with several threads.
+
+    The data is split into blocks which are compressed concurrently into
+    separate gzip members. A sequence of gzip members is a valid gzip
+    stream, which gzip and tar decompress as a whole.
+    """
+    block_size = 1024 * 1024
+
+    def __init__(self, fileobj, level=6, threads=None):
+        if threads is None:
+            threads = os.cpu_count() or 1
+        self.fileobj = fileobj
+        self.level = level
+        self.executor = concurrent.futures.ThreadPoolExecutor(threads)
+        # compressed blocks which were not written yet, in order
+        self.pending = collections.deque()
+        self.max_pending = 2 * threads
+        self.buffer = bytearray()
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+    def _compress(self, data):
+        # zlib releases the GIL while compressing
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED,
+                                      16 + zlib.MAX_WBITS)
+        return compressor.compress(data) + compressor.flush()
+
+    def _write_pending(self, limit):
+        while len(self.pending) > limit:
+            data = self.pending.popleft().result()
+            self.fileobj.write(data)
+            self.bytes_out += len(data)
+
+    def _submit(self, data):
+        self.pending.append(self.executor.submit(self._compress, data))
+        self._write_pending(self.max_pending)
+
+    def write(self, data):
+        self.bytes_in += len(data)
+        self.buffer += data
+        while len(self.buffer) >= self.block_size:
+            self._submit(bytes(self.buffer[:self.block_size]))
+            del self.buffer[:self.block_size]
+
+    def close(self):
+        if self.buffer or not self.bytes_in:
+            self._submit(bytes(self.buffer))
+            self.buffer = bytearray()
+        self._write_pending(0)
+        self.executor.shutdown()
+
+
+def archive_directory(args, filename, level=6, threads=None, encrypt=False,
+                      cwd=None):
+    """
+    Create compressed and optionally encrypted archive.
+
+    The output of the tar command ``args``, which must write the archive to
+    standard output, is compressed with ParallelGzipWriter and encrypted
+    with gpg on the fly, so the final archive is written to disk only once.
+
+    :returns: the name of the created file
+    """
+    start = time.time()
+    with tempfile.TemporaryFile() as tar_err, \
+            tempfile.TemporaryFile() as gpg_err:
+        gpg = None
+        if encrypt:
+            dest = filename + '.gpg'
+            gpg = subprocess.Popen(
+                [paths.GPG2, '--batch', '--default-recipient-self',
+                 '--output', dest, '--encrypt'],
+                stdin=subprocess.PIPE, stderr=gpg_err)
+            output = gpg.stdin
+        else:
+            dest = filename
+            output = open(dest, 'wb')
+
+        logger.debug('Starting external process')
+        logger.debug('args=%s', ' '.join(args))
+        tar = subprocess.Popen(
+            args, stdout=subprocess.PIPE, stderr=tar_err, cwd=cwd)
+        writer = ParallelGzipWriter(output, level, threads)
+        try:
+            while True:
+                data = tar.stdout.read(writer.block_size)
+                if not data:
+                    break
+                writer.write(data)
+            writer.close()
+        finally:
+            tar.stdout.close()
+            output.close()
+            tar_rc = tar.wait()
+            gpg_rc = gpg.wait() if gpg is not None else 0
+
+        if tar_rc != 0:
+            tar_err.seek(0)
+            raise admintool.ScriptError(
+                'tar returned non-zero code %d: %s' %
+                (tar_rc, tar_err.read().decode('utf-8', 'replace')))
+        if gpg_rc != 0:
+            gpg_err.seek(0)
+            raise admintool.ScriptError(
+                'gpg failed: %s' %
+                gpg_err.read().decode('utf-8', 'replace'))
+
+    elapsed = max(time.time() - start, 1e-6)
+    logger.info(
+        'Archived %.1f MiB into %.1f MiB in %.1f s (%.1f MiB/s)',
+        writer.bytes_in / 2.0**20, writer.bytes_out / 2.0**20, elapsed,
+        writer.bytes_in / 2.0**20 / elapsed)
+    return dest
+
+
+def compress_file(filename, level=6, threads=None):
+    """
+    Compress file in place with ParallelGzipWriter.
+    """
+    start = time.time()
+    dest = filename + '.gz'
+    try:
+        with open(filename, 'rb') as source, open(dest, 'wb') as output:
+            writer = ParallelGzipWriter(output, level, threads)
+            while True:
+                data = source.read(writer.block_size)
+                if not data:
+                    break
+                writer.write(data)
+            writer.close()
+    except Exception:
+        if os.path.exists(dest):
+            os.unlink(dest)
+        raise
+    os.rename(dest, filename)
+
+    elapsed = max(time.time() - start, 1e-6)
+    logger.info(
+        'Compressed %.1f MiB into %.1f MiB in %.1f s (%.1f MiB/s)',
+        writer.bytes_in / 2.0**20, writer.bytes_out / 2.0**20, elapsed,
+        writer.bytes_in / 2.0**20 / elapsed)
+
+
 def encrypt_file(filename, remove_original=True):
     source = filename
     dest = filename + '.gpg'
@@ -250,6 +399,16 @@ class Backup(admintool.AdminTool):
             "--online", dest="online", action="store_true",
             default=False,
             help="Perform the LDAP backups online, for data only.")
+        parser.add_option(
+            "--compress-level", dest="compress_level", type="int",
+            default=6,
+            help="Compression level of the backup, from 1 (fastest) to 9 "
+                 "(best compression)")
+        parser.add_option(
+            "--compress-threads", dest="compress_threads", type="int",
+            default=None,
+            help="Number of threads compressing the backup. Defaults to "
+                 "the number of CPUs.")
         parser.add_option(
             "--disable-role-check", dest="rolecheck", action="store_false",
             default=True,
@@ -286,6 +445,15 @@ class Backup(admintool.AdminTool):
             self.option_parser.error("You cannot specify --data "
                 "with --logs")
 
+        if not 1 <= options.compress_level <= 9:
+            self.option_parser.error(
+                "--compress-level must be between 1 and 9")
+
+        if options.compress_threads is not None and \
+                options.compress_threads < 1:
+            self.option_parser.error(
+                "--compress-threads must be a positive number")
+
     def run(self):
         options = self.options
         super(Backup, self).run()
@@ -640,48 +808,28 @@ class Backup(admintool.AdminTool):
         if options.logs:
             args.extend(verify_directories(self.logs))
 
-        result = run(args, raiseonerr=False)
-        if result.returncode != 0:
-            raise admintool.ScriptError('tar returned non-zero code %d: %s' %
-                                        (result.returncode, result.error_log))
-
-        # Backup the necessary directory structure. This is a separate
-        # call since we are using the '--no-recursion' flag to store
-        # the directory structure only, no files.
+        # Backup the necessary directory structure. '--no-recursion' applies
+        # to the names following it, so only the directories themselves are
+        # stored, no files.
         missing_directories = verify_directories(self.required_dirs)
-
         if missing_directories:
-            args = ['tar',
-                    '--exclude=%s' % paths.IPA_BACKUP_DIR,
-                    '--xattrs',
-                    '--selinux',
-                    '--no-recursion',
-                    '-rf',  # -r appends to an existing archive
-                    self.tarfile,
-                   ]
+            args.append('--no-recursion')
             args.extend(missing_directories)
 
-            result = run(args, raiseonerr=False)
-            if result.returncode != 0:
-                raise admintool.ScriptError(
-                    'tar returned non-zero code %d '
-                    'when adding directory structure: %s' %
-                    (result.returncode, result.error_log))
+        # The archive is compressed by compress_file_backup() once the
+        # services are running again.
+        result = run(args, raiseonerr=False)
+        if result.returncode != 0:
+            raise admintool.ScriptError('tar returned non-zero code %d: %s' %
+                                        (result.returncode, result.error_log))
 
     def compress_file_backup(self):
 
-        # Compress the archive. This is done separately, since 'tar' cannot
-        # append to a compressed archive.
+        # Compress the archive in place. Despite the name, files.tar is
+        # a compressed archive to preserve compatibility.
         if self.tarfile:
-            result = run([paths.GZIP, self.tarfile], raiseonerr=False)
-            if result.returncode != 0:
-                raise admintool.ScriptError(
-                    'gzip returned non-zero code %d '
-                    'when compressing the backup: %s' %
-                    (result.returncode, result.error_log))
-
-            # Rename the archive back to files.tar to preserve compatibility
-            os.rename(os.path.join(self.dir, 'files.tar.gz'), self.tarfile)
+            compress_file(self.tarfile, level=self.options.compress_level,
+                          threads=self.options.compress_threads)
 
     def create_header(self, data_only):
         '''
@@ -758,17 +906,14 @@ class Backup(admintool.AdminTool):
             )
 
         args = [
-            'tar', '--xattrs', '--selinux', '-czf', filename, '.'
+            'tar', '--xattrs', '--selinux', '-cf', '-', '.'
         ]
-        result = run(args, raiseonerr=False, cwd=self.dir)
-        if result.returncode != 0:
-            raise admintool.ScriptError(
-                'tar returned non-zero code %s: %s' %
-                (result.returncode, result.error_log)
-            )
         if encrypt:
             logger.info('Encrypting %s', filename)
-            filename = encrypt_file(filename)
+        filename = archive_directory(
+            args, filename, level=self.options.compress_level,
+            threads=self.options.compress_threads, encrypt=encrypt,
+            cwd=self.dir)
         try:
             shutil.move(self.header, backup_dir)
         except (IOError, OSError) as e:
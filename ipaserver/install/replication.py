@@ -19,6 +19,7 @@
 
 from __future__ import print_function, absolute_import
 
+import collections
 import logging
 import itertools
 
@@ -231,6 +232,224 @@ def get_ds_version(conn):
     return vendor_version
 
 
+REPL_INIT_ATTRS = ['cn', 'nsds5BeginReplicaRefresh',
+                   'nsds5replicaUpdateInProgress',
+                   'nsds5ReplicaLastInitStatus',
+                   'nsds5ReplicaLastInitStart',
+                   'nsds5ReplicaLastInitEnd']
+REPL_UPDATE_ATTRS = ['cn', 'nsds5replicaUpdateInProgress',
+                     'nsds5ReplicaLastUpdateStatus',
+                     'nsds5ReplicaLastUpdateStart',
+                     'nsds5ReplicaLastUpdateEnd']
+
+
+def _get_update_time(entry, attr):
+    # nsds5ReplicaLastUpdateStart/End is either a GMT time
+    # ending with Z or 0 (see 389-ds ticket 47836)
+    # Remove the Z and convert to int
+    try:
+        value = entry.single_value[attr]
+        if value.endswith('Z'):
+            value = value[:-1]
+        return int(value)
+    except (ValueError, TypeError, KeyError):
+        return 0
+
+
+class AgreementProgress:
+    """Progress of a total or incremental update of one agreement"""
+
+    INIT = 'init'
+    UPDATE = 'update'
+
+    def __init__(self, dn, kind):
+        assert isinstance(dn, DN)
+        assert kind in (self.INIT, self.UPDATE)
+        self.dn = dn
+        self.kind = kind
+        self.start = datetime.datetime.now()
+        self.done = False
+        self.error = 0
+        self.error_message = ''
+        self.status = None
+        self.in_progress = False
+
+    def __repr__(self):
+        return '<{} {} {}: {}>'.format(
+            type(self).__name__, self.kind, self.dn, self.state)
+
+    @property
+    def finished(self):
+        return self.done or bool(self.error)
+
+    @property
+    def elapsed(self):
+        return (datetime.datetime.now() - self.start).total_seconds()
+
+    @property
+    def state(self):
+        return (self.done, self.error, self.in_progress, self.status)
+
+    def update(self, entry):
+        """Evaluate agreement entry, return True if the state changed"""
+        old_state = self.state
+        if entry is None:
+            self.error = 1
+            self.error_message = 'Error reading status from agreement'
+        elif self.kind == self.INIT:
+            self._update_init(entry)
+        else:
+            self._update_update(entry)
+        return self.state != old_state
+
+    def _update_init(self, entry):
+        refresh = entry.single_value.get('nsds5BeginReplicaRefresh')
+        inprogress = entry.single_value.get('nsds5replicaUpdateInProgress')
+        status = entry.single_value.get('nsds5ReplicaLastInitStatus')
+        self.status = status
+        self.in_progress = bool(refresh)
+        if refresh or not status:
+            return
+        # refresh is done - check status
+        if status.find("replica busy") > -1:
+            self.done = True
+            self.error = 2
+            self.error_message = status
+        elif status.find("Total update succeeded") > -1:
+            self.done = True
+        elif inprogress and inprogress.lower() == 'true':
+            self.in_progress = True
+        else:
+            self.done = True
+            self.error = 1
+            self.error_message = status
+
+    def _update_update(self, entry):
+        inprogress = entry.single_value.get('nsds5replicaUpdateInProgress')
+        status = entry.single_value.get('nsds5ReplicaLastUpdateStatus')
+        start = _get_update_time(entry, 'nsds5ReplicaLastUpdateStart')
+        end = _get_update_time(entry, 'nsds5ReplicaLastUpdateEnd')
+        self.status = status
+        self.in_progress = bool(inprogress and inprogress.lower() == 'true')
+        # incremental update is done if inprogress is false and end >= start
+        self.done = bool(
+            inprogress and inprogress.lower() == 'false' and start <= end)
+        logger.debug("Replication Update in progress: %s: status: %s: "
+                     "start: %d: end: %d",
+                     inprogress, status, start, end)
+        if status:  # always check for errors
+            # status will usually be a number followed by a string
+            # number != 0 means error
+            # Since 389-ds-base 1.3.5 it is 'Error (%d) %s'
+            # so we need to remove a prefix string and parentheses
+            if status.startswith('Error '):
+                rc, msg = status[6:].split(' ', 1)
+                rc = rc.strip('()')
+            else:
+                rc, msg = status.split(' ', 1)
+            if rc != '0':
+                self.error = 1
+                self.error_message = msg
+                self.done = True
+
+
+class ReplicationMonitor:
+    """
+    Watch progress of several replication agreements over one connection.
+
+    The status attributes of agreements are computed by the replication
+    plugin when the entry is read, so changing status is announced neither
+    by persistent search nor by syncrepl. Instead all watched agreements are
+    read with a single search per round. Rounds start at a short interval
+    which backs off while nothing changes and is reset on every change.
+    """
+    min_interval = 0.1
+    max_interval = 2.0
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.agreements = collections.OrderedDict()
+
+    def watch(self, agmtdn, kind=AgreementProgress.UPDATE):
+        """Start watching agreement, return its AgreementProgress"""
+        progress = AgreementProgress(agmtdn, kind)
+        self.agreements[agmtdn] = progress
+        return progress
+
+    def _read_agreements(self):
+        attrs = set()
+        for progress in self.agreements.values():
+            if progress.kind == AgreementProgress.INIT:
+                attrs.update(REPL_INIT_ATTRS)
+            else:
+                attrs.update(REPL_UPDATE_ATTRS)
+        attrs = list(attrs)
+        if len(self.agreements) == 1:
+            dn = next(iter(self.agreements))
+            try:
+                return {dn: self.conn.get_entry(dn, attrs)}
+            except errors.NotFound:
+                return {}
+        try:
+            entries = self.conn.get_entries(
+                DN(('cn', 'mapping tree'), ('cn', 'config')),
+                ldap.SCOPE_SUBTREE,
+                "(|(objectclass=nsds5replicationagreement)"
+                "(objectclass=nsDSWindowsReplicationAgreement))",
+                attrs)
+        except errors.NotFound:
+            entries = []
+        return {entry.dn: entry for entry in entries}
+
+    def poll(self):
+        """Read all unfinished agreements, return those which changed"""
+        entries = self._read_agreements()
+        changed = []
+        for dn, progress in self.agreements.items():
+            if not progress.finished and progress.update(entries.get(dn)):
+                changed.append(progress)
+        return changed
+
+    def wait(self, timeout=600, callback=None, delay=0):
+        """Wait until all watched agreements finish
+
+        :param timeout: give up after this many seconds; agreements which
+            did not finish are marked as failed
+        :param callback: called with AgreementProgress of every unfinished
+            agreement after each round
+        :param delay: seconds to wait before the first round, to let
+            a just triggered update get going
+        :return: list of AgreementProgress in the order of watch()
+        """
+        deadline = time.time() + timeout
+        interval = self.min_interval
+        if delay:
+            time.sleep(delay)
+        while True:
+            unfinished = [p for p in self.agreements.values()
+                          if not p.finished]
+            if not unfinished:
+                break
+            changed = self.poll()
+            if callback is not None:
+                for progress in unfinished:
+                    callback(progress)
+            if all(p.finished for p in unfinished):
+                break
+            if time.time() >= deadline:
+                for progress in unfinished:
+                    if not progress.finished:
+                        progress.error = 1
+                        progress.error_message = 'timeout'
+                break
+            if changed:
+                interval = self.min_interval
+            else:
+                interval = min(interval * 2, self.max_interval)
+            time.sleep(min(interval, max(deadline - time.time(), 0)))
+        return list(self.agreements.values())
+
+
 class ReplicationManager:
     """Manage replication agreements
 
@@ -1053,126 +1272,73 @@ class ReplicationManager:
             logger.debug("Failed to remove referral value: %s", str(e))
 
     def check_repl_init(self, conn, agmtdn, start):
-        done = False
-        hasError = 0
-        attrlist = ['cn', 'nsds5BeginReplicaRefresh',
-                    'nsds5replicaUpdateInProgress',
-                    'nsds5ReplicaLastInitStatus',
-                    'nsds5ReplicaLastInitStart',
-                    'nsds5ReplicaLastInitEnd']
-        entry = conn.get_entry(agmtdn, attrlist)
-        if not entry:
-            print("Error reading status from agreement", agmtdn)
-            hasError = 1
+        progress = AgreementProgress(agmtdn, AgreementProgress.INIT)
+        progress.start = start
+        progress.update(conn.get_entry(agmtdn, REPL_INIT_ATTRS))
+        self._print_init_progress(progress, conn)
+        return progress.done, progress.error
+
+    def _print_init_progress(self, progress, conn):
+        if progress.error_message == 'timeout':
+            return
+        if progress.error and not progress.done:
+            print("Error reading status from agreement", progress.dn)
+        elif progress.error == 2:
+            print("[%s] reports: Replica Busy! Status: [%s]"
+                  % (conn.ldap_uri, progress.status))
+        elif progress.error:
+            print("\n[%s] reports: Update failed! Status: [%s]"
+                  % (conn.ldap_uri, progress.status))
+        elif progress.done:
+            print("\nUpdate succeeded")
         else:
-            refresh = entry.single_value.get('nsds5BeginReplicaRefresh')
-            inprogress = entry.single_value.get('nsds5replicaUpdateInProgress')
-            status = entry.single_value.get('nsds5ReplicaLastInitStatus')
-            if not refresh: # done - check status
-                if not status:
-                    print("No status yet")
-                elif status.find("replica busy") > -1:
-                    print("[%s] reports: Replica Busy! Status: [%s]"
-                          % (conn.ldap_uri, status))
-                    done = True
-                    hasError = 2
-                elif status.find("Total update succeeded") > -1:
-                    print("\nUpdate succeeded")
-                    done = True
-                elif inprogress.lower() == 'true':
-                    print("\nUpdate in progress yet not in progress")
-                else:
-                    print("\n[%s] reports: Update failed! Status: [%s]"
-                          % (conn.ldap_uri, status))
-                    hasError = 1
-                    done = True
-            else:
-                now = datetime.datetime.now()
-                d = now - start
-                sys.stdout.write('\r')
-                sys.stdout.write("Update in progress, %d seconds elapsed" % int(d.total_seconds()))
-                sys.stdout.flush()
-
-        return done, hasError
+            sys.stdout.write('\r')
+            sys.stdout.write("Update in progress, %d seconds elapsed"
+                             % int(progress.elapsed))
+            sys.stdout.flush()
 
     def check_repl_update(self, conn, agmtdn):
-        done = False
-        hasError = 0
-        error_message = ''
-        attrlist = ['cn', 'nsds5replicaUpdateInProgress',
-                    'nsds5ReplicaLastUpdateStatus', 'nsds5ReplicaLastUpdateStart',
-                    'nsds5ReplicaLastUpdateEnd']
-        entry = conn.get_entry(agmtdn, attrlist)
-        if not entry:
-            print("Error reading status from agreement", agmtdn)
-            hasError = 1
-        else:
-            inprogress = entry.single_value.get('nsds5replicaUpdateInProgress')
-            status = entry.single_value.get('nsds5ReplicaLastUpdateStatus')
-            try:
-                # nsds5ReplicaLastUpdateStart is either a GMT time
-                # ending with Z or 0 (see 389-ds ticket 47836)
-                # Remove the Z and convert to int
-                start = entry.single_value['nsds5ReplicaLastUpdateStart']
-                if start.endswith('Z'):
-                    start = start[:-1]
-                start = int(start)
-            except (ValueError, TypeError, KeyError):
-                start = 0
-            try:
-                # nsds5ReplicaLastUpdateEnd is either a GMT time
-                # ending with Z or 0 (see 389-ds ticket 47836)
-                # Remove the Z and convert to int
-                end = entry.single_value['nsds5ReplicaLastUpdateEnd']
-                if end.endswith('Z'):
-                    end = end[:-1]
-                end = int(end)
-            except (ValueError, TypeError, KeyError):
-                end = 0
-            # incremental update is done if inprogress is false and end >= start
-            done = inprogress and inprogress.lower() == 'false' and start <= end
-            logger.info("Replication Update in progress: %s: status: %s: "
-                        "start: %d: end: %d",
-                        inprogress, status, start, end)
-            if status: # always check for errors
-                # status will usually be a number followed by a string
-                # number != 0 means error
-                # Since 389-ds-base 1.3.5 it is 'Error (%d) %s'
-                # so we need to remove a prefix string and parentheses
-                if status.startswith('Error '):
-                    rc, msg = status[6:].split(' ', 1)
-                    rc = rc.strip('()')
-                else:
-                    rc, msg = status.split(' ', 1)
-                if rc != '0':
-                    hasError = 1
-                    error_message = msg
-                    done = True
-
-        return done, hasError, error_message
-
-    def wait_for_repl_init(self, conn, agmtdn):
-        done = False
-        haserror = 0
-        start = datetime.datetime.now()
-        while not done and not haserror:
-            time.sleep(1)  # give it a few seconds to get going
-            done, haserror = self.check_repl_init(conn, agmtdn, start)
+        progress = AgreementProgress(agmtdn, AgreementProgress.UPDATE)
+        progress.update(conn.get_entry(agmtdn, REPL_UPDATE_ATTRS))
+        return progress.done, progress.error, progress.error_message
+
+    def wait_for_agreements(self, conn, agmtdns,
+                            kind=AgreementProgress.UPDATE, timeout=600,
+                            callback=None):
+        """Wait for total or incremental update of several agreements
+
+        All agreements are monitored at once over the connection ``conn``.
+
+        :return: list of AgreementProgress, one for each agreement
+        """
+        monitor = ReplicationMonitor(conn)
+        for agmtdn in agmtdns:
+            monitor.watch(agmtdn, kind)
+        # an incremental update may not be in progress yet right after
+        # it was requested, give it a second to get going
+        delay = 1 if kind == AgreementProgress.UPDATE else 0
+        return monitor.wait(timeout, callback, delay=delay)
+
+    def wait_for_repl_init(self, conn, agmtdn, timeout=None):
+        def callback(progress):
+            self._print_init_progress(progress, conn)
+
+        if timeout is None:
+            # a total update has no time limit
+            timeout = float('inf')
+        progress, = self.wait_for_agreements(
+            conn, [agmtdn], AgreementProgress.INIT, timeout, callback)
         print("")
-        return haserror
+        return progress.error
 
     def wait_for_repl_update(self, conn, agmtdn, maxtries=600):
-        done = False
-        haserror = 0
-        error_message = ''
-        while not done and not haserror and maxtries > 0:
-            time.sleep(1)  # give it a few seconds to get going
-            done, haserror, error_message = self.check_repl_update(conn, agmtdn)
-            maxtries -= 1
-        if maxtries == 0: # too many tries
+        progress, = self.wait_for_agreements(
+            conn, [agmtdn], AgreementProgress.UPDATE, maxtries)
+        if progress.error_message == 'timeout':  # too many tries
             print("Error: timeout: could not determine agreement status: please check your directory server logs for possible errors")
-            haserror = 1
-        return haserror, error_message
+        elif progress.error and not progress.done:
+            print("Error reading status from agreement", agmtdn)
+        return progress.error, progress.error_message
 
     def start_replication(self, conn, hostname=None, master=None):
         print("Starting replication, please wait until this has completed.")
@@ -24,19 +24,25 @@ import re
 import time
 from copy import deepcopy
 import base64
+import json
+from collections import OrderedDict
 
 import six
+from ldap.filter import escape_filter_chars
 
 from ipalib import api, crud, errors
 from ipalib import Method, Object
+from ipalib.plugable import Plugin
 from ipalib import Flag, Int, Str
 from ipalib.cli import to_cli
 from ipalib import output
 from ipalib.text import _
 from ipalib.util import json_serialize, validate_hostname
 from ipalib.capabilities import client_has_capability
-from ipalib.messages import add_message, SearchResultTruncated
-from ipapython.dn import DN, RDN
+from ipalib.messages import (
+    add_message, SearchResultTruncated, SearchResultPaged)
+from ipalib.request import context
+from ipapython.dn import DN, RDN, rdn_key
 from ipapython.version import API_VERSION
 
 if six.PY3:
@@ -44,6 +50,13 @@ if six.PY3:
 
 DNA_MAGIC = -1
 
+# Maximum number of member values whose conversion to a primary key is
+# remembered for the duration of a command
+MEMBER_CACHE_SIZE = 100000
+
+# Number of entries whose indirect members are retrieved with one search
+INDIRECT_MEMBERS_CHUNK = 100
+
 global_output_params = (
     Flag('has_password',
         label=_('Password'),
@@ -578,6 +591,8 @@ class LDAPObject(Object):
     label_singular = _('Entry')
     managed_permissions = {}
 
+    _member_containers = Plugin.finalize_attr('_member_containers')
+
     container_not_found_msg = _('container entry (%(container)s) not found')
     parent_not_found_msg = _('%(parent)s: %(oname)s not found')
     object_not_found_msg = _('%(pkey)s: %(oname)s not found')
@@ -649,12 +664,79 @@ class LDAPObject(Object):
         oc = [x.lower() for x in classes]
         return objectclass.lower() in oc
 
+    def _on_finalize(self):
+        super(LDAPObject, self)._on_finalize()
+        self._member_containers = self._get_member_containers()
+
+    def _get_member_containers(self):
+        """
+        Build an index of the containers of member objects.
+
+        For every member attribute, the containers of the member objects are
+        keyed by their RDNs in reverse order, so that the object a member DN
+        belongs to can be found with a dictionary lookup per container
+        length instead of comparing the DN against every container.
+        """
+        index = {}
+        for attr, ldap_obj_names in self.attribute_members.items():
+            containers = {}
+            for position, ldap_obj_name in enumerate(ldap_obj_names):
+                if ldap_obj_name not in self.api.Object:
+                    continue
+                container_dn = DN(self.api.Object[ldap_obj_name].container_dn,
+                                  self.api.env.basedn)
+                key = tuple(rdn_key(rdn) for rdn in reversed(container_dn.rdns))
+                containers.setdefault(key, (position, ldap_obj_name))
+            lengths = sorted(set(len(key) for key in containers))
+            index[attr] = (lengths, containers)
+        return index
+
+    def _get_member_object(self, attr, memberdn):
+        """
+        Return the name of the object whose container holds memberdn.
+
+        When the containers of several objects match, the object listed
+        first in attribute_members wins.
+        """
+        lengths, containers = self._member_containers[attr]
+        key = tuple(rdn_key(rdn) for rdn in reversed(memberdn.rdns))
+        match = None
+        for length in lengths:
+            if length > len(key):
+                break
+            candidate = containers.get(key[:length])
+            if candidate is not None and (match is None or candidate < match):
+                match = candidate
+        if match is None:
+            return None
+        return match[1]
+
+    def _get_member_cache(self):
+        """
+        Return the member conversion cache of the running command.
+
+        The cache is kept in the command frame, so it is dropped when the
+        command returns even in processes which never destroy the request
+        context (ipa-server-upgrade, scripts using api directly).
+        """
+        try:
+            frame = context.current_frame
+        except AttributeError:
+            # not called from a command, nothing to share the cache with
+            return OrderedDict()
+        try:
+            return frame.member_cache
+        except AttributeError:
+            frame.member_cache = OrderedDict()
+            return frame.member_cache
+
     def convert_attribute_members(self, entry_attrs, *keys, **options):
         if options.get('raw', False):
             return
 
-        container_dns = {}
         new_attrs = {}
+        # conversions done for previous entries in the same command
+        cache = self._get_member_cache()
 
         for attr in self.attribute_members:
             try:
@@ -664,84 +746,165 @@ class LDAPObject(Object):
             del entry_attrs[attr]
 
             for member in value:
-                memberdn = DN(member.decode('utf-8'))
-                for ldap_obj_name in self.attribute_members[attr]:
-                    ldap_obj = self.api.Object[ldap_obj_name]
-                    try:
-                        container_dn = container_dns[ldap_obj_name]
-                    except KeyError:
-                        container_dn = DN(ldap_obj.container_dn, api.env.basedn)
-                        container_dns[ldap_obj_name] = container_dn
-
-                    if memberdn.endswith(container_dn):
-                        new_value = ldap_obj.get_primary_key_from_dn(memberdn)
-                        new_attr_name = '%s_%s' % (attr, ldap_obj.name)
-                        try:
-                            new_attr = new_attrs[new_attr_name]
-                        except KeyError:
-                            new_attr = entry_attrs.setdefault(new_attr_name, [])
-                            new_attrs[new_attr_name] = new_attr
-                        new_attr.append(new_value)
-                        break
+                cache_key = (self.name, attr, member)
+                try:
+                    converted = cache[cache_key]
+                except KeyError:
+                    memberdn = DN(member.decode('utf-8'))
+                    ldap_obj_name = self._get_member_object(attr, memberdn)
+                    if ldap_obj_name is None:
+                        converted = None
+                    else:
+                        ldap_obj = self.api.Object[ldap_obj_name]
+                        converted = (
+                            '%s_%s' % (attr, ldap_obj.name),
+                            ldap_obj.get_primary_key_from_dn(memberdn)
+                        )
+                    if len(cache) >= MEMBER_CACHE_SIZE:
+                        cache.popitem(last=False)
+                    cache[cache_key] = converted
+
+                if converted is None:
+                    continue
+                new_attr_name, new_value = converted
+                try:
+                    new_attr = new_attrs[new_attr_name]
+                except KeyError:
+                    new_attr = entry_attrs.setdefault(new_attr_name, [])
+                    new_attrs[new_attr_name] = new_attr
+                new_attr.append(new_value)
 
     def get_indirect_members(self, entry_attrs, attrs_list):
-        if 'memberindirect' in attrs_list:
-            self.get_memberindirect(entry_attrs)
-        if 'memberofindirect' in attrs_list:
-            self.get_memberofindirect(entry_attrs)
+        self.get_indirect_members_bulk([entry_attrs], attrs_list)
 
-    def get_memberindirect(self, group_entry):
+    def get_indirect_members_bulk(self, entries, attrs_list):
         """
-        Get indirect members
+        Get indirect members and indirect memberships of several entries.
+
+        Indirect members of groups are searched in chunks of
+        INDIRECT_MEMBERS_CHUNK entries, so a page of search results costs a
+        few searches instead of one search per entry. Indirect memberships
+        are found with one search per chunk for the direct parents of its
+        entries and their memberships. Only an entry with a membership which
+        may also be reached through another parent group needs a search of
+        its own to tell whether the membership is direct.
         """
-
-        mo_filter = self.backend.make_filter({'memberof': group_entry.dn})
-        filter = self.backend.combine_filters(
-            ('(member=*)', mo_filter), self.backend.MATCH_ALL)
+        for i in range(0, len(entries), INDIRECT_MEMBERS_CHUNK):
+            chunk = entries[i:i + INDIRECT_MEMBERS_CHUNK]
+            if 'memberindirect' in attrs_list:
+                self._get_memberindirect(chunk)
+            if 'memberofindirect' in attrs_list:
+                self._get_memberofindirect(chunk)
+
+    def _search_member_entries(self, filter, attrs_list):
         try:
-            result = self.backend.get_entries(
+            return self.backend.get_entries(
                 self.api.env.basedn,
                 filter=filter,
-                attrs_list=['member'],
-                size_limit=-1, # paged search will get everything anyway
+                attrs_list=attrs_list,
+                size_limit=-1,  # paged search will get everything anyway
                 paged_search=True)
         except errors.NotFound:
-            result = []
+            return []
 
-        indirect = set()
-        for entry in result:
-            indirect.update(entry.raw.get('member', []))
-        indirect.difference_update(group_entry.raw.get('member', []))
+    def get_memberindirect(self, group_entry):
+        """
+        Get indirect members
+        """
+        self._get_memberindirect([group_entry])
 
-        if indirect:
-            group_entry.raw['memberindirect'] = list(indirect)
+    def _get_memberindirect(self, group_entries):
+        # groups nested in the given groups, keyed by the DN of the given
+        # group they belong to
+        indirect = dict(
+            (group_entry.dn, set()) for group_entry in group_entries
+        )
+
+        mo_filter = self.backend.make_filter(
+            {'memberof': [group_entry.dn for group_entry in group_entries]})
+        filter = self.backend.combine_filters(
+            ('(member=*)', mo_filter), self.backend.MATCH_ALL)
+        if len(group_entries) == 1:
+            # all nested groups belong to the only group
+            result = self._search_member_entries(filter, ['member'])
+            for entry in result:
+                for members in indirect.values():
+                    members.update(entry.raw.get('member', []))
+        else:
+            result = self._search_member_entries(
+                filter, ['member', 'memberof'])
+            for entry in result:
+                for memberof in entry.get('memberof', []):
+                    members = indirect.get(memberof)
+                    if members is not None:
+                        members.update(entry.raw.get('member', []))
+
+        for group_entry in group_entries:
+            members = indirect[group_entry.dn]
+            members.difference_update(group_entry.raw.get('member', []))
+            if members:
+                group_entry.raw['memberindirect'] = list(members)
 
     def get_memberofindirect(self, entry):
+        self._get_memberofindirect([entry])
 
-        dn = entry.dn
-        filter = self.backend.make_filter(
-            {'member': dn, 'memberuser': dn, 'memberhost': dn})
-        try:
-            result = self.backend.get_entries(
-                self.api.env.basedn,
-                filter=filter,
-                attrs_list=[''],
-                size_limit=-1,  # paged search will get everything anyway
-                paged_search=True)
-        except errors.NotFound:
-            result = []
+    def _get_memberofindirect(self, entries):
+        entries = [entry for entry in entries if entry.raw.get('memberof')]
+        if not entries:
+            # members of nothing, neither directly nor indirectly
+            return
 
-        direct = set()
-        indirect = set(entry.raw.get('memberof', []))
-        for group_entry in result:
-            dn = str(group_entry.dn).encode('utf-8')
-            if dn in indirect:
-                indirect.remove(dn)
-                direct.add(dn)
+        # entries having any of the given entries as a direct member, with
+        # their own memberships
+        filter = self.backend.make_filter({
+            attr: [entry.dn for entry in entries]
+            for attr in ('member', 'memberuser', 'memberhost')
+        })
+        parents = {}
+        for group_entry in self._search_member_entries(filter, ['memberof']):
+            parents[group_entry.dn] = set(
+                DN(value.decode('utf-8'))
+                for value in group_entry.raw.get('memberof', [])
+            )
+
+        for entry in entries:
+            memberof = [
+                (DN(value.decode('utf-8')), value)
+                for value in entry.raw['memberof']
+            ]
+            # the direct parents of the entry are among these
+            candidates = [dn for dn, _value in memberof if dn in parents]
+
+            direct_groups = None
+            direct = []
+            indirect = []
+            for dn, value in memberof:
+                if dn not in parents:
+                    # no entry of the chunk is its direct member
+                    is_direct = False
+                elif not any(dn in parents[other_dn]
+                             for other_dn in candidates if other_dn != dn):
+                    # not reachable through another group, so the entry
+                    # must be a direct member
+                    is_direct = True
+                else:
+                    if direct_groups is None:
+                        direct_groups = self._get_direct_parents(entry.dn)
+                    is_direct = dn in direct_groups
+                if is_direct:
+                    direct.append(value)
+                else:
+                    indirect.append(value)
 
-        entry.raw['memberof'] = list(direct)
-        if indirect:
-            entry.raw['memberofindirect'] = list(indirect)
+            entry.raw['memberof'] = direct
+            if indirect:
+                entry.raw['memberofindirect'] = indirect
+
+    def _get_direct_parents(self, dn):
+        filter = self.backend.make_filter(
+            {'member': dn, 'memberuser': dn, 'memberhost': dn})
+        result = self._search_member_entries(filter, [''])
+        return set(group_entry.dn for group_entry in result)
 
     def get_password_attributes(self, ldap, dn, entry_attrs):
         """
@@ -1667,6 +1830,39 @@ class LDAPModMember(LDAPQuery):
                         failed[attr][ldap_obj_name].append((name, unicode(e)))
         return (dns, failed)
 
+    def _collect_member_dns(self, objs):
+        """
+        Flatten member DNs of all member objects of one attribute.
+
+        Returns the list of DNs and a list of the names of the objects
+        they belong to.
+        """
+        m_dns = []
+        obj_names = []
+        for ldap_obj_name, obj_dns in objs.items():
+            for m_dn in obj_dns:
+                assert isinstance(m_dn, DN)
+                if not m_dn:
+                    continue
+                m_dns.append(m_dn)
+                obj_names.append(ldap_obj_name)
+        return (m_dns, obj_names)
+
+    def _report_failed_members(self, failed, m_dns, obj_names,
+                               member_failed):
+        """
+        Record (dn, exception) tuples returned by the ldap2 bulk member
+        methods in the failed dict of one attribute.
+        """
+        names = dict(zip(m_dns, obj_names))
+        for m_dn, e in member_failed:
+            ldap_obj_name = names[m_dn]
+            ldap_obj = self.api.Object[ldap_obj_name]
+            failed[ldap_obj_name].append((
+                ldap_obj.get_primary_key_from_dn(m_dn),
+                unicode(e),)
+            )
+
 
 class LDAPAddMember(LDAPModMember):
     """
@@ -1704,21 +1900,14 @@ class LDAPAddMember(LDAPModMember):
 
         completed = 0
         for (attr, objs) in member_dns.items():
-            for ldap_obj_name in objs:
-                for m_dn in member_dns[attr][ldap_obj_name]:
-                    assert isinstance(m_dn, DN)
-                    if not m_dn:
-                        continue
-                    try:
-                        ldap.add_entry_to_group(m_dn, dn, attr, allow_same=self.allow_same)
-                    except errors.PublicError as e:
-                        ldap_obj = self.api.Object[ldap_obj_name]
-                        failed[attr][ldap_obj_name].append((
-                            ldap_obj.get_primary_key_from_dn(m_dn),
-                            unicode(e),)
-                        )
-                    else:
-                        completed += 1
+            m_dns, obj_names = self._collect_member_dns(objs)
+            if not m_dns:
+                continue
+            add_failed = ldap.add_entries_to_group(
+                m_dns, dn, attr, allow_same=self.allow_same)
+            self._report_failed_members(
+                failed[attr], m_dns, obj_names, add_failed)
+            completed += len(m_dns) - len(add_failed)
 
         if options.get('all', False):
             attrs_list = ['*'] + self.obj.default_attributes
@@ -1802,21 +1991,13 @@ class LDAPRemoveMember(LDAPModMember):
 
         completed = 0
         for (attr, objs) in member_dns.items():
-            for ldap_obj_name, m_dns in objs.items():
-                for m_dn in m_dns:
-                    assert isinstance(m_dn, DN)
-                    if not m_dn:
-                        continue
-                    try:
-                        ldap.remove_entry_from_group(m_dn, dn, attr)
-                    except errors.PublicError as e:
-                        ldap_obj = self.api.Object[ldap_obj_name]
-                        failed[attr][ldap_obj_name].append((
-                            ldap_obj.get_primary_key_from_dn(m_dn),
-                            unicode(e),)
-                        )
-                    else:
-                        completed += 1
+            m_dns, obj_names = self._collect_member_dns(objs)
+            if not m_dns:
+                continue
+            remove_failed = ldap.remove_entries_from_group(m_dns, dn, attr)
+            self._report_failed_members(
+                failed[attr], m_dns, obj_names, remove_failed)
+            completed += len(m_dns) - len(remove_failed)
 
         if options.get('all', False):
             attrs_list = ['*'] + self.obj.default_attributes
@@ -1902,6 +2083,20 @@ class LDAPSearch(BaseLDAPCommand, crud.Search):
             minvalue=0,
             autofill=False,
         ),
+        Int('pagesize?',
+            label=_('Page Size'),
+            doc=_('Return results in pages of this many entries instead of '
+                  'applying the size limit (0 disables paging)'),
+            flags=['no_display'],
+            minvalue=0,
+            autofill=False,
+        ),
+        Str('continuation?',
+            label=_('Continuation'),
+            doc=_('Continue a paged search after the last page returned'),
+            flags=['no_display'],
+            autofill=False,
+        ),
     )
 
     def get_args(self):
@@ -2068,12 +2263,19 @@ class LDAPSearch(BaseLDAPCommand, crud.Search):
                 self, ldap, filter, attrs_list, base_dn, scope, *args, **options)
             assert isinstance(base_dn, DN)
 
+        continuation = None
+        find_entries = self._exc_wrapper(args, options, ldap.find_entries)
         try:
-            (entries, truncated) = self._exc_wrapper(args, options, ldap.find_entries)(
-                filter, attrs_list, base_dn, scope,
-                time_limit=options.get('timelimit', None),
-                size_limit=options.get('sizelimit', None)
-            )
+            if options.get('pagesize'):
+                (entries, truncated, continuation) = self._find_page(
+                    find_entries, ldap, filter, attrs_list, base_dn, scope,
+                    **options)
+            else:
+                (entries, truncated) = find_entries(
+                    filter, attrs_list, base_dn, scope,
+                    time_limit=options.get('timelimit', None),
+                    size_limit=options.get('sizelimit', None)
+                )
         except errors.EmptyResult:
             (entries, truncated) = ([], False)
         except errors.NotFound:
@@ -2085,7 +2287,7 @@ class LDAPSearch(BaseLDAPCommand, crud.Search):
                 self, ldap, entries, truncated, *args, **options
             )
 
-        if self.sort_result_entries:
+        if self.sort_result_entries or continuation is not None:
             if self.obj.primary_key:
                 def sort_key(x):
                     return self.obj.primary_key.sort_key(
@@ -2093,8 +2295,8 @@ class LDAPSearch(BaseLDAPCommand, crud.Search):
                 entries.sort(key=sort_key)
 
         if not options.get('raw', False):
+            self.obj.get_indirect_members_bulk(entries, attrs_list)
             for entry in entries:
-                self.obj.get_indirect_members(entry, attrs_list)
                 self.obj.convert_attribute_members(entry, *args, **options)
 
         for (i, e) in enumerate(entries):
@@ -2104,7 +2306,7 @@ class LDAPSearch(BaseLDAPCommand, crud.Search):
         result = dict(
             result=entries,
             count=len(entries),
-            truncated=bool(truncated),
+            truncated=bool(truncated or continuation),
         )
 
         try:
@@ -2113,8 +2315,76 @@ class LDAPSearch(BaseLDAPCommand, crud.Search):
             add_message(options['version'], result, SearchResultTruncated(
                 reason=exc))
 
+        if continuation:
+            add_message(options['version'], result, SearchResultPaged(
+                continuation=continuation))
+
         return result
 
+    def _encode_continuation(self, key):
+        data = json.dumps({'after': unicode(key)})
+        return base64.urlsafe_b64encode(data.encode('utf-8')).decode('ascii')
+
+    def _decode_continuation(self, continuation):
+        try:
+            data = base64.urlsafe_b64decode(continuation.encode('ascii'))
+            key = json.loads(data.decode('utf-8'))['after']
+            return self.obj.primary_key.convert(key)
+        except Exception:
+            raise errors.ValidationError(
+                name='continuation',
+                error=_('invalid continuation token'))
+
+    def _find_page(self, find_entries, ldap, filter, attrs_list, base_dn,
+                   scope, **options):
+        """
+        Search for one page of entries ordered by primary key.
+
+        The server sorts the matching entries by primary key and returns at
+        most one entry more than the page size, which tells whether another
+        page follows. A continuation token records the last primary key of
+        the page and the next page is searched with a filter for greater
+        primary keys only, so no state is kept between the requests and each
+        request transfers a single page. The page size replaces the size
+        limit.
+
+        Returns a tuple of the entries, the truncated flag and the
+        continuation token of the next page, or None for the last page.
+        """
+        pkey = self.obj.primary_key
+        if not pkey:
+            raise errors.ValidationError(
+                name='pagesize',
+                error=_('paged search is not supported for %(objects)s') %
+                dict(objects=self.obj.object_name_plural))
+        pagesize = options['pagesize']
+
+        if options.get('continuation'):
+            after = self._decode_continuation(options['continuation'])
+            filter = ldap.combine_filters(
+                (filter,
+                 '(%s>=%s)' % (pkey.name, escape_filter_chars(str(after))),
+                 ldap.make_filter_from_attr(pkey.name, after,
+                                            rules=ldap.MATCH_NONE)),
+                rules=ldap.MATCH_ALL
+            )
+
+        (entries, truncated) = find_entries(
+            filter, attrs_list + [pkey.name], base_dn, scope,
+            time_limit=options.get('timelimit', None),
+            size_limit=pagesize + 1,
+            sort_attrs=[pkey.name]
+        )
+        if len(entries) > pagesize:
+            # the size limit was hit by the extra entry, not by the server
+            del entries[pagesize:]
+            continuation = self._encode_continuation(
+                entries[-1][pkey.name][0])
+            truncated = False
+        else:
+            continuation = None
+        return (entries, truncated, continuation)
+
     def pre_callback(self, ldap, filters, attrs_list, base_dn, scope, *args, **options):
         assert isinstance(base_dn, DN)
         return (filters, base_dn, scope)
@@ -19,16 +19,20 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import logging
+import threading
+import time
 
 import six
+from six.moves import queue
 
 from ipalib import api, errors
 from ipalib import Command
+from ipalib.crud import Retrieve, Search
 from ipalib.frontend import Local
-from ipalib.parameters import Str, Dict
+from ipalib.parameters import Str, Dict, Flag
 from ipalib.output import Output
 from ipalib.text import _
-from ipalib.request import context
+from ipalib.request import context, destroy_context
 from ipalib.plugable import Registry
 from ipapython.version import API_VERSION
 
@@ -57,6 +61,12 @@ The format of the response is nested the same way.  At the top you will see
 
 And then a nested response for each IPA command method sent in the request
 
+When the "parallel" option is set and every nested method is a read-only
+show or find command, the methods are dispatched to a bounded pool of
+worker threads (see the batch_max_workers option in default.conf), each
+with its own LDAP connection bound with the caller's credentials.  Results
+are still returned in request order.
+
 """)
 
 if six.PY3:
@@ -88,6 +98,12 @@ class batch(Command):
         ),
     )
 
+    takes_options = (
+        Flag('parallel?',
+            doc=_('Execute read-only nested methods concurrently'),
+        ),
+    )
+
     has_output = (
         Output('count', int, doc=''),
         Output('results', (list, tuple), doc='')
@@ -157,53 +173,151 @@ class batch(Command):
             logger.debug('batch: %s',
                          ', '.join(super(batch, self)._repr_iter(**params)))
 
-    def execute(self, methods=None, **options):
-        results = []
-        for arg in (methods or []):
-            params = dict()
-            name = None
-            try:
-                self._validate_request(arg)
-                name = arg['method']
-                a, kw = arg['params']
-                newkw = dict((str(k), v) for k, v in kw.items())
-                params = api.Command[name].args_options_2_params(
-                    *a, **newkw)
-                newkw.setdefault('version', options['version'])
-
-                result = api.Command[name](*a, **newkw)
+    def _is_read_only(self, request):
+        """
+        Check whether a nested request may be run in a worker thread.
+
+        Only commands that retrieve or search entries qualify; anything
+        else could depend on the side effects of an earlier method in the
+        same batch.
+        """
+        try:
+            command = self.api.Command[request['method']]
+        except (KeyError, TypeError):
+            # let _execute_request() report the malformed request
+            return True
+        return isinstance(command, (Retrieve, Search))
+
+    def _execute_request(self, arg, version):
+        params = dict()
+        name = None
+        start = time.time()
+        try:
+            self._validate_request(arg)
+            name = arg['method']
+            a, kw = arg['params']
+            newkw = dict((str(k), v) for k, v in kw.items())
+            params = api.Command[name].args_options_2_params(
+                *a, **newkw)
+            newkw.setdefault('version', version)
+
+            result = api.Command[name](*a, **newkw)
+            logger.info(
+                '%s: batch: %s(%s): SUCCESS (%.3fs)',
+                getattr(context, 'principal', 'UNKNOWN'),
+                name,
+                ', '.join(api.Command[name]._repr_iter(**params)),
+                time.time() - start
+            )
+            result['error']=None
+        except Exception as e:
+            if (isinstance(e, errors.RequirementError) or
+                    isinstance(e, errors.CommandError) or
+                    isinstance(e, errors.ConversionError)):
                 logger.info(
-                    '%s: batch: %s(%s): SUCCESS',
-                    getattr(context, 'principal', 'UNKNOWN'),
-                    name,
-                    ', '.join(api.Command[name]._repr_iter(**params))
+                    '%s: batch: %s',
+                    context.principal,  # pylint: disable=no-member
+                    e.__class__.__name__
                 )
-                result['error']=None
-            except Exception as e:
-                if (isinstance(e, errors.RequirementError) or
-                        isinstance(e, errors.CommandError) or
-                        isinstance(e, errors.ConversionError)):
-                    logger.info(
-                        '%s: batch: %s',
-                        context.principal,  # pylint: disable=no-member
-                        e.__class__.__name__
-                    )
-                else:
-                    logger.info(
-                        '%s: batch: %s(%s): %s',
-                        context.principal, name,  # pylint: disable=no-member
-                        ', '.join(api.Command[name]._repr_iter(**params)),
-                        e.__class__.__name__
-                    )
-                if isinstance(e, errors.PublicError):
-                    reported_error = e
-                else:
-                    reported_error = errors.InternalError()
-                result = dict(
-                    error=reported_error.strerror,
-                    error_code=reported_error.errno,
-                    error_name=unicode(type(reported_error).__name__),
-                    error_kw=reported_error.kw,
+            else:
+                logger.info(
+                    '%s: batch: %s(%s): %s (%.3fs)',
+                    context.principal, name,  # pylint: disable=no-member
+                    ', '.join(api.Command[name]._repr_iter(**params)),
+                    e.__class__.__name__,
+                    time.time() - start
                 )
-            results.append(result)
+            if isinstance(e, errors.PublicError):
+                reported_error = e
+            else:
+                reported_error = errors.InternalError()
+            result = dict(
+                error=reported_error.strerror,
+                error_code=reported_error.errno,
+                error_name=unicode(type(reported_error).__name__),
+                error_kw=reported_error.kw,
+            )
+        return result
+
+    def _worker(self, requests, results, version, ccache, state):
+        """
+        Execute queued requests in a worker thread.
+
+        The thread-local request context is populated from the caller's
+        context and a private ldap2 connection is bound with the caller's
+        ccache for the lifetime of the worker. A worker which cannot
+        connect leaves its requests to the other workers and to the
+        calling thread.
+        """
+        for key, value in state.items():
+            setattr(context, key, value)
+        ldap = self.api.Backend.ldap2
+        try:
+            ldap.connect(ccache=ccache, size_limit=None, time_limit=None)
+        except Exception as e:
+            logger.error('batch: worker failed to connect: %s', e)
+            destroy_context()
+            return
+        try:
+            while True:
+                try:
+                    index, arg = requests.get_nowait()
+                except queue.Empty:
+                    break
+                results[index] = self._execute_request(arg, version)
+        finally:
+            destroy_context()
+
+    def _execute_parallel(self, methods, version):
+        ccache = getattr(context, 'ccache_name', None)
+        if ccache is None:
+            logger.debug('batch: no ccache in context, running sequentially')
+            return None
+        if not all(self._is_read_only(arg) for arg in methods):
+            logger.debug('batch: not all methods are read-only, '
+                         'running sequentially')
+            return None
+
+        # share the per-request state the nested commands rely on, but
+        # not the connections, which are private to the calling thread
+        state = dict(
+            (key, value) for key, value in context.__dict__.items()
+            if key in ('principal', 'languages', 'client_ip', 'ccache_name')
+        )
+
+        requests = queue.Queue()
+        for index, arg in enumerate(methods):
+            requests.put((index, arg))
+        results = [None] * len(methods)
+
+        workers = min(len(methods), max(1, self.api.env.batch_max_workers))
+        threads = []
+        start = time.time()
+        for i in range(workers):
+            thread = threading.Thread(
+                target=self._worker,
+                name='batch-worker-%d' % i,
+                args=(requests, results, version, ccache, state))
+            thread.start()
+            threads.append(thread)
+        for thread in threads:
+            thread.join()
+        logger.debug('batch: %d methods executed by %d workers in %.3fs',
+                     len(methods), workers, time.time() - start)
+
+        # requests not picked up by any worker run in the calling thread
+        for index, arg in enumerate(methods):
+            if results[index] is None:
+                results[index] = self._execute_request(arg, version)
+
+        return results
+
+    def execute(self, methods=None, **options):
+        methods = methods or []
+        results = None
+        if options.get('parallel') and len(methods) > 1:
+            results = self._execute_parallel(methods, options['version'])
+        if results is None:
+            results = [self._execute_request(arg, options['version'])
+                       for arg in methods]
         return dict(count=len(results) , results=results)
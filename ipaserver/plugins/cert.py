@@ -25,6 +25,7 @@ import datetime
 import itertools
 import logging
 from operator import attrgetter
+import threading
 
 import cryptography.x509
 from cryptography.hazmat.primitives import hashes, serialization
@@ -163,6 +164,13 @@ register = Registry()
 
 PKIDATE_FORMAT = '%Y-%m-%d'
 
+# Maximum number of certificates retrieved from the CA by cert_find --all
+# which are kept for the following searches. Certificates are immutable, the
+# cache key includes the status reported by the CA search.
+CERT_CACHE_SIZE = 10000
+_cert_cache = collections.OrderedDict()
+_cert_cache_lock = threading.Lock()
+
 
 def _acl_make_request(principal_type, principal, ca_id, profile_id):
     """Construct HBAC request for the given principal, CA and profile"""
@@ -1193,7 +1201,8 @@ def _san_ip_update_reachable(reachable, dnsname, cname_depth):
     """
     fqdn = dnsutil.DNSName(dnsname).make_absolute()
     try:
-        zone = dnsutil.DNSName(dnsutil.zone_for_name(fqdn))
+        zone = dnsutil.DNSName(dnsutil.zone_for_name(
+            fqdn, resolver=dnsutil.get_ipa_caching_resolver()))
     except resolver.NoNameservers:
         return  # if there's no zone, there are no records
     name = fqdn.relativize(zone)
@@ -1227,7 +1236,8 @@ def _ip_ptr_records(ip):
     """
     rname = dnsutil.DNSName(reversename.from_address(ip))
     try:
-        zone = dnsutil.DNSName(dnsutil.zone_for_name(rname))
+        zone = dnsutil.DNSName(dnsutil.zone_for_name(
+            rname, resolver=dnsutil.get_ipa_caching_resolver()))
         name = rname.relativize(zone)
         result = api.Command['dnsrecord_show'](zone, name)['result']
     except resolver.NoNameservers:
@@ -1725,6 +1735,45 @@ class cert_find(Search, CertMethod):
 
         return result, False, complete
 
+    def _get_certificates(self, items):
+        """
+        Retrieve certificates of CA search results from the CA
+
+        :param items: list of ((issuer, serial number), search result)
+        :return: dict of ``ra.get_certificate`` results by (issuer, serial
+                 number)
+        """
+        certs = {}
+        missing = []
+        for key, obj in items:
+            status = obj.get('status')
+            if status in (u'REVOKED', u'REVOKED_EXPIRED'):
+                # revocation reason may still change
+                cache_key = None
+            else:
+                cache_key = key + (status,)
+                with _cert_cache_lock:
+                    cert = _cert_cache.get(cache_key)
+                if cert is not None:
+                    certs[key] = cert
+                    continue
+            missing.append((key, cache_key))
+
+        fetched = self.api.Backend.ra.get_certificates(
+            [str(serial_number) for (_issuer, serial_number), _cache_key
+             in missing])
+
+        for (key, cache_key), cert in zip(missing, fetched):
+            certs[key] = cert
+            if cache_key is None:
+                continue
+            with _cert_cache_lock:
+                _cert_cache[cache_key] = cert
+                while len(_cert_cache) > CERT_CACHE_SIZE:
+                    _cert_cache.popitem(last=False)
+
+        return certs
+
     def _ldap_search(self, all, pkey_only, no_members, **options):
         ldap = self.api.Backend.ldap2
 
@@ -1874,14 +1923,22 @@ class cert_find(Search, CertMethod):
             truncated = truncated or sub_truncated
             complete = complete or sub_complete
 
+        result = list(six.iteritems(result))
+        if (len(result) > sizelimit > 0):
+            if not truncated:
+                self.add_message(messages.SearchResultTruncated(
+                        reason=errors.SizeLimitExceeded()))
+            result = result[:sizelimit]
+            truncated = True
+
         if not pkey_only:
             ca_objs = {}
-            if ca_enabled:
-                ra = self.api.Backend.ra
+            if all and ca_enabled:
+                certs = self._get_certificates(
+                    [(key, obj) for key, obj in result if 'cacn' in obj])
 
-            for key, obj in six.iteritems(result):
+            for key, obj in result:
                 if all and 'cacn' in obj:
-                    _issuer, serial_number = key
                     cacn = obj['cacn']
 
                     try:
@@ -1890,7 +1947,7 @@ class cert_find(Search, CertMethod):
                         ca_obj = ca_objs[cacn] = (
                             self.api.Command.ca_show(cacn, all=True)['result'])
 
-                    obj.update(ra.get_certificate(str(serial_number)))
+                    obj.update(certs[key])
                     if not raw:
                         obj['certificate'] = (
                             obj['certificate'].replace('\r\n', ''))
@@ -1910,13 +1967,7 @@ class cert_find(Search, CertMethod):
                         obj.pop('certificate', None)
                     self.obj._fill_owners(obj)
 
-        result = list(six.itervalues(result))
-        if (len(result) > sizelimit > 0):
-            if not truncated:
-                self.add_message(messages.SearchResultTruncated(
-                        reason=errors.SizeLimitExceeded()))
-            result = result[:sizelimit]
-            truncated = True
+        result = [obj for _key, obj in result]
 
         ret = dict(
             result=result
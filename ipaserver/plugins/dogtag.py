@@ -241,6 +241,7 @@ digits and nothing else follows.
 
 from __future__ import absolute_import
 
+import concurrent.futures
 import json
 import logging
 
@@ -1113,6 +1114,12 @@ from ipaplatform.paths import paths
 register = Registry()
 
 
+# Number of seconds a REST API session is reused when the CA does not
+# announce the expiration of the session cookie. Dogtag expires idle
+# sessions after 30 minutes.
+REST_SESSION_LIFETIME = 900
+
+
 class RestClient(Backend):
     """Simple Dogtag REST client to be subclassed by other backends.
 
@@ -1128,6 +1135,9 @@ class RestClient(Backend):
             # REST client is now logged in
             profile_api.create_profile(...)
 
+    The session and the HTTPS connections are kept after the ``with`` suite
+    and reused by the following operations until the session expires.
+
     """
     DEFAULT_PROFILE = dogtag.DEFAULT_PROFILE
     KDC_PROFILE = dogtag.KDC_PROFILE
@@ -1158,6 +1168,7 @@ class RestClient(Backend):
         # session cookie
         self.override_port = None
         self.cookie = None
+        self.cookie_expiration = None
 
     @property
     def ca_host(self):
@@ -1184,10 +1195,18 @@ class RestClient(Backend):
         return ca_host
 
     def __enter__(self):
-        """Log into the REST API"""
-        if self.cookie is not None:
-            return None
+        """Log into the REST API unless there is a live session"""
+        if self.cookie is not None and time.time() < self.cookie_expiration:
+            return self
+
+        self.login()
+        return self
 
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Keep the session for the next operation"""
+
+    def login(self):
+        """Log into the REST API"""
         # Refresh the ca_host property
         object.__setattr__(self, '_ca_host', None)
 
@@ -1197,25 +1216,38 @@ class RestClient(Backend):
             cafile=self.ca_cert,
             client_certfile=self.client_certfile,
             client_keyfile=self.client_keyfile,
-            method='GET'
+            method='GET',
+            keep_alive=True
         )
         cookies = ipapython.cookie.Cookie.parse(resp_headers.get('set-cookie', ''))
         if status != 200 or len(cookies) == 0:
             raise errors.RemoteRetrieveError(reason=_('Failed to authenticate to CA REST API'))
+
+        expiration = time.time() + REST_SESSION_LIFETIME
+        cookie_expiration = cookies[0].get_expiration()
+        if cookie_expiration is not None:
+            expiration = min(
+                expiration,
+                ipapython.cookie.Cookie.datetime_to_time(cookie_expiration))
         object.__setattr__(self, 'cookie', str(cookies[0]))
-        return self
+        object.__setattr__(self, 'cookie_expiration', expiration)
 
-    def __exit__(self, exc_type, exc_value, traceback):
+    def logout(self):
         """Log out of the REST API"""
+        if self.cookie is None:
+            return
         dogtag.https_request(
             self.ca_host, self.override_port or self.env.ca_agent_port,
             url='/ca/rest/account/logout',
             cafile=self.ca_cert,
             client_certfile=self.client_certfile,
             client_keyfile=self.client_keyfile,
-            method='GET'
+            method='GET',
+            headers={'Cookie': self.cookie},
+            keep_alive=True
         )
         object.__setattr__(self, 'cookie', None)
+        object.__setattr__(self, 'cookie_expiration', None)
 
     def _ssldo(self, method, path, headers=None, body=None, use_session=True):
         """
@@ -1250,15 +1282,25 @@ class RestClient(Backend):
         if path is not None:
             resource = os.path.join(resource, path)
 
+        def request():
+            return dogtag.https_request(
+                self.ca_host, self.override_port or self.env.ca_agent_port,
+                url=resource,
+                cafile=self.ca_cert,
+                client_certfile=self.client_certfile,
+                client_keyfile=self.client_keyfile,
+                method=method, headers=headers, body=body,
+                keep_alive=True
+            )
+
         # perform main request
-        status, resp_headers, resp_body = dogtag.https_request(
-            self.ca_host, self.override_port or self.env.ca_agent_port,
-            url=resource,
-            cafile=self.ca_cert,
-            client_certfile=self.client_certfile,
-            client_keyfile=self.client_keyfile,
-            method=method, headers=headers, body=body
-        )
+        status, resp_headers, resp_body = request()
+        if use_session and status == 401:
+            # the CA has dropped the reused session, log in again
+            logger.debug("REST API session expired, logging in again")
+            self.login()
+            headers['Cookie'] = self.cookie
+            status, resp_headers, resp_body = request()
         if status < 200 or status >= 300:
             explanation = self._parse_dogtag_error(resp_body) or ''
             raise errors.HTTPRequestError(
@@ -1322,6 +1364,7 @@ class ra(rabase.rabase, RestClient):
             cafile=self.ca_cert,
             client_certfile=self.client_certfile,
             client_keyfile=self.client_keyfile,
+            keep_alive=True,
             **kw)
 
     def get_parse_result_xml(self, xml_text, parse_func):
@@ -1416,6 +1459,26 @@ class ra(rabase.rabase, RestClient):
 
         return cmd_result
 
+    def get_certificates(self, serial_numbers):
+        """
+        Retrieve several existing certificates.
+
+        The certificates are retrieved concurrently over pooled connections,
+        see `get_certificate` for the result of a single certificate.
+
+        :param serial_numbers: Sequence of certificate serial numbers.
+        :return: list of results in the order of ``serial_numbers``
+        """
+        if len(serial_numbers) < 2:
+            return [self.get_certificate(s) for s in serial_numbers]
+
+        # Resolve the CA host in this thread, it needs the LDAP connection
+        # of the current request.
+        self.ca_host  # pylint: disable=pointless-statement
+        max_workers = min(len(serial_numbers), dogtag.connection_pool.maxsize)
+        with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+            return list(executor.map(self.get_certificate, serial_numbers))
+
     def get_certificate(self, serial_number):
         """
         Retrieve an existing certificate.
@@ -1821,7 +1884,8 @@ class ra(rabase.rabase, RestClient):
             headers={'Accept-Encoding': 'gzip, deflate',
                      'User-Agent': 'IPA',
                      'Content-Type': 'application/xml'},
-            body=payload
+            body=payload,
+            keep_alive=True
         )
 
         if status != 200:
@@ -1923,6 +1987,9 @@ class kra(Backend):
     def __init__(self, api, kra_port=443):
         self.kra_port = kra_port
         super(kra, self).__init__(api)
+        # (host, PKIConnection) reused by get_client() to keep the HTTPS
+        # connection alive between operations
+        self._connection = None
 
     @property
     def kra_host(self):
@@ -1945,6 +2012,29 @@ class kra(Backend):
             kra_host = api.env.ca_host
         return kra_host
 
+    def _get_connection(self):
+        kra_host = self.kra_host
+        if self._connection is not None:
+            host, connection = self._connection
+            if host == kra_host:
+                return connection
+
+        # TODO: obtain KRA host & port from IPA service list or point to KRA load balancer
+        # https://fedorahosted.org/freeipa/ticket/4557
+        connection = PKIConnection(
+            'https',
+            kra_host,
+            str(self.kra_port),
+            'kra',
+            cert_paths=paths.IPA_CA_CRT
+        )
+
+        connection.set_authentication_cert(paths.RA_AGENT_PEM,
+                                           paths.RA_AGENT_KEY)
+        # object is locked, need to use __setattr__()
+        object.__setattr__(self, '_connection', (kra_host, connection))
+        return connection
+
     @contextlib.contextmanager
     def get_client(self):
         """
@@ -1963,20 +2053,8 @@ class kra(Backend):
             tempdb.secdir,
             password_file=tempdb.pwd_file)
 
-        # TODO: obtain KRA host & port from IPA service list or point to KRA load balancer
-        # https://fedorahosted.org/freeipa/ticket/4557
-        connection = PKIConnection(
-            'https',
-            self.kra_host,
-            str(self.kra_port),
-            'kra',
-            cert_paths=paths.IPA_CA_CRT
-        )
-
-        connection.set_authentication_cert(paths.RA_AGENT_PEM,
-                                           paths.RA_AGENT_KEY)
-
         try:
+            connection = self._get_connection()
             yield KRAClient(connection, crypto)
         finally:
             tempdb.close()
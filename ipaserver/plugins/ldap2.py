@@ -31,8 +31,12 @@ from __future__ import absolute_import
 
 import logging
 import os
+import threading
+import time
 
+import gssapi.raw
 import ldap as _ldap
+from ldap.controls.simple import ProxyAuthzControl
 
 from ipalib import krb_utils
 from ipaplatform.paths import paths
@@ -50,6 +54,141 @@ register = Registry()
 
 _missing = object()
 
+# credential cache used by pooled connections to bind as the framework
+# service; gssproxy provides the service credentials
+POOL_CCACHE = 'MEMORY:ipa_ldap_pool'
+
+
+class LDAPConnectionPool:
+    """
+    Per-process pool of LDAP connections bound as the framework service.
+
+    Requests borrow a connection and act as the requesting principal by
+    the means of the proxied authorization control (RFC 4370) instead of
+    performing a SASL bind of their own.
+    """
+    # connections idle for longer than this are checked before reuse
+    check_interval = 30
+
+    def __init__(self, maxsize, idle_timeout, connection_factory):
+        self.maxsize = maxsize
+        self.idle_timeout = idle_timeout
+        self.pid = os.getpid()
+        self._factory = connection_factory
+        self._lock = threading.Lock()
+        self._idle = []
+        self._in_use = {}
+        self._principal_dns = {}
+        self._stats = dict(created=0, reused=0, evicted=0, failed_checks=0)
+
+    def _close(self, client):
+        try:
+            client.conn.unbind_s()
+        except _ldap.LDAPError:
+            pass
+
+    def _check(self, client):
+        try:
+            client.conn.whoami_s()
+        except _ldap.LDAPError as e:
+            logger.debug("Dropping pooled LDAP connection: %s", e)
+            return False
+        return True
+
+    def _pop_idle(self, now):
+        """
+        Get the most recently used idle connection, evicting expired ones.
+        """
+        expired = []
+        with self._lock:
+            while self._idle and now - self._idle[0][1] > self.idle_timeout:
+                expired.append(self._idle.pop(0)[0])
+            self._stats['evicted'] += len(expired)
+            item = self._idle.pop() if self._idle else None
+        for client in expired:
+            self._close(client)
+        return item
+
+    def acquire(self):
+        """
+        Get a bound LDAP client, reusing an idle connection if possible.
+        """
+        now = time.time()
+        item = self._pop_idle(now)
+        while item is not None:
+            client, last_used = item
+            if now - last_used < self.check_interval or self._check(client):
+                with self._lock:
+                    self._stats['reused'] += 1
+                    self._in_use[id(client.conn)] = client
+                return client
+            self._close(client)
+            with self._lock:
+                self._stats['failed_checks'] += 1
+            item = self._pop_idle(now)
+
+        client = self._factory()
+        with self._lock:
+            self._stats['created'] += 1
+            self._in_use[id(client.conn)] = client
+        return client
+
+    def release(self, conn, discard=False):
+        """
+        Return a connection to the pool.
+
+        Returns False when the connection does not belong to the pool.
+        """
+        with self._lock:
+            client = self._in_use.pop(id(conn), None)
+            if client is None:
+                return False
+            discard = discard or len(self._idle) >= self.maxsize
+
+        if not discard:
+            try:
+                conn.set_option(_ldap.OPT_SERVER_CONTROLS, [])
+            except _ldap.LDAPError:
+                discard = True
+
+        if discard:
+            self._close(client)
+        else:
+            with self._lock:
+                self._idle.append((client, time.time()))
+        return True
+
+    def get_principal_dn(self, principal):
+        with self._lock:
+            dn, expires = self._principal_dns.get(principal, (None, 0))
+        if expires < time.time():
+            return None
+        return dn
+
+    def set_principal_dn(self, principal, dn):
+        with self._lock:
+            self._principal_dns[principal] = (
+                dn, time.time() + self.idle_timeout)
+
+    def clear(self):
+        """
+        Close all idle connections.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._principal_dns.clear()
+        for client, _last_used in idle:
+            self._close(client)
+
+    def stats(self):
+        """
+        Get pool metrics.
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats.update(idle=len(self._idle), in_use=len(self._in_use))
+        return stats
+
 
 @register()
 class ldap2(CrudBackend, LDAPClient):
@@ -66,6 +205,7 @@ class ldap2(CrudBackend, LDAPClient):
 
         self._time_limit = float(LDAPClient.time_limit)
         self._size_limit = int(LDAPClient.size_limit)
+        self._pool = None
 
     @property
     def ldap_uri(self):
@@ -153,23 +293,18 @@ class ldap2(CrudBackend, LDAPClient):
         if size_limit is not _missing:
             object.__setattr__(self, 'size_limit', size_limit)
 
-        client = LDAPClient(self.ldap_uri,
-                            force_schema_updates=self._force_schema_updates,
-                            cacert=cacert)
-        conn = client._conn
+        ldapi = self.ldap_uri.startswith('ldapi://')
 
-        with client.error_handler():
-            minssf = conn.get_option(_ldap.OPT_X_SASL_SSF_MIN)
-            maxssf = conn.get_option(_ldap.OPT_X_SASL_SSF_MAX)
-            # Always connect with at least an SSF of 56, confidentiality
-            # This also protects us from a broken ldap.conf
-            if minssf < 56:
-                minssf = 56
-                conn.set_option(_ldap.OPT_X_SASL_SSF_MIN, minssf)
-                if maxssf < minssf:
-                    conn.set_option(_ldap.OPT_X_SASL_SSF_MAX, minssf)
+        if (ccache is not None and not bind_pw and ldapi and
+                not serverctrls and not clientctrls and
+                self.api.env.ldap_pool_size > 0 and
+                (autobind == AUTOBIND_DISABLED or os.getegid() != 0)):
+            conn = self._get_proxied_connection(ccache, cacert)
+            if conn is not None:
+                return conn
 
-        ldapi = self.ldap_uri.startswith('ldapi://')
+        client = self._new_client(cacert)
+        conn = client._conn
 
         if bind_pw:
             client.simple_bind(bind_dn, bind_pw,
@@ -201,11 +336,102 @@ class ldap2(CrudBackend, LDAPClient):
 
         return conn
 
+    def _new_client(self, cacert):
+        client = LDAPClient(self.ldap_uri,
+                            force_schema_updates=self._force_schema_updates,
+                            cacert=cacert)
+        conn = client._conn
+
+        with client.error_handler():
+            minssf = conn.get_option(_ldap.OPT_X_SASL_SSF_MIN)
+            maxssf = conn.get_option(_ldap.OPT_X_SASL_SSF_MAX)
+            # Always connect with at least an SSF of 56, confidentiality
+            # This also protects us from a broken ldap.conf
+            if minssf < 56:
+                minssf = 56
+                conn.set_option(_ldap.OPT_X_SASL_SSF_MIN, minssf)
+                if maxssf < minssf:
+                    conn.set_option(_ldap.OPT_X_SASL_SSF_MAX, minssf)
+
+        return client
+
+    def _new_pool_client(self, cacert):
+        client = self._new_client(cacert)
+        with client.error_handler():
+            client.conn.set_option(_ldap.OPT_HOST_NAME, self.api.env.host)
+
+        # unlike KRB5CCNAME, which is shared by all threads of the process,
+        # the GSSAPI default ccache name is thread specific
+        ccache = gssapi.raw.krb5_ccache_name(POOL_CCACHE.encode('utf-8'))
+        try:
+            client.gssapi_bind()
+        finally:
+            gssapi.raw.krb5_ccache_name(ccache)
+        return client
+
+    def _get_pool(self, cacert):
+        pool = self._pool
+        if pool is None or pool.pid != os.getpid():
+            pool = LDAPConnectionPool(
+                self.api.env.ldap_pool_size,
+                self.api.env.ldap_pool_idle_timeout,
+                lambda: self._new_pool_client(cacert))
+            object.__setattr__(self, '_pool', pool)
+        return pool
+
+    def _get_proxied_connection(self, ccache, cacert):
+        """
+        Get a pooled connection which acts as the principal of ``ccache``.
+
+        Returns None when the principal has no entry to proxy to, the
+        caller falls back to a GSSAPI bind with the user's credentials.
+        """
+        principal = krb_utils.get_principal(ccache_name=ccache)
+        pool = self._get_pool(cacert)
+        client = pool.acquire()
+        try:
+            dn = pool.get_principal_dn(principal)
+            if dn is None:
+                filter = client.make_filter(
+                    {'krbprincipalname': principal,
+                     'krbcanonicalname': principal},
+                    rules=client.MATCH_ANY)
+                try:
+                    entries, _truncated = client.find_entries(
+                        filter, [''], base_dn=self.api.env.basedn,
+                        size_limit=2)
+                except errors.NotFound:
+                    entries = []
+                if len(entries) != 1:
+                    pool.release(client.conn)
+                    return None
+                dn = entries[0].dn
+                pool.set_principal_dn(principal, dn)
+
+            with client.error_handler():
+                client.conn.set_option(
+                    _ldap.OPT_SERVER_CONTROLS,
+                    [ProxyAuthzControl(True, 'dn:{}'.format(dn))])
+        except Exception:
+            pool.release(client.conn, discard=True)
+            raise
+
+        setattr(context, 'principal', principal)
+        return client.conn
+
+    def get_pool_stats(self):
+        """Get metrics of the pool of proxied connections."""
+        if self._pool is None:
+            return {}
+        return self._pool.stats()
+
     def destroy_connection(self):
         """Disconnect from LDAP server."""
         try:
             if self.conn is not None:
-                self.unbind()
+                pool = self._pool
+                if pool is None or not pool.release(self.conn):
+                    self.unbind()
         except errors.PublicError:
             # ignore when trying to unbind multiple times
             pass
@@ -452,6 +678,211 @@ class ldap2(CrudBackend, LDAPClient):
         except errors.MidairCollision:
             raise errors.NotGroupMember()
 
+    def _get_existing_dns(self, dns):
+        """
+        Return a dict mapping each of dns which exists to its entry DN.
+
+        Entries sharing the parent and the RDN attribute are looked up with
+        a single one-level search.
+        """
+        existing = {}
+        searches = {}
+        lookups = []
+        for dn in dns:
+            if len(dn) > 1 and len(dn[0]) == 1:
+                key = (dn[1:], dn[0].attr.lower())
+                searches.setdefault(key, []).append(dn)
+            else:
+                lookups.append(dn)
+
+        for (base_dn, attr), search_dns in searches.items():
+            filter = self.make_filter_from_attr(
+                attr, [dn[0].value for dn in search_dns])
+            try:
+                entries, truncated = self.find_entries(
+                    filter, [''], base_dn, self.SCOPE_ONELEVEL,
+                    size_limit=0, paged_search=True)
+            except errors.NotFound:
+                entries, truncated = [], False
+            for entry in entries:
+                existing[entry.dn] = entry.dn
+            if truncated:
+                lookups.extend(dn for dn in search_dns if dn not in existing)
+
+        for dn in lookups:
+            try:
+                entry = self.get_entry(dn, [''])
+            except errors.NotFound:
+                continue
+            existing[entry.dn] = entry.dn
+
+        return existing
+
+    def _get_group_members(self, group_dn, member_attr):
+        entry = self.get_entry(group_dn, [member_attr])
+        return set(
+            value if isinstance(value, DN) else DN(value)
+            for value in entry.get(member_attr, [])
+        )
+
+    def _modify_group_members(self, group_dn, op, member_attr, dns):
+        with self.error_handler():
+            modlist = [(op, member_attr, self.encode(dns))]
+            self.conn.modify_s(str(group_dn), modlist)
+
+    def add_entries_to_group(self, dns, group_dn, member_attr='member',
+                             allow_same=False):
+        """
+        Add entries designated by dns to group group_dn in the member
+        attribute member_attr.
+
+        The entries are looked up and added with a single modification of
+        the group entry. Only if that fails, the entries which are not
+        members yet are added one by one with add_entry_to_group().
+
+        Return a list of (dn, exception) tuples for the entries which could
+        not be added, in the order of dns.
+        """
+
+        assert isinstance(group_dn, DN)
+
+        logger.debug(
+            "add_entries_to_group: %d dns group_dn=%s member_attr=%s",
+            len(dns), group_dn, member_attr)
+
+        failed = []
+        pending = []
+        seen = set()
+        existing = self._get_existing_dns(dns)
+        for index, dn in enumerate(dns):
+            assert isinstance(dn, DN)
+            if dn in seen:
+                failed.append((index, dn, errors.AlreadyGroupMember()))
+                continue
+            seen.add(dn)
+            if dn not in existing:
+                failed.append(
+                    (index, dn, errors.NotFound(reason='no such entry')))
+                continue
+            # check if we're not trying to add group into itself
+            if existing[dn] == group_dn and not allow_same:
+                failed.append((index, dn, errors.SameGroupError()))
+                continue
+            pending.append((index, dn))
+
+        bulk = True
+        if pending:
+            try:
+                self._modify_group_members(
+                    group_dn, _ldap.MOD_ADD, member_attr,
+                    [existing[dn] for _index, dn in pending])
+            except errors.DuplicateEntry:
+                # TYPE_OR_VALUE_EXISTS, retry without the current members
+                try:
+                    members = self._get_group_members(group_dn, member_attr)
+                except errors.PublicError:
+                    bulk = False
+                else:
+                    remaining = []
+                    for index, dn in pending:
+                        if existing[dn] in members:
+                            failed.append(
+                                (index, dn, errors.AlreadyGroupMember()))
+                        else:
+                            remaining.append((index, dn))
+                    pending = remaining
+                    if pending:
+                        try:
+                            self._modify_group_members(
+                                group_dn, _ldap.MOD_ADD, member_attr,
+                                [existing[dn] for _index, dn in pending])
+                        except errors.PublicError:
+                            bulk = False
+            except errors.PublicError:
+                bulk = False
+
+        if not bulk:
+            for index, dn in pending:
+                try:
+                    self.add_entry_to_group(
+                        existing[dn], group_dn, member_attr,
+                        allow_same=allow_same)
+                except errors.PublicError as e:
+                    failed.append((index, dn, e))
+
+        return [(dn, e) for _index, dn, e in sorted(
+            failed, key=lambda f: f[0])]
+
+    def remove_entries_from_group(self, dns, group_dn, member_attr='member'):
+        """
+        Remove entries designated by dns from group group_dn.
+
+        The entries are removed with a single modification of the group
+        entry. Only if that fails, the entries which are still members are
+        removed one by one with remove_entry_from_group().
+
+        Return a list of (dn, exception) tuples for the entries which could
+        not be removed, in the order of dns.
+        """
+
+        assert isinstance(group_dn, DN)
+
+        logger.debug(
+            "remove_entries_from_group: %d dns group_dn=%s member_attr=%s",
+            len(dns), group_dn, member_attr)
+
+        failed = []
+        pending = []
+        seen = set()
+        for index, dn in enumerate(dns):
+            assert isinstance(dn, DN)
+            if dn in seen:
+                failed.append((index, dn, errors.NotGroupMember()))
+                continue
+            seen.add(dn)
+            pending.append((index, dn))
+
+        bulk = True
+        if pending:
+            try:
+                self._modify_group_members(
+                    group_dn, _ldap.MOD_DELETE, member_attr,
+                    [dn for _index, dn in pending])
+            except errors.MidairCollision:
+                # NO_SUCH_ATTRIBUTE, retry with the current members only
+                try:
+                    members = self._get_group_members(group_dn, member_attr)
+                except errors.PublicError:
+                    bulk = False
+                else:
+                    remaining = []
+                    for index, dn in pending:
+                        if dn in members:
+                            remaining.append((index, dn))
+                        else:
+                            failed.append(
+                                (index, dn, errors.NotGroupMember()))
+                    pending = remaining
+                    if pending:
+                        try:
+                            self._modify_group_members(
+                                group_dn, _ldap.MOD_DELETE, member_attr,
+                                [dn for _index, dn in pending])
+                        except errors.PublicError:
+                            bulk = False
+            except errors.PublicError:
+                bulk = False
+
+        if not bulk:
+            for index, dn in pending:
+                try:
+                    self.remove_entry_from_group(dn, group_dn, member_attr)
+                except errors.PublicError as e:
+                    failed.append((index, dn, e))
+
+        return [(dn, e) for _index, dn, e in sorted(
+            failed, key=lambda f: f[0])]
+
     def set_entry_active(self, dn, active):
         """Mark entry active/inactive."""
 
@@ -116,6 +116,16 @@ _DEPRECATED_OPTION_ALIASES = {
 
 KNOWN_FLAGS = {'SYSTEM', 'V2', 'MANAGED'}
 
+# Operational attributes which change whenever the ACIs of an entry change
+ACI_VERSION_ATTRS = ['entryusn', 'modifytimestamp']
+
+
+def _aci_entry_version(entry):
+    version = tuple(entry.single_value.get(a) for a in ACI_VERSION_ATTRS)
+    if not any(version):
+        return None
+    return version
+
 
 def strip_ldap_prefix(uri):
     prefix = 'ldap:///'
@@ -659,6 +669,7 @@ class permission(baseldap.LDAPObject):
 
         # (pylint thinks `acientry` is just a dict, but it's an LDAPEntry)
         acidn = acientry.dn  # pylint: disable=E1103
+        self._invalidate_aci_index(acidn)
 
         if acistring is not None:
             logger.debug('Removing ACI %r from %s', acistring, acidn)
@@ -682,39 +693,82 @@ class permission(baseldap.LDAPObject):
             than raising exception
         :param cached_acientry: See upgrade_permission()
         """
-        ldap = self.api.Backend.ldap2
         if name is None:
             name = permission_entry.single_value['cn']
         location = permission_entry.single_value.get('ipapermlocation',
                                                      self.api.env.basedn)
         wanted_aciname = 'permission:%s' % name
 
+        acientry, aci_index = self._get_aci_index(location, cached_acientry)
+        acistring = aci_index.get(wanted_aciname)
+        if acistring is not None:
+            return acientry, acistring
+
+        if notfound_ok:
+            return acientry, None
+        raise errors.NotFound(
+            reason=_('The ACI for permission %(name)s was not found '
+                     'in %(dn)s ') % {'name': name, 'dn': location})
+
+    def _get_aci_index(self, location, cached_acientry=None):
+        """Get the entry at location and its ACI strings keyed by ACI name
+
+        The ACIs of an entry are parsed once and the index is kept for the
+        rest of the request. It is rebuilt when the entryUSN or
+        modifyTimestamp of the entry changes.
+
+        :param cached_acientry: See upgrade_permission()
+        :return: tuple:
+            - entry
+            - dict mapping ACI name to ACI string
+        """
+        ldap = self.api.Backend.ldap2
+        indexes = getattr(context, 'permission_aci_index', None)
+        if indexes is None:
+            indexes = context.permission_aci_index = {}
+        cached = indexes.get(location)
+
         if (cached_acientry and
                 cached_acientry.dn == location and
                 'aci' in cached_acientry):
             acientry = cached_acientry
         else:
             try:
-                acientry = ldap.get_entry(location, ['aci'])
+                if cached is not None:
+                    stamp = ldap.get_entry(location, ACI_VERSION_ATTRS)
+                    if _aci_entry_version(stamp) == cached[0]:
+                        return cached[1], cached[2]
+                acientry = ldap.get_entry(location,
+                                          ['aci'] + ACI_VERSION_ATTRS)
             except errors.NotFound:
-                acientry = ldap.make_entry(location)
+                indexes.pop(location, None)
+                return ldap.make_entry(location), {}
+
+        version = _aci_entry_version(acientry)
+        if cached is not None and version is not None and version == cached[0]:
+            return acientry, cached[2]
 
-        acis = acientry.get('aci', ())
-        for acistring in acis:
+        aci_index = {}
+        for acistring in acientry.get('aci', ()):
             try:
                 aci = ACI(acistring)
             except SyntaxError as e:
                 logger.warning('Unparseable ACI %s: %s (at %s)',
                                acistring, e, location)
                 continue
-            if aci.name == wanted_aciname:
-                return acientry, acistring
+            aci_index.setdefault(aci.name, acistring)
 
-        if notfound_ok:
-            return acientry, None
-        raise errors.NotFound(
-            reason=_('The ACI for permission %(name)s was not found '
-                     'in %(dn)s ') % {'name': name, 'dn': location})
+        if version is not None:
+            indexes[location] = (version, acientry, aci_index)
+        else:
+            indexes.pop(location, None)
+        return acientry, aci_index
+
+    def _invalidate_aci_index(self, location):
+        """Forget the ACI index of the given entry, see _get_aci_index()"""
+        indexes = getattr(context, 'permission_aci_index', None)
+        if indexes:
+            indexes.pop(location, None)
 
     def upgrade_permission(self, entry, target_entry=None,
                            output_only=False, cached_acientry=None):
@@ -1332,7 +1386,8 @@ class permission_find(baseldap.LDAPSearch):
                     filter=ldap.combine_filters(filters, rules=ldap.MATCH_ALL),
                     attrs_list=attrs_list, size_limit=max_entries)
                 # Retrieve the root entry (with all legacy ACIs) at once
-                root_entry = ldap.get_entry(DN(api.env.basedn), ['aci'])
+                root_entry = ldap.get_entry(DN(api.env.basedn),
+                                            ['aci'] + ACI_VERSION_ATTRS)
             except errors.NotFound:
                 legacy_entries = ()
             logger.debug('potential legacy entries: %s', len(legacy_entries))
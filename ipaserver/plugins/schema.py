@@ -2,9 +2,16 @@
 # Copyright (C) 2016  FreeIPA Contributors see COPYING for license
 #
 
+import errno
 import importlib
 import itertools
+import json
+import logging
+import os
+import re
 import sys
+import tempfile
+import zlib
 
 import six
 import hashlib
@@ -17,8 +24,10 @@ from ipalib.output import Entry, ListOfEntries, ListOfPrimaryKeys, PrimaryKey
 from ipalib.parameters import Bool, Dict, Flag, Str
 from ipalib.plugable import Registry
 from ipalib.request import context
+from ipalib.rpc import PreEncodedDict, json_encode_binary
 from ipalib.text import _
-from ipapython.version import API_VERSION
+from ipaplatform.paths import paths
+from ipapython.version import API_VERSION, VERSION
 
 # Schema TTL sent to clients in response to schema call.
 # Number of seconds before client should check for schema update.
@@ -27,6 +36,8 @@ from ipapython.version import API_VERSION
 # it was updated
 SCHEMA_TTL = 3600  # default: 1 hour
 
+logger = logging.getLogger(__name__)
+
 __doc__ = _("""
 API Schema
 """) + _("""
@@ -835,23 +846,96 @@ class schema(Command):
 
         return schema
 
-    def execute(self, *args, **kwargs):
+    def _get_cache_path(self, langs):
+        """
+        Returns path of the schema cache file shared by all server processes
+
+        The file name covers everything the schema is generated from: IPA
+        version, API version, language and the loaded plugin modules.
+        """
+        key = getattr(self.api, "_schema_cache_key", None)
+        if key is None:
+            digest = hashlib.sha1()
+            digest.update(u'{}\0{}'.format(VERSION, API_VERSION).encode())
+            modules = set(type(p).__module__ for p in self.api.Command())
+            for name in sorted(modules):
+                filename = getattr(sys.modules.get(name), '__file__', None)
+                try:
+                    mtime = os.stat(filename).st_mtime if filename else 0
+                except OSError:
+                    mtime = 0
+                digest.update(u'\0{}:{}'.format(name, mtime).encode())
+            key = digest.hexdigest()[:16]
+            setattr(self.api, "_schema_cache_key", key)
+
+        langs = re.sub(r'[^A-Za-z0-9_]', '_', langs) or 'default'
+        return os.path.join(
+            paths.IPA_SCHEMA_CACHE_DIR,
+            'schema-{}-{}'.format(langs, key))
+
+    def _read_cache(self, path):
+        try:
+            with open(path, 'rb') as f:
+                fingerprint = f.readline().strip().decode('ascii')
+                json_text = zlib.decompress(f.read()).decode('utf-8')
+        except (IOError, OSError, ValueError, zlib.error) as e:
+            if getattr(e, 'errno', None) != errno.ENOENT:
+                logger.debug("Failed to read schema cache %s: %s", path, e)
+            return None
+
+        schema = PreEncodedDict(json.loads(json_text), json_text)
+        if schema.get('fingerprint') != fingerprint:
+            logger.debug("Ignoring inconsistent schema cache %s", path)
+            return None
+        return schema
+
+    def _write_cache(self, path, schema):
+        try:
+            with tempfile.NamedTemporaryFile(
+                    dir=os.path.dirname(path), prefix='.schema-',
+                    delete=False) as f:
+                f.write(schema['fingerprint'].encode('ascii') + b'\n')
+                f.write(zlib.compress(schema.json_text.encode('utf-8')))
+            os.rename(f.name, path)
+        except (IOError, OSError) as e:
+            logger.debug("Failed to write schema cache %s: %s", path, e)
+
+    def _get_schema(self, **kwargs):
         langs = "".join(getattr(context, "languages", []))
 
         if getattr(self.api, "_schema", None) is None:
             setattr(self.api, "_schema", {})
 
         schema = self.api._schema.get(langs)
+        if schema is not None:
+            return schema
+
+        path = self._get_cache_path(langs)
+        schema = self._read_cache(path)
         if schema is None:
             schema = self._generate_schema(**kwargs)
-            self.api._schema[langs] = schema
+            schema['ttl'] = SCHEMA_TTL
+            # schema values are text only, the serialization does not depend
+            # on the client version
+            json_text = json_encode_binary(schema, API_VERSION)
+            schema = PreEncodedDict(schema, json_text)
+            self._write_cache(path, schema)
+
+        self.api._schema[langs] = schema
+        return schema
 
-        schema['ttl'] = SCHEMA_TTL
+    def execute(self, *args, **kwargs):
+        schema = self._get_schema(**kwargs)
+        fingerprint = schema['fingerprint']
 
-        if schema['fingerprint'] in kwargs.get('known_fingerprints', []):
+        known_fingerprints = (
+            list(kwargs.get('known_fingerprints') or []) +
+            list(getattr(context, 'if_none_match', [])))
+        if fingerprint in known_fingerprints:
             raise errors.SchemaUpToDate(
-                fingerprint=schema['fingerprint'],
+                fingerprint=fingerprint,
                 ttl=schema['ttl'],
             )
 
+        context.response_etag = fingerprint
         return dict(result=schema)
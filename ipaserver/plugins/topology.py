@@ -15,6 +15,7 @@ from ipalib import output
 from ipalib.constants import MIN_DOMAIN_LEVEL, DOMAIN_LEVEL_1
 from ipaserver.topology import (
     create_topology_graph, get_topology_connection_errors,
+    get_replication_path_lengths, get_topology_single_points_of_failure,
     map_masters_to_suffixes)
 from ipapython.dn import DN
 
@@ -76,6 +77,11 @@ Examples:
 """) + _("""
   Verify topology of 'ca' suffix:
     ipa topologysuffix-verify ca
+""") + _("""
+  Verify topology of 'domain' suffix after removal of a server and addition
+  of a segment, without changing anything:
+    ipa topologysuffix-verify domain --remove-server IPA_SERVER_A \\
+        --add-segment IPA_SERVER_B:IPA_SERVER_C
 """)
 
 register = Registry()
@@ -494,8 +500,81 @@ Checks done:
      replication paths between all servers.
   2. check if servers don't have more than the recommended number of
      replication agreements
+
+Removal of servers and segments and addition of segments can be simulated
+to verify the topology they would lead to.
 ''')
 
+    takes_options = (
+        Str(
+            'remove_server*',
+            cli_name='remove_server',
+            label=_('Remove server'),
+            doc=_('Simulate removal of the server'),
+        ),
+        Str(
+            'remove_segment*',
+            cli_name='remove_segment',
+            label=_('Remove segment'),
+            doc=_('Simulate removal of the segment'),
+        ),
+        Str(
+            'add_segment*',
+            cli_name='add_segment',
+            label=_('Add segment'),
+            doc=_('Simulate addition of a segment between two servers, '
+                  'given as LEFT_NODE:RIGHT_NODE'),
+        ),
+    )
+
+    def simulate_changes(self, graph, segments, **options):
+        """Apply simulated changes from options to the topology graph"""
+        segments_by_name = {s['cn'][0]: s for s in segments}
+        for name in options.get('remove_segment') or ():
+            try:
+                segment = segments_by_name[name]
+            except KeyError:
+                raise errors.NotFound(
+                    reason=_('%(segment)s: segment not found') %
+                    dict(segment=name))
+            direction = segment['iparepltoposegmentdirection'][0]
+            left = segment['iparepltoposegmentleftnode'][0]
+            right = segment['iparepltoposegmentrightnode'][0]
+            edges = []
+            if direction in (u'both', u'left-right'):
+                edges.append((left, right))
+            if direction in (u'both', u'right-left'):
+                edges.append((right, left))
+            for tail, head in edges:
+                try:
+                    graph.remove_edge(tail, head)
+                except ValueError:  # segment with deleted master
+                    pass
+
+        for name in options.get('remove_server') or ():
+            try:
+                graph.remove_vertex(name)
+            except ValueError:
+                raise errors.NotFound(
+                    reason=_('%(server)s: server not found in suffix') %
+                    dict(server=name))
+
+        for value in options.get('add_segment') or ():
+            left, sep, right = value.partition(u':')
+            if not sep or not left or not right or left == right:
+                raise errors.ValidationError(
+                    name='add_segment',
+                    error=_('segment must be given as two different servers '
+                            'LEFT_NODE:RIGHT_NODE, got %(value)s') %
+                    dict(value=value))
+            for node in (left, right):
+                if node not in graph.vertices:
+                    raise errors.NotFound(
+                        reason=_('%(server)s: server not found in suffix') %
+                        dict(server=node))
+            graph.add_edge(left, right)
+            graph.add_edge(right, left)
+
     def execute(self, *keys, **options):
 
         validate_domain_level(self.api)
@@ -506,7 +585,8 @@ Checks done:
         segments = self.api.Command.topologysegment_find(
             keys[0], sizelimit=0)['result']
         graph = create_topology_graph(masters, segments)
-        master_cns = [m['cn'][0] for m in masters]
+        self.simulate_changes(graph, segments, **options)
+        master_cns = list(graph.vertices)
         master_cns.sort()
 
         # check if each master can contact others
@@ -521,11 +601,17 @@ Checks done:
             if len(suppliers) > self.api.env.recommended_max_agmts:
                 max_agmts_errors.append((m, suppliers))
 
+        path_lengths = get_replication_path_lengths(graph)
+
         return dict(
             result={
                 'in_order': not connect_errors and not max_agmts_errors,
                 'connect_errors': connect_errors,
                 'max_agmts_errors': max_agmts_errors,
-                'max_agmts': self.api.env.recommended_max_agmts
+                'max_agmts': self.api.env.recommended_max_agmts,
+                'path_lengths': path_lengths,
+                'max_hops': max((h for _m, h in path_lengths), default=0),
+                'single_points_of_failure':
+                    get_topology_single_points_of_failure(graph),
             },
         )
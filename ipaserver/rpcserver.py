@@ -29,6 +29,7 @@ import logging
 from xml.sax.saxutils import escape
 import os
 import traceback
+import zlib
 from io import BytesIO
 from urllib.parse import parse_qs
 from xmlrpc.client import Fault
@@ -226,6 +227,53 @@ def read_input(environ):
     return environ['wsgi.input'].read(length).decode('utf-8')
 
 
+def accepted_content_encoding(environ):
+    """
+    Get the content coding to compress a response with.
+
+    Returns 'gzip' or 'deflate' if the client accepts it according to the
+    Accept-Encoding request header, None otherwise.
+    """
+    accepted = {}
+    for coding in environ.get('HTTP_ACCEPT_ENCODING', '').split(','):
+        coding, _sep, params = coding.partition(';')
+        qvalue = 1.0
+        for param in params.split(';'):
+            name, _sep, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    qvalue = float(value)
+                except ValueError:
+                    qvalue = 0.0
+        accepted[coding.strip().lower()] = qvalue
+
+    for coding in ('gzip', 'deflate'):
+        if accepted.get(coding, accepted.get('*', 0.0)) > 0.0:
+            return coding
+    return None
+
+
+def compress_response(response, coding, chunk_size=64 * 1024):
+    """
+    Compress response body with gzip or deflate content coding.
+
+    Yields the compressed body in chunks, so that the WSGI server can start
+    sending it before the whole body is compressed.
+    """
+    if coding == 'gzip':
+        wbits = 16 + zlib.MAX_WBITS
+    else:
+        wbits = zlib.MAX_WBITS
+    compressor = zlib.compressobj(zlib.Z_DEFAULT_COMPRESSION, zlib.DEFLATED,
+                                  wbits)
+    view = memoryview(response)
+    for offset in range(0, len(view), chunk_size):
+        data = compressor.compress(view[offset:offset + chunk_size])
+        if data:
+            yield data
+    yield compressor.flush()
+
+
 def params_2_args_options(params):
     if len(params) == 0:
         return (tuple(), dict())
@@ -379,6 +427,12 @@ class WSGIExecutioner(Executioner):
                 lang = lang_reg.split('-')[0]
                 setattr(context, "languages", [lang])
 
+            if 'HTTP_IF_NONE_MATCH' in environ:
+                setattr(context, "if_none_match", [
+                    tag.strip().strip('"')
+                    for tag in environ['HTTP_IF_NONE_MATCH'].split(',')
+                ])
+
             if (
                 environ.get('CONTENT_TYPE', '').startswith(self.content_type)
                 and environ['REQUEST_METHOD'] == 'POST'
@@ -406,6 +460,8 @@ class WSGIExecutioner(Executioner):
         finally:
             if hasattr(context, "languages"):
                 delattr(context, "languages")
+            if hasattr(context, "if_none_match"):
+                delattr(context, "if_none_match")
 
         principal = getattr(context, 'principal', 'UNKNOWN')
         if command is not None:
@@ -468,6 +524,22 @@ class WSGIExecutioner(Executioner):
         if logout_cookie is not None:
             headers.append(('IPASESSION', logout_cookie))
 
+        etag = getattr(context, 'response_etag', None)
+        if etag is not None:
+            delattr(context, 'response_etag')
+            if status == HTTP_STATUS_SUCCESS:
+                headers = headers + [('ETag', '"%s"' % etag)]
+
+        min_size = self.api.env.rpc_compress_min_size
+        if (status == HTTP_STATUS_SUCCESS and min_size and
+                len(response) >= min_size):
+            headers = headers + [('Vary', 'Accept-Encoding')]
+            coding = accepted_content_encoding(environ)
+            if coding is not None:
+                headers.append(('Content-Encoding', coding))
+                start_response(status, headers)
+                return compress_response(response, coding)
+
         start_response(status, headers)
         return [response]
 
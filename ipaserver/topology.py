@@ -6,8 +6,6 @@
 set of functions and classes useful for management of domain level 1 topology
 """
 
-from copy import deepcopy
-
 from ipalib import _
 from ipapython.graph import Graph
 
@@ -53,23 +51,54 @@ def create_topology_graph(masters, segments):
 
 def get_topology_connection_errors(graph):
     """
-    Traverse graph from each master and find out which masters are not
-    reachable.
+    Find out which masters are not reachable from each master.
+
+    Reachability is computed from the strongly connected components of the
+    graph in linear time, a connected topology is a single component.
 
     :param graph: topology graph where vertices are masters
     :returns: list of errors, error is: (master, visited, not_visited)
     """
     connect_errors = []
+    if len(graph.strongly_connected_components()) <= 1:
+        return connect_errors
+
+    reachable = graph.reachable_sets()
     master_cns = list(graph.vertices)
     master_cns.sort()
     for m in master_cns:
-        visited = graph.bfs(m)
+        visited = reachable[m]
         not_visited = graph.vertices - visited
         if not_visited:
             connect_errors.append((m, list(visited), list(not_visited)))
     return connect_errors
 
 
+def get_replication_path_lengths(graph):
+    """
+    Get the longest replication path from each master, in hops.
+
+    :param graph: topology graph where vertices are masters
+    :returns: list of (master, hops) tuples sorted by master, hops is the
+        number of segments changes from the master need to pass to reach
+        the most distant master it replicates to
+    """
+    return [
+        (m, max(graph.distances(m).values()))
+        for m in sorted(graph.vertices)
+    ]
+
+
+def get_topology_single_points_of_failure(graph):
+    """
+    Get masters whose removal disconnects the topology.
+
+    :param graph: topology graph where vertices are masters
+    :returns: sorted list of masters
+    """
+    return sorted(graph.articulation_points())
+
+
 def map_masters_to_suffixes(masters):
     masters_to_suffix = {}
     managed_suffix_attr = 'iparepltopomanagedsuffix_topologysuffix'
@@ -149,24 +178,22 @@ class TopologyConnectivity:
         return errors_by_suffix
 
     def errors_after_master_removal(self, master_cn):
-        graphs_before = deepcopy(self.graphs)
-
-        for s in self.graphs:
-            try:
-                self.graphs[s].remove_vertex(master_cn)
-            except ValueError:
-                pass
-
-        errors_after_removal = self.errors
+        errors_after_removal = {}
 
-        self.graphs = graphs_before
+        for suffix, graph in self.graphs.items():
+            if master_cn in graph.vertices:
+                graph = graph.copy()
+                graph.remove_vertex(master_cn)
+            errors_after_removal[suffix] = get_topology_connection_errors(
+                graph)
 
         return errors_after_removal
 
     def check_current_state(self):
         err_msg = ""
-        for suffix in self.errors:
-            errors = self.errors[suffix]
+        errors_by_suffix = self.errors
+        for suffix in errors_by_suffix:
+            errors = errors_by_suffix[suffix]
             if errors:
                 err_msg = "\n".join([
                     err_msg,
@@ -0,0 +1,41 @@
+#
+# Copyright (C) 2020  FreeIPA Contributors see COPYING for license
+#
+"""
+Test the ``ipa`` command line tool with a cold and a warm schema cache
+"""
+
+import os
+import subprocess
+
+import pytest
+
+from ipaclient.remote_plugins import schema
+
+
+@pytest.mark.tier1
+@pytest.mark.skipif(
+    not os.path.isfile('/etc/ipa/default.conf'),
+    reason="IPA client must be configured to run the ipa tool")
+@pytest.mark.parametrize('args, expected', [
+    (['ipa', 'ping'], 'IPA server version'),
+    (['ipa', 'user-show', 'admin'], 'User login: admin'),
+])
+def test_cli_schema_cache(tmpdir, args, expected):
+    env = dict(os.environ, XDG_CACHE_HOME=str(tmpdir))
+    cache_dir = tmpdir.join('ipa', 'schema', schema.FORMAT)
+
+    # the first run fetches the schema and writes the cache
+    cold = subprocess.check_output(args, env=env, universal_newlines=True)
+    assert expected in cold
+    cached = cache_dir.listdir()
+    assert len(cached) == 1
+    with open(str(cached[0]), 'rb') as f:
+        assert f.read(len(schema._MAGIC)) == schema._MAGIC
+    mtime = cached[0].mtime()
+
+    # the second run reads the schema from the cache only
+    warm = subprocess.check_output(args, env=env, universal_newlines=True)
+    assert warm == cold
+    assert cache_dir.listdir() == cached
+    assert cached[0].mtime() == mtime
@@ -0,0 +1,125 @@
+#
+# Copyright (C) 2020  FreeIPA Contributors see COPYING for license
+#
+
+import threading
+
+import pytest
+
+from ipaplatform.paths import paths
+
+from ipaclient import discovery
+from ipapython.dn import DN
+
+
+BASEDN = DN(('dc', 'example'), ('dc', 'test'))
+
+
+class FakeDiscovery(discovery.IPADiscovery):
+    """IPADiscovery with DNS and LDAP answered from dictionaries"""
+
+    def __init__(self, srv, slow=()):
+        super(FakeDiscovery, self).__init__()
+        self.srv = srv
+        self.slow = slow
+        self.release = threading.Event()
+        self.checked = []
+
+    def ipadns_search_srv(self, domain, srv_record_name, default_port,
+                          break_on_first=True):
+        if domain in self.slow:
+            # answered only after a faster domain was chosen
+            self.release.wait(5)
+        return list(self.srv.get((srv_record_name, domain), []))
+
+    def ipadnssearchkrbrealm(self, domain=None):
+        return (domain or self.domain).upper()
+
+    def _ipacheckldap(self, thost, trealm, ca_cert_path, found):
+        self.checked.append(thost)
+        if thost.startswith('bad'):
+            return [discovery.NO_LDAP_SERVER]
+        found.append((BASEDN, 'From IPA server %s' % thost))
+        return [discovery.SUCCESS, thost, trealm]
+
+
+@pytest.fixture
+def resolv_conf(tmpdir, monkeypatch):
+    path = tmpdir.join('resolv.conf')
+    path.write('search other.test example.test\n')
+    monkeypatch.setattr(paths, 'RESOLV_CONF', str(path))
+
+
+@pytest.mark.tier0
+class TestIPADiscovery:
+    def test_candidate_domains(self):
+        ds = discovery.IPADiscovery()
+        assert ds._candidate_domains([
+            ('a.example.test', 'first'),
+            ('single', 'invalid'),
+            ('example.test', 'second'),
+            ('other.test', 'third'),
+        ]) == [
+            ('a.example.test', 'first'),
+            ('example.test', 'first'),
+            ('test', 'first'),
+            ('other.test', 'third'),
+        ]
+
+    def test_search_order(self, resolv_conf):
+        ds = FakeDiscovery({
+            ('_ldap._tcp', 'other.test'): ['ipa.other.test'],
+            ('_ldap._tcp', 'example.test'): ['bad.example.test',
+                                             'ipa.example.test'],
+            ('_kerberos._udp', 'example.test'): ['ipa.example.test'],
+        })
+        assert ds.search(hostname='client.example.test') == discovery.SUCCESS
+        # the domain of the hostname wins over the search domains
+        assert ds.domain == 'example.test'
+        assert ds.realm == 'EXAMPLE.TEST'
+        assert ds.kdc == 'ipa.example.test'
+        assert ds.basedn == BASEDN
+        assert ds.servers == ['ipa.example.test']
+
+    def test_search_does_not_wait(self, resolv_conf):
+        ds = FakeDiscovery({
+            ('_ldap._tcp', 'example.test'): ['ipa.example.test'],
+        }, slow={'other.test'})
+        try:
+            result = ds.search(hostname='client.example.test')
+        finally:
+            ds.release.set()
+        assert result == discovery.SUCCESS
+        assert ds.domain == 'example.test'
+
+    def test_check_domain(self):
+        ds = FakeDiscovery({
+            ('_ldap._tcp', 'example.test'): ['ipa.example.test'],
+        })
+        tried = set()
+        assert ds.check_domain('a.example.test', tried, 'first') == (
+            ['ipa.example.test'], 'example.test')
+        assert tried == {'a.example.test', 'example.test', 'test'}
+        # domains searched already are skipped
+        assert ds.check_domain('example.test', tried, 'again') == (
+            None, None)
+
+    def test_executor(self):
+        executor = discovery._DiscoveryExecutor(1)
+        started = threading.Event()
+        release = threading.Event()
+        daemon = []
+
+        def block():
+            daemon.append(threading.current_thread().daemon)
+            started.set()
+            return release.wait(5)
+
+        running = executor.submit(block)
+        assert started.wait(5)
+        pending = executor.submit(int)
+        executor.shutdown()
+        assert pending.cancelled()
+        release.set()
+        assert running.result(5) is True
+        assert daemon == [True]
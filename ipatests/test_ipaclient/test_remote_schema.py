@@ -0,0 +1,60 @@
+#
+# Copyright (C) 2020  FreeIPA Contributors see COPYING for license
+#
+
+import pytest
+
+import ipatests.util
+ipatests.util.check_ipaclient_unittests()  # noqa: E402
+
+from ipaclient.remote_plugins.schema import Schema
+
+
+@pytest.fixture
+def schema_dir(tmpdir, monkeypatch):
+    monkeypatch.setattr(Schema, '_DIR', str(tmpdir))
+    return tmpdir
+
+
+def _empty_schema():
+    schema = Schema.__new__(Schema)
+    schema._dict = {ns: {} for ns in Schema.namespaces}
+    schema._help = None
+    schema._data = None
+    schema._data_start = 0
+    return schema
+
+
+@pytest.mark.tier0
+def test_schema_cache_round_trip(schema_dir):
+    schema = _empty_schema()
+    schema._dict['commands'] = {
+        u'ping/1': {u'name': u'ping', u'full_name': u'ping/1'},
+        u'user_show/1': {u'name': u'user_show', u'full_name': u'user_show/1'},
+    }
+    schema._dict['topics'] = {
+        u'ping/1': {u'name': u'ping', u'full_name': u'ping/1'},
+    }
+    schema._dict['fingerprint'] = u'deadbeef'
+    schema._help = schema._generate_help(schema._dict)
+    schema._write_schema(u'deadbeef')
+
+    cached = _empty_schema()
+    cached._read_schema(u'deadbeef')
+
+    assert cached._dict['fingerprint'] == u'deadbeef'
+    assert sorted(cached.iter_namespace('commands')) == [
+        u'ping/1', u'user_show/1']
+    # members are decoded on first access only
+    assert isinstance(cached._dict['commands'][u'user_show/1'], list)
+    assert cached.read_namespace_member('commands', u'user_show/1') == {
+        u'name': u'user_show', u'full_name': u'user_show/1'}
+    assert isinstance(cached._dict['commands'][u'ping/1'], list)
+    assert cached.get_help('commands', u'ping/1') == {u'name': u'ping'}
+
+
+@pytest.mark.tier0
+def test_schema_cache_invalid_file(schema_dir):
+    schema_dir.join(u'deadbeef').write_binary(b'PK\x03\x04')
+    with pytest.raises(ValueError):
+        _empty_schema()._read_schema(u'deadbeef')
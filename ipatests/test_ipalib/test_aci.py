@@ -23,6 +23,13 @@ Test the `ipalib.aci` module.
 """
 from __future__ import print_function
 
+import glob
+import os
+import random
+import re
+import shlex
+
+from ipalib import aci
 from ipalib.aci import ACI
 
 import pytest
@@ -174,3 +181,135 @@ def test_aci_parsing_10():
                       '(version 3.0;acl "Allow trust agents to retrieve '
                       'keytab keys for cross realm principals";allow (read) '
                       'userattr = "ipaAllowedToPerform;read_keys#GROUPDN";)')
+
+
+def test_aci_parsing_unclosed_quote():
+    with pytest.raises(SyntaxError):
+        ACI('(targetattr = "cn)(version 3.0;acl "foo";allow (write) '
+            'userdn = "ldap:///self";)')
+
+
+def test_aci_parse_cache():
+    source = ('(targetattr = "cn || sn")(version 3.0;acl "foo";'
+              'allow (write) userdn = "ldap:///self";)')
+    a = ACI(source)
+    a.set_target_attr(['uid'])
+    a.permissions.append('read')
+    # modifying a parsed ACI does not affect other ACIs parsed from the
+    # same string
+    b = ACI(source)
+    assert b.target['targetattr']['expression'] == ['cn', 'sn']
+    assert b.permissions == ['write']
+
+
+class ShlexACI(ACI):
+    """ACI with the original shlex based target parser, for reference"""
+
+    def _parse_acistr(self, acistr):
+        self._parse_acistr_uncached(acistr)
+
+    def _parse_target(self, aci):
+        lexer = shlex.shlex(aci)
+        lexer.wordchars = lexer.wordchars + "."
+
+        var = False
+        op = "="
+        for token in lexer:
+            # We should have the form (a = b)(a = b)...
+            if token == "(":
+                var = next(lexer).strip()
+                operator = next(lexer)
+                if operator not in ("=", "!="):
+                    # Peek at the next char before giving up
+                    operator = operator + next(lexer)
+                    if operator not in ("=", "!="):
+                        raise SyntaxError(
+                            "No operator in target, got '%s'" % operator)
+                op = operator
+                val = next(lexer).strip()
+                val = self._remove_quotes(val)
+                end = next(lexer)
+                if end != ")":
+                    raise SyntaxError(
+                        'No end parenthesis in target, got %s' % end)
+
+            if var == 'targetattr':
+                t = re.split(r'[^a-zA-Z0-9;\*]+', val)
+                self.target[var] = {}
+                self.target[var]['operator'] = op
+                self.target[var]['expression'] = t
+            else:
+                self.target[var] = {}
+                self.target[var]['operator'] = op
+                self.target[var]['expression'] = val
+
+
+ACI_LINE = re.compile(r'^(?:add:|addifnew:)?aci:\s*(.*\S)\s*$')
+
+
+def _shipped_acis():
+    topdir = os.path.dirname(os.path.dirname(os.path.dirname(
+        os.path.abspath(__file__))))
+    filenames = glob.glob(os.path.join(topdir, 'install', 'updates',
+                                       '*.update'))
+    filenames.append(os.path.join(topdir, 'ACI.txt'))
+    acis = []
+    for filename in filenames:
+        if not os.path.isfile(filename):
+            continue
+        with open(filename) as f:
+            for line in f:
+                match = ACI_LINE.match(line)
+                if match and 'version 3.0' in match.group(1):
+                    acis.append(match.group(1))
+    if not acis:
+        pytest.skip('ACI sources are not available')
+    return acis
+
+
+def _parse(cls, acistr):
+    try:
+        a = cls(acistr)
+    except Exception:
+        return None
+    return (a.name, a.target, a.action, a.permissions, a.bindrule)
+
+
+def _export(cls, acistr):
+    try:
+        return cls(acistr).export_to_string()
+    except SyntaxError as e:
+        # ACIs without target cannot be exported
+        return str(e)
+
+
+class TestACIParser:
+    """Compare the ACI parser with the original shlex based one"""
+
+    def test_shipped_acis(self):
+        for acistr in _shipped_acis():
+            expected = _parse(ShlexACI, acistr)
+            assert _parse(ACI, acistr) == expected, acistr
+            assert _export(ACI, acistr) == _export(ShlexACI, acistr)
+
+    def test_fuzz(self):
+        rng = random.Random(0)
+        alphabet = '()"\'=!# \t\n.;*|abc'
+        acis = _shipped_acis()
+        for _i in range(5000):
+            acistr = rng.choice(acis)
+            targets, sep, rest = acistr.partition('(version 3.0')
+            chars = list(targets)
+            for _j in range(rng.randint(1, 3)):
+                pos = rng.randrange(len(chars) + 1)
+                if rng.random() < 0.5 and pos < len(chars):
+                    del chars[pos]
+                else:
+                    chars.insert(pos, rng.choice(alphabet))
+            acistr = ''.join(chars) + sep + rest
+            aci._parse_aci.cache_clear()
+            result = _parse(ACI, acistr)
+            if result is not None:
+                # the new parser rejects stray tokens between targets,
+                # but anything it accepts parses the same
+                assert result == _parse(ShlexACI, acistr), acistr
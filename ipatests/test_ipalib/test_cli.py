@@ -21,6 +21,8 @@
 Test the `ipalib.cli` module.
 """
 
+from types import SimpleNamespace
+
 from ipatests.util import raises, ClassChecker
 from ipalib import cli, plugable
 
@@ -72,6 +74,89 @@ def test_from_cli():
     assert f('user-add') == 'user_add'
 
 
+def test_pop_continuation():
+    """
+    Test the `ipalib.cli.cli.pop_continuation` method.
+    """
+    f = cli.cli.pop_continuation
+    truncated = dict(name=u'SearchResultTruncated', data=dict())
+    paged = dict(name=u'SearchResultPaged', data=dict(continuation=u'abc'))
+    result = dict(result=[], messages=[truncated, paged])
+    assert f(result) == u'abc'
+    assert result['messages'] == [truncated]
+    assert f(result) is None
+    assert f(dict(result=[])) is None
+
+
+class DummyPagedCommand:
+    full_name = 'dummy_find'
+
+    def __init__(self):
+        self.printed = []
+
+    def params(self):
+        return []
+
+    def params_2_args_options(self, **kw):
+        return (), kw
+
+    def output_for_cli(self, textui, output, *args, **options):
+        self.printed.append(output['count'])
+        return 1 if output['count'] == 0 else 0
+
+
+class DummyPagedCLI:
+    run = cli.cli.run
+    pop_continuation = staticmethod(cli.cli.pop_continuation)
+
+    def __init__(self, counts):
+        self.cmd = DummyPagedCommand()
+        self.pages = []
+        for i, count in enumerate(counts):
+            messages = []
+            if i < len(counts) - 1:
+                messages.append(dict(name=u'SearchResultPaged',
+                                     data=dict(continuation=str(i))))
+            self.pages.append(dict(result=[], count=count, messages=messages))
+        self.continuations = []
+        self.api = SimpleNamespace(Backend=SimpleNamespace(textui=None))
+
+    def get_command(self, argv):
+        return self.cmd
+
+    def parse(self, cmd, argv):
+        return dict(pagesize=2)
+
+    def process_keyword_arguments(self, cmd, kw):
+        return kw
+
+    def create_context(self):
+        pass
+
+    def destroy_context(self):
+        pass
+
+    def execute(self, name, **kw):
+        self.continuations.append(kw.get('continuation'))
+        return self.pages[len(self.continuations) - 1]
+
+
+@pytest.mark.parametrize('counts, rv', [
+    ([2, 1], 0),
+    ([2, 0], 0),
+    ([0, 2], 0),
+    ([0], 1),
+])
+def test_run_paged(counts, rv):
+    """
+    Test the exit code of `ipalib.cli.cli.run` for a paged search.
+    """
+    c = DummyPagedCLI(counts)
+    assert c.run(['dummy-find']) == rv
+    assert c.cmd.printed == counts
+    assert c.continuations == [None] + [str(i) for i in range(len(counts) - 1)]
+
+
 def get_cmd_name(i):
     return 'cmd_%d' % i
 
@@ -23,6 +23,10 @@ Test the `ipalib.rpc` module.
 from __future__ import print_function
 
 from xmlrpc.client import Binary, Fault, dumps, loads
+import datetime
+import json
+import socket
+import threading
 import urllib
 
 import pytest
@@ -34,6 +38,8 @@ from ipatests.data import binary_bytes, utf8_bytes, unicode_str
 from ipalib.frontend import Command
 from ipalib.request import context, Connection
 from ipalib import rpc, errors, api, request as ipa_request
+from ipapython.dn import DN
+from ipapython.dnsutil import DNSName
 from ipapython.version import API_VERSION
 
 if six.PY3:
@@ -196,6 +202,119 @@ def test_xml_loads():
         assert type(e.faultString) is unicode
 
 
+def test_json_encode_preencoded():
+    """
+    Test `ipalib.rpc.json_encode_binary` with a `PreEncodedDict`.
+    """
+    json_text = u'{"answer": 42}'
+    value = rpc.PreEncodedDict({u'answer': 0}, json_text)
+    dump = rpc.json_encode_binary(
+        {u'result': value, u'id': None}, API_VERSION)
+    assert_equal(
+        rpc.json_decode_binary(dump),
+        {u'result': {u'answer': 42}, u'id': None})
+
+
+def _available_json_codecs():
+    codecs = [rpc.JSON_CODECS['json']]
+    if rpc.orjson is not None:
+        codecs.append(rpc.JSON_CODECS['orjson'])
+    return codecs
+
+
+@pytest.fixture(params=_available_json_codecs(), ids=lambda c: c.name)
+def json_codec(request, monkeypatch):
+    monkeypatch.setattr(rpc, 'json_codec', request.param)
+    return request.param
+
+
+def test_json_codec_round_trip(json_codec):
+    """
+    Test `ipalib.rpc.json_encode_binary` and `ipalib.rpc.json_decode_binary`
+    with all available JSON codecs.
+    """
+    value = {
+        u'dn': DN(('uid', 'admin'), ('cn', 'users')),
+        u'bytes': [binary_bytes],
+        u'time': datetime.datetime(2020, 1, 2, 3, 4, 5),
+        u'dns': DNSName(u'ipa.example.test.'),
+        u'serial': 2 ** 100,
+        u'negative': -2 ** 63 - 1,
+        u'nested': [[1, 2], {u'a': [3]}],
+    }
+    dump = rpc.json_encode_binary(value, API_VERSION)
+    assert_equal(rpc.json_decode_binary(dump), {
+        u'dn': u'uid=admin,cn=users',
+        u'bytes': (binary_bytes,),
+        u'time': value[u'time'],
+        u'dns': value[u'dns'],
+        u'serial': 2 ** 100,
+        u'negative': -2 ** 63 - 1,
+        u'nested': ([1, 2], {u'a': (3,)}),
+    })
+    assert_equal(
+        rpc.json_decode_binary(dump, tuples=False)[u'nested'],
+        [[1, 2], {u'a': [3]}])
+
+
+def _user_find_payload(count):
+    return {u'result': {
+        u'count': count,
+        u'truncated': False,
+        u'summary': u'%d users matched' % count,
+        u'result': [{
+            u'dn': u'uid=user%d,cn=users,cn=accounts,dc=example,dc=test' % i,
+            u'uid': [u'user%d' % i],
+            u'givenname': [u'Test'],
+            u'sn': [u'User %d' % i],
+            u'homedirectory': [u'/home/user%d' % i],
+            u'loginshell': [u'/bin/sh'],
+            u'uidnumber': [u'%d' % (1000 + i)],
+            u'gidnumber': [u'%d' % (1000 + i)],
+            u'mail': [u'user%d@example.test' % i],
+            u'krbprincipalname': [u'user%d@EXAMPLE.TEST' % i],
+            u'nsaccountlock': False,
+            u'memberof_group': [u'ipausers'],
+            u'krblastpwdchange': [datetime.datetime(2020, 1, 1)],
+        } for i in range(count)],
+    }}
+
+
+def _dnsrecord_find_payload(count):
+    return {u'result': {
+        u'count': count,
+        u'truncated': False,
+        u'summary': None,
+        u'result': [{
+            u'dn': u'idnsname=host%d,idnsname=example.test.,cn=dns,'
+                   u'dc=example,dc=test' % i,
+            u'idnsname': [DNSName(u'host%d' % i)],
+            u'arecord': [u'192.0.2.%d' % (i % 256)],
+            u'aaaarecord': [u'2001:db8::%x' % i],
+            u'sshfprecord': [u'1 1 %040x' % i],
+        } for i in range(count)],
+    }}
+
+
+@pytest.mark.parametrize('payload', [
+    _user_find_payload(50),
+    _dnsrecord_find_payload(50),
+], ids=['user_find', 'dnsrecord_find'])
+def test_json_codec_equivalence(json_codec, payload, monkeypatch):
+    """
+    Test that all JSON codecs encode and decode find responses like the
+    stdlib codec.
+    """
+    dump = rpc.json_encode_binary(payload, API_VERSION)
+    decoded = rpc.json_decode_binary(dump)
+
+    monkeypatch.setattr(rpc, 'json_codec', rpc.JSON_CODECS['json'])
+    stdlib_dump = rpc.json_encode_binary(payload, API_VERSION)
+    assert json.loads(dump) == json.loads(stdlib_dump)
+    assert_equal(decoded, rpc.json_decode_binary(stdlib_dump))
+    assert_equal(decoded, rpc.json_decode_binary(dump))
+
+
 class test_xmlclient(PluginTester):
     """
     Test the `ipalib.rpc.xmlclient` plugin.
@@ -255,6 +374,89 @@ class test_xmlclient(PluginTester):
         assert context.xmlclient.conn._calledall() is True
 
 
+class test_rpcclient_reuse(PluginTester):
+    """
+    Test transport reuse and server selection of `ipalib.rpc.RPCClient`.
+    """
+    _plugin = rpc.jsonclient
+
+    urls = [
+        'https://ipa1.example.test/ipa/json',
+        'https://ipa2.example.test/ipa/json',
+        'https://ipa3.example.test/ipa/json',
+    ]
+
+    def test_transport_reuse(self):
+        o, _api, _home = self.instance('Backend', in_server=False)
+        transport = o._get_transport(
+            rpc.KerbTransport, self.urls[0], None)
+        o._release_transport(transport)
+        assert o._get_transport(
+            rpc.KerbTransport, self.urls[0], None) is transport
+        assert o._get_transport(
+            rpc.KerbTransport, self.urls[0], None) is not transport
+        o._release_transport(transport)
+        assert o._get_transport(
+            rpc.KerbTransport, self.urls[1], None) is not transport
+
+    def test_order_urls(self, monkeypatch):
+        o, _api, _home = self.instance('Backend', in_server=False)
+        latencies = {self.urls[0]: 0.3, self.urls[1]: 0.2,
+                     self.urls[2]: 0.1}
+        slow = self.urls[1]
+        release = threading.Event()
+
+        def probe_server(self, url):
+            if url == slow:
+                # still probing when the order is decided
+                release.wait(5)
+            if latencies[url] is None:
+                raise socket.error('Connection refused')
+            return latencies[url]
+
+        monkeypatch.setattr(rpc.RPCClient, '_probe_server', probe_server)
+        try:
+            # the configured server stays first while it is reachable
+            assert o.order_urls(self.urls) == self.urls
+
+            # otherwise the first reachable server is used
+            latencies[self.urls[0]] = None
+            assert o.order_urls(self.urls) == [
+                self.urls[2], self.urls[1], self.urls[0]]
+        finally:
+            release.set()
+
+        object.__setattr__(o, '_preferred_netloc', 'ipa2.example.test')
+        assert o.order_urls(self.urls) == [
+            self.urls[1], self.urls[0], self.urls[2]]
+
+
+def test_session_data_cache(monkeypatch):
+    """
+    Test that session data read from the persistent storage is cached.
+    """
+    storage = {}
+    calls = []
+
+    def get_data(principal, key):
+        calls.append(principal)
+        return storage.get((principal, key))
+
+    def store_data(principal, key, data):
+        storage[principal, key] = data
+
+    monkeypatch.setattr(rpc.session_storage, 'get_data', get_data)
+    monkeypatch.setattr(rpc.session_storage, 'store_data', store_data)
+    monkeypatch.setattr(rpc, '_session_data_cache', {})
+
+    principal = 'admin@EXAMPLE.TEST'
+    assert rpc.read_persistent_client_session_data(principal) is None
+    rpc.update_persistent_client_session_data(principal, b'cookie')
+    assert rpc.read_persistent_client_session_data(principal) == b'cookie'
+    assert rpc.read_persistent_client_session_data(principal) == b'cookie'
+    assert calls == [principal, principal]
+
+
 @pytest.mark.skip_ipaclient_unittest
 @pytest.mark.needs_ipaapi
 class test_xml_introspection:
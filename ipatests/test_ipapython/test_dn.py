@@ -1,5 +1,7 @@
 
 import contextlib
+import gc
+
 import pytest
 
 from cryptography import x509
@@ -1444,3 +1446,34 @@ def test_dn2str_special():
     assert dn2str(dn) == dnstring2
     assert dn_ctypes.str2dn(dnstring) == dn
     assert dn_ctypes.dn2str(dn) == dnstring2
+
+
+class TestDNKeys:
+    dn_str = 'uid=admin,cn=users,cn=accounts,dc=example,dc=com'
+
+    def test_interned(self):
+        dn1 = DN(self.dn_str)
+        dn2 = DN(self.dn_str)
+        assert dn1 is not dn2
+        assert dn1.rdns is dn2.rdns
+        assert dn1 == dn2
+
+        del dn1, dn2
+        gc.collect()
+        dn3 = DN(self.dn_str)
+        assert dn3 == DN(('uid', 'admin'), self.dn_str[len('uid=admin,'):])
+
+    def test_cached_hash(self):
+        dn1 = DN(self.dn_str)
+        dn2 = DN(self.dn_str.upper())
+        assert hash(dn1) == hash(dn2)
+        assert hash(dn1) == hash(dn1)
+        assert hash(dn1[1:]) == hash(dn2[1:])
+        assert hash(dn1[1:]) != hash(dn1)
+        assert dn1[1:] == dn2[1:]
+        assert dn1[1:] < dn1
+
+    def test_slots(self):
+        for obj in (AVA('cn', 'bob'), RDN(('cn', 'bob')), DN(self.dn_str)):
+            with pytest.raises(AttributeError):
+                obj.foo = 'bar'
@@ -2,6 +2,7 @@
 # Copyright (C) 2018  FreeIPA Contributors.  See COPYING for license
 #
 import dns.name
+import dns.resolver
 import dns.rdataclass
 import dns.rdatatype
 from dns.rdtypes.IN.SRV import SRV
@@ -104,3 +105,81 @@ class TestSortURI:
         assert dnsutil.sort_prio_weight([h3, h2, h1]) == [h1, h2, h3]
         assert dnsutil.sort_prio_weight([h3, h3, h3]) == [h3]
         assert dnsutil.sort_prio_weight([h2, h2, h1, h1]) == [h1, h2]
+
+
+class FakeAnswer(list):
+    @property
+    def rrset(self):
+        return self
+
+
+class NegativeAnswer:
+    rrset = None
+
+
+class FakeResolver:
+    def __init__(self, records):
+        self.records = records
+        self.queries = []
+
+    def resolve(self, qname, rdtype):
+        self.queries.append((qname, rdtype))
+        result = self.records[rdtype]
+        if isinstance(result, Exception):
+            raise result
+        return FakeAnswer(result)
+
+
+class TestResolveRRsets:
+    def resolve(self, monkeypatch, records, rdtypes=('A', 'AAAA')):
+        resolver = FakeResolver(records)
+        # the default resolver does not cache
+        monkeypatch.setattr(dnsutil, 'ipa_resolver', resolver)
+        return dnsutil.resolve_rrsets('ipa.example.test', rdtypes), resolver
+
+    def test_order(self, monkeypatch):
+        rrsets, resolver = self.resolve(monkeypatch, {
+            'A': ['192.0.2.1'],
+            'AAAA': ['2001:db8::1'],
+        })
+        assert rrsets == [['192.0.2.1'], ['2001:db8::1']]
+        assert len(resolver.queries) == 2
+
+    def test_noanswer(self, monkeypatch):
+        rrsets, _resolver = self.resolve(monkeypatch, {
+            'A': dns.resolver.NoAnswer(),
+            'AAAA': ['2001:db8::1'],
+        })
+        assert rrsets == [['2001:db8::1']]
+
+    def test_nxdomain(self, monkeypatch):
+        rrsets, _resolver = self.resolve(monkeypatch, {
+            'A': dns.resolver.NXDOMAIN(),
+            'AAAA': dns.resolver.NXDOMAIN(),
+        })
+        assert rrsets == []
+
+    def test_error(self, monkeypatch):
+        with pytest.raises(dns.resolver.NoNameservers):
+            self.resolve(monkeypatch, {
+                'A': ['192.0.2.1'],
+                'AAAA': dns.resolver.NoNameservers(),
+            })
+
+
+class TestDNSCache:
+    def test_statistics(self):
+        cache = dnsutil.DNSCache()
+        key = (dns.name.from_text('ipa.example.test'), dns.rdatatype.A,
+               dns.rdataclass.IN)
+        assert cache.get(key) is None
+        assert cache.get_statistics() == dict(hits=0, misses=1, size=0)
+
+    def test_negative_answer(self):
+        cache = dnsutil.DNSCache()
+        key = (dns.name.from_text('ipa.example.test'), dns.rdatatype.A,
+               dns.rdataclass.IN)
+        # dnspython caches NXDOMAIN and NoAnswer as answers without rrset
+        cache.put(key, NegativeAnswer())
+        assert cache.get(key) is None
+        assert cache.get_statistics()['size'] == 0
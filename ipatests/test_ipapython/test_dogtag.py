@@ -0,0 +1,76 @@
+#
+# Copyright (C) 2020  FreeIPA Contributors see COPYING for license
+#
+
+"""
+Test the connection pool of the `dogtag.py` module.
+"""
+import http.client
+import http.server
+import socketserver
+import threading
+
+import pytest
+
+from ipapython.dogtag import ConnectionPool
+
+pytestmark = pytest.mark.tier0
+
+
+class _Handler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # close the connection without telling the client, like a server
+    # dropping an idle keep-alive connection
+    drop_connection = False
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+        if self.drop_connection:
+            self.close_connection = True
+
+    def log_message(self, *args):
+        pass
+
+
+class _DroppingHandler(_Handler):
+    drop_connection = True
+
+
+@pytest.fixture(params=[_Handler, _DroppingHandler])
+def server(request):
+    srv = socketserver.ThreadingTCPServer(('127.0.0.1', 0), request.param)
+    srv.daemon_threads = True
+    thread = threading.Thread(target=srv.serve_forever)
+    thread.start()
+    yield srv
+    srv.shutdown()
+    srv.server_close()
+    thread.join()
+
+
+def test_connection_pool(server):
+    host, port = server.server_address
+    pool = ConnectionPool()
+    try:
+        for _i in range(3):
+            res, body = pool.request(
+                'key', http.client.HTTPConnection, host, port, 'GET', '/',
+                None, {}, {})
+            assert res.status == 200
+            assert body == b'ok'
+    finally:
+        stats = pool.stats()
+        pool.clear()
+
+    assert stats['reused'] == 2
+    assert stats['idle'] == 1
+    if server.RequestHandlerClass.drop_connection:
+        # stale connections are replaced
+        assert stats['created'] == 3
+        assert stats['retried'] == 2
+    else:
+        assert stats['created'] == 1
+        assert stats['retried'] == 0
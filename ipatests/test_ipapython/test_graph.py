@@ -0,0 +1,98 @@
+#
+# Copyright (C) 2020  FreeIPA Contributors see COPYING for license
+#
+import random
+
+import pytest
+
+from ipapython.graph import Graph
+
+pytestmark = pytest.mark.tier0
+
+
+def make_graph(vertices, edges, both=False):
+    graph = Graph()
+    for v in vertices:
+        graph.add_vertex(v)
+    for tail, head in edges:
+        graph.add_edge(tail, head)
+        if both:
+            graph.add_edge(head, tail)
+    return graph
+
+
+def random_graph(rng, size, density):
+    vertices = list(range(size))
+    edges = [(a, b) for a in vertices for b in vertices
+             if a != b and rng.random() < density]
+    return make_graph(vertices, edges)
+
+
+class TestGraph:
+    def test_adjacency(self):
+        graph = make_graph('abc', [('a', 'b'), ('c', 'b'), ('b', 'a')])
+        assert graph.get_heads('a') == ['b']
+        assert graph.get_tails('b') == ['a', 'c']
+
+        graph.remove_edge('c', 'b')
+        assert graph.get_tails('b') == ['a']
+        with pytest.raises(ValueError):
+            graph.remove_edge('c', 'b')
+
+        graph.remove_vertex('b')
+        assert graph.get_heads('a') == []
+        assert graph.get_tails('a') == []
+        assert graph.edges == []
+
+    def test_copy(self):
+        graph = make_graph('abc', [('a', 'b'), ('b', 'c')])
+        copy = graph.copy()
+        copy.remove_vertex('b')
+        assert graph.vertices == {'a', 'b', 'c'}
+        assert graph.get_heads('a') == ['b']
+        assert copy.get_heads('a') == []
+
+    def test_distances(self):
+        graph = make_graph('abcde', [('a', 'b'), ('b', 'c'), ('c', 'd'),
+                                     ('a', 'c')], both=True)
+        assert graph.distances('a') == {'a': 0, 'b': 1, 'c': 1, 'd': 2}
+
+    def test_strongly_connected_components(self):
+        graph = make_graph('abcdef', [('a', 'b'), ('b', 'a'), ('b', 'c'),
+                                      ('c', 'd'), ('d', 'c'), ('e', 'e')])
+        components = graph.strongly_connected_components()
+        assert sorted(sorted(c) for c in components) == [
+            ['a', 'b'], ['c', 'd'], ['e'], ['f']]
+        # reverse topological order
+        assert components.index({'c', 'd'}) < components.index({'a', 'b'})
+
+    def test_reachable_sets(self):
+        rng = random.Random(0)
+        for _i in range(50):
+            graph = random_graph(rng, rng.randint(1, 30), rng.random() / 5)
+            reachable = graph.reachable_sets()
+            for v in graph.vertices:
+                assert reachable[v] == graph.bfs(v)
+
+    def test_articulation_points(self):
+        # a - b - c - d with a cycle c - e - d
+        graph = make_graph('abcde', [('a', 'b'), ('b', 'c'), ('c', 'd'),
+                                     ('c', 'e'), ('e', 'd')], both=True)
+        assert graph.articulation_points() == {'b', 'c'}
+
+        rng = random.Random(0)
+        for _i in range(50):
+            graph = random_graph(rng, rng.randint(1, 20), rng.random() / 4)
+
+            def components(g):
+                undirected = make_graph(
+                    g.vertices, g.edges + [(h, t) for t, h in g.edges])
+                return len(undirected.strongly_connected_components())
+
+            expected = set()
+            for v in graph.vertices:
+                reduced = graph.copy()
+                reduced.remove_vertex(v)
+                if components(reduced) > components(graph):
+                    expected.add(v)
+            assert graph.articulation_points() == expected
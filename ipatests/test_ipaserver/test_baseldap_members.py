@@ -0,0 +1,133 @@
+#
+# Copyright (C) 2026  FreeIPA Contributors see COPYING for license
+#
+"""
+Test the conversion of member DNs to primary keys in baseldap
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from ipalib.request import context, context_frame
+from ipapython.dn import DN
+from ipaserver.plugins import baseldap
+
+BASEDN = DN(('dc', 'example'), ('dc', 'test'))
+
+
+class FakeEntry(dict):
+    def __init__(self, **raw):
+        super(FakeEntry, self).__init__(
+            (attr, [v.decode('utf-8') for v in values])
+            for attr, values in raw.items())
+        self.raw = raw
+
+
+class FakeObject:
+    def __init__(self, name, container_dn):
+        self.name = name
+        self.container_dn = container_dn
+        self.lookups = []
+
+    def get_primary_key_from_dn(self, dn):
+        self.lookups.append(dn)
+        return dn[0].value
+
+
+class FakeLDAPObject:
+    _get_member_containers = baseldap.LDAPObject._get_member_containers
+    _get_member_object = baseldap.LDAPObject._get_member_object
+    _get_member_cache = baseldap.LDAPObject._get_member_cache
+    convert_attribute_members = (
+        baseldap.LDAPObject.convert_attribute_members)
+
+    name = 'group'
+
+    def __init__(self, objects, attribute_members):
+        self.api = SimpleNamespace(
+            Object={obj.name: obj for obj in objects},
+            env=SimpleNamespace(basedn=BASEDN))
+        self.attribute_members = attribute_members
+        self._member_containers = self._get_member_containers()
+
+
+def member(*rdns):
+    return str(DN(*(rdns + (BASEDN,)))).encode('utf-8')
+
+
+@pytest.mark.tier0
+class TestConvertAttributeMembers:
+    @pytest.fixture(autouse=True)
+    def members_setup(self):
+        self.account = FakeObject(
+            'account', DN(('cn', 'accounts')))
+        self.user = FakeObject(
+            'user', DN(('cn', 'users'), ('cn', 'accounts')))
+        self.group = FakeObject(
+            'group', DN(('cn', 'groups'), ('cn', 'accounts')))
+        objects = [self.account, self.user, self.group]
+        self.plugin = FakeLDAPObject(objects, {
+            'member': ['user', 'group', 'account'],
+            'memberof': ['account', 'user'],
+        })
+
+    def convert(self, **raw):
+        entry = FakeEntry(**raw)
+        self.plugin.convert_attribute_members(entry)
+        return entry
+
+    def test_nested_containers(self):
+        with context_frame():
+            entry = self.convert(
+                member=[
+                    member(('uid', 'alice'), ('cn', 'users'),
+                           ('cn', 'accounts')),
+                    member(('cn', 'admins'), ('cn', 'groups'),
+                           ('cn', 'accounts')),
+                    member(('cn', 'other'), ('cn', 'accounts')),
+                ],
+                memberof=[
+                    member(('uid', 'bob'), ('cn', 'users'),
+                           ('cn', 'accounts')),
+                ])
+        # like the sequential scan of attribute_members, the object listed
+        # first wins when the containers of several objects hold the DN
+        assert entry == {
+            'member_user': ['alice'],
+            'member_group': ['admins'],
+            'member_account': ['other'],
+            'memberof_account': ['bob'],
+        }
+
+    def test_outside_containers(self):
+        with context_frame():
+            entry = self.convert(member=[
+                member(('uid', 'alice'), ('cn', 'users'), ('cn', 'compat')),
+                member(('uid', 'bob'), ('cn', 'users'), ('cn', 'accounts')),
+            ])
+        assert entry == {'member_user': ['bob']}
+        assert self.user.lookups == [
+            DN(('uid', 'bob'), ('cn', 'users'), ('cn', 'accounts'), BASEDN)]
+
+    def test_cache(self):
+        alice = member(('uid', 'alice'), ('cn', 'users'), ('cn', 'accounts'))
+        with context_frame():
+            for _i in range(3):
+                entry = self.convert(member=[alice])
+                assert entry == {'member_user': ['alice']}
+            assert len(self.user.lookups) == 1
+            assert len(context.current_frame.member_cache) == 1
+
+        # the cache does not outlive the command
+        assert not hasattr(context, 'current_frame')
+        with context_frame():
+            assert self.convert(member=[alice]) == {'member_user': ['alice']}
+        assert len(self.user.lookups) == 2
+
+    def test_no_command(self):
+        alice = member(('uid', 'alice'), ('cn', 'users'), ('cn', 'accounts'))
+        self.convert(member=[alice])
+        self.convert(member=[alice])
+        assert len(self.user.lookups) == 2
+        assert not hasattr(context, 'current_frame')
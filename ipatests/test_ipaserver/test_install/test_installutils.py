@@ -4,6 +4,8 @@
 from __future__ import absolute_import
 
 import binascii
+import gzip
+import io
 import os
 import re
 import subprocess
@@ -142,6 +144,36 @@ def test_gpg_asymmetric(tempdir, gpgkey):
         assert f.read() == payload
 
 
+def test_parallel_gzip_writer():
+    payload = os.urandom(1024) * 3000
+    out = io.BytesIO()
+    writer = ipa_backup.ParallelGzipWriter(out, level=1, threads=3)
+    for i in range(0, len(payload), 100000):
+        writer.write(payload[i:i + 100000])
+    writer.close()
+    assert writer.bytes_in == len(payload)
+    assert writer.bytes_out == len(out.getvalue())
+    # one gzip member per block
+    assert gzip.decompress(out.getvalue()) == payload
+
+
+def test_parallel_gzip_writer_empty():
+    out = io.BytesIO()
+    writer = ipa_backup.ParallelGzipWriter(out)
+    writer.close()
+    assert gzip.decompress(out.getvalue()) == b''
+
+
+def test_compress_file(tmpdir):
+    payload = os.urandom(1024) * 3000
+    tarfile = tmpdir.join('files.tar')
+    tarfile.write_binary(payload)
+    ipa_backup.compress_file(str(tarfile), level=1, threads=2)
+    # compressed in place, keeping the name
+    assert tmpdir.listdir() == [tarfile]
+    assert gzip.decompress(tarfile.read_binary()) == payload
+
+
 @pytest.mark.parametrize(
     "platform, expected",
     [
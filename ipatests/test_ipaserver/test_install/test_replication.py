@@ -0,0 +1,136 @@
+#
+# Copyright (C) 2020  FreeIPA Contributors see COPYING for license
+#
+
+import pytest
+
+from ipalib import errors
+from ipapython.dn import DN
+from ipaserver.install import replication
+from ipaserver.install.replication import AgreementProgress
+
+
+def agreement_dn(host):
+    return DN(('cn', 'meTo%s' % host), ('cn', 'replica'),
+              ('cn', 'dc=example,dc=test'), ('cn', 'mapping tree'),
+              ('cn', 'config'))
+
+
+class FakeEntry:
+    def __init__(self, dn, **attrs):
+        self.dn = dn
+        self.single_value = attrs
+
+
+class FakeConnection:
+    """Serves agreement entries from a list of states per agreement"""
+
+    def __init__(self, states):
+        self.states = states
+        self.searches = 0
+
+    def _entry(self, dn):
+        states = self.states[dn]
+        attrs = states.pop(0) if len(states) > 1 else states[0]
+        return FakeEntry(dn, **attrs)
+
+    def get_entry(self, dn, attrs_list=None):
+        self.searches += 1
+        if dn not in self.states:
+            raise errors.NotFound(reason=str(dn))
+        return self._entry(dn)
+
+    def get_entries(self, base_dn, scope=None, filter=None, attrs_list=None):
+        self.searches += 1
+        return [self._entry(dn) for dn in self.states]
+
+
+UPDATE_RUNNING = dict(nsds5replicaUpdateInProgress='TRUE',
+                      nsds5ReplicaLastUpdateStatus='0 Replica acquired',
+                      nsds5ReplicaLastUpdateStart='20200101000010Z',
+                      nsds5ReplicaLastUpdateEnd='20200101000000Z')
+UPDATE_DONE = dict(nsds5replicaUpdateInProgress='FALSE',
+                   nsds5ReplicaLastUpdateStatus='Error (0) Replica acquired '
+                                                'successfully',
+                   nsds5ReplicaLastUpdateStart='20200101000010Z',
+                   nsds5ReplicaLastUpdateEnd='20200101000011Z')
+UPDATE_FAILED = dict(nsds5replicaUpdateInProgress='FALSE',
+                     nsds5ReplicaLastUpdateStatus='Error (49) Bind failed',
+                     nsds5ReplicaLastUpdateStart='20200101000010Z',
+                     nsds5ReplicaLastUpdateEnd='20200101000011Z')
+
+
+@pytest.fixture
+def monitor(monkeypatch):
+    monkeypatch.setattr(replication.ReplicationMonitor, 'min_interval', 0)
+    monkeypatch.setattr(replication.ReplicationMonitor, 'max_interval', 0)
+
+
+@pytest.mark.tier0
+class TestReplicationMonitor:
+    def test_progress_init(self):
+        progress = AgreementProgress(agreement_dn('a'), AgreementProgress.INIT)
+        dn = agreement_dn('a')
+        assert progress.update(FakeEntry(dn, nsds5BeginReplicaRefresh='start'))
+        assert progress.in_progress and not progress.finished
+        assert progress.update(FakeEntry(
+            dn, nsds5ReplicaLastInitStatus='Error (0) Total update '
+                                           'succeeded'))
+        assert progress.done and not progress.error
+        assert not progress.update(FakeEntry(
+            dn, nsds5ReplicaLastInitStatus='Error (0) Total update '
+                                           'succeeded'))
+
+    def test_progress_init_busy(self):
+        dn = agreement_dn('a')
+        progress = AgreementProgress(dn, AgreementProgress.INIT)
+        progress.update(FakeEntry(
+            dn, nsds5ReplicaLastInitStatus='Error (-2) replica busy'))
+        assert progress.finished
+        assert progress.error == 2
+
+    def test_progress_update(self):
+        dn = agreement_dn('a')
+        progress = AgreementProgress(dn, AgreementProgress.UPDATE)
+        progress.update(FakeEntry(dn, **UPDATE_RUNNING))
+        assert not progress.finished
+        progress.update(FakeEntry(dn, **UPDATE_FAILED))
+        assert progress.finished
+        assert progress.error == 1
+        assert progress.error_message == 'Bind failed'
+
+    def test_wait_many(self, monitor):
+        dns = [agreement_dn(host) for host in ('a', 'b', 'c')]
+        conn = FakeConnection({
+            dns[0]: [UPDATE_RUNNING, UPDATE_DONE],
+            dns[1]: [UPDATE_RUNNING, UPDATE_RUNNING, UPDATE_FAILED],
+            dns[2]: [UPDATE_DONE],
+        })
+        seen = []
+        mon = replication.ReplicationMonitor(conn)
+        for dn in dns:
+            mon.watch(dn)
+        result = mon.wait(timeout=10, callback=seen.append)
+        assert [p.dn for p in result] == dns
+        assert [p.done for p in result] == [True, True, True]
+        assert [p.error for p in result] == [0, 1, 0]
+        # all agreements are read with one search per round
+        assert conn.searches == 3
+        assert seen.count(result[2]) == 1
+
+    def test_wait_timeout(self, monitor):
+        dn = agreement_dn('a')
+        conn = FakeConnection({dn: [UPDATE_RUNNING]})
+        mon = replication.ReplicationMonitor(conn)
+        mon.watch(dn)
+        progress, = mon.wait(timeout=0)
+        assert progress.error == 1
+        assert progress.error_message == 'timeout'
+        assert not progress.done
+
+    def test_wait_missing(self, monitor):
+        mon = replication.ReplicationMonitor(FakeConnection({}))
+        mon.watch(agreement_dn('a'))
+        progress, = mon.wait(timeout=10)
+        assert progress.error == 1
+        assert not progress.done
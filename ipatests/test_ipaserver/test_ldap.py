@@ -29,14 +29,18 @@ from __future__ import absolute_import
 
 import os
 import sys
+import time
 
+import ldap
 import pytest
 import six
 
 from ipaplatform.paths import paths
-from ipaserver.plugins.ldap2 import ldap2, AUTOBIND_DISABLED
+from ipaserver.plugins.ldap2 import (ldap2, AUTOBIND_DISABLED,
+                                     LDAPConnectionPool)
 from ipalib import api, create_api, errors
 from ipapython.dn import DN
+from ipapython.ipaldap import LDAPClient, _ServerSchema
 
 if six.PY3:
     unicode = str
@@ -338,3 +342,156 @@ class test_LDAPEntry:
         assert entry.generate_modlist() == [
             (1, 'distinguishedName', [dn_389ds_encoded]),
             (0, 'distinguishedName', [dn_ipa_encoded])]
+
+
+@pytest.mark.tier0
+class test_LDAPEntry_result:
+    """
+    Test LDAPEntry objects created from search results
+    """
+    dn = 'uid=admin,cn=users,cn=accounts,dc=example,dc=com'
+
+    @pytest.fixture(autouse=True)
+    def result_setup(self):
+        self.conn = LDAPClient(None, no_schema=True)
+        self.member = [b'cn=g1', b'cn=g2']
+        self.entry, = self.conn._convert_result(
+            [(self.dn, {'uid': [b'admin'], 'memberOf': self.member})])
+
+    def test_no_copy(self):
+        e = self.entry
+        # the result values are shared until the entry is modified
+        assert e._raw['memberOf'] is self.member
+        assert e._orig_raw['memberOf'] is self.member
+        assert e.single_value['uid'] == u'admin'
+        assert e._raw['memberOf'] is self.member
+
+    def test_lazy_decode(self):
+        e = self.entry
+        assert e._nice['memberOf'] is None
+        assert e['memberof'] == [u'cn=g1', u'cn=g2']
+        assert e.generate_modlist() == []
+
+    def test_copy_on_write(self):
+        e = self.entry
+        e['memberOf'].append(u'cn=g3')
+        assert e.raw['memberOf'] == [b'cn=g1', b'cn=g2', b'cn=g3']
+        assert self.member == [b'cn=g1', b'cn=g2']
+        assert e.generate_modlist() == [
+            (ldap.MOD_ADD, 'memberOf', [b'cn=g3'])]
+
+    def test_raw_copy_on_write(self):
+        e = self.entry
+        raw = e.raw['memberOf']
+        assert raw is not self.member
+        assert e.raw['memberOf'] is raw
+        raw.remove(b'cn=g1')
+        assert self.member == [b'cn=g1', b'cn=g2']
+        assert e['memberOf'] == [u'cn=g2']
+        assert e.generate_modlist() == [
+            (ldap.MOD_DELETE, 'memberOf', [b'cn=g1'])]
+
+
+class FakePoolConnection:
+    def __init__(self):
+        self.alive = True
+        self.unbound = False
+        self.controls = None
+
+    def whoami_s(self):
+        if not self.alive:
+            raise ldap.SERVER_DOWN()
+        return 'dn:krbprincipalname=HTTP/ipa.example.test@EXAMPLE.TEST'
+
+    def set_option(self, option, value):
+        self.controls = value
+
+    def unbind_s(self):
+        self.unbound = True
+
+
+class FakePoolClient:
+    def __init__(self):
+        self.conn = FakePoolConnection()
+
+
+@pytest.mark.tier0
+class test_LDAPConnectionPool:
+    @pytest.fixture(autouse=True)
+    def pool_setup(self):
+        self.pool = LDAPConnectionPool(2, 300, FakePoolClient)
+
+    def test_reuse(self):
+        client = self.pool.acquire()
+        assert self.pool.release(client.conn)
+        assert client.conn.controls == []
+        assert self.pool.acquire() is client
+        assert self.pool.stats() == dict(
+            created=1, reused=1, evicted=0, failed_checks=0,
+            idle=0, in_use=1)
+
+    def test_release_foreign(self):
+        assert not self.pool.release(FakePoolConnection())
+
+    def test_maxsize(self):
+        clients = [self.pool.acquire() for _i in range(3)]
+        for client in clients:
+            self.pool.release(client.conn)
+        assert self.pool.stats()['idle'] == 2
+        assert clients[2].conn.unbound
+
+    def test_idle_eviction(self):
+        client = self.pool.acquire()
+        self.pool.release(client.conn)
+        self.pool._idle[0] = (client, time.time() - 301)
+        assert self.pool.acquire() is not client
+        assert client.conn.unbound
+        assert self.pool.stats()['evicted'] == 1
+
+    def test_health_check(self):
+        client = self.pool.acquire()
+        self.pool.release(client.conn)
+        self.pool._idle[0] = (client, time.time() - 60)
+        client.conn.alive = False
+        assert self.pool.acquire() is not client
+        assert self.pool.stats()['failed_checks'] == 1
+
+    def test_principal_dn_cache(self):
+        dn = DN(('uid', 'admin'), ('cn', 'users'))
+        assert self.pool.get_principal_dn('admin@EXAMPLE.TEST') is None
+        self.pool.set_principal_dn('admin@EXAMPLE.TEST', dn)
+        assert self.pool.get_principal_dn('admin@EXAMPLE.TEST') == dn
+        self.pool.clear()
+        assert self.pool.get_principal_dn('admin@EXAMPLE.TEST') is None
+
+
+@pytest.mark.tier0
+class test_ServerSchema:
+    @pytest.fixture(autouse=True)
+    def schema_setup(self):
+        subschema = ldap.schema.SubSchema({
+            'attributeTypes': [
+                b"( 2.5.4.3 NAME ( 'cn' 'commonName' ) "
+                b"SYNTAX 1.3.6.1.4.1.1466.115.121.1.15 )",
+                b"( 2.5.4.6 NAME ( 'c' 'countryName' ) "
+                b"SYNTAX 1.3.6.1.4.1.1466.115.121.1.11 SINGLE-VALUE )",
+            ],
+        })
+        self.schema = _ServerSchema('ldap://ipa.example.test', subschema)
+
+    def test_attribute_names(self):
+        names = self.schema.attribute_names
+        assert names['cn'] == ('cn', 'commonName')
+        assert names['commonname'] is names['cn']
+        assert names['2.5.4.3'] is names['cn']
+        assert 'commonName' not in names
+
+    def test_attribute_syntaxes(self):
+        syntaxes = self.schema.attribute_syntaxes
+        assert syntaxes['countryname'] == '1.3.6.1.4.1.1466.115.121.1.11'
+        assert syntaxes['cn'] == '1.3.6.1.4.1.1466.115.121.1.15'
+
+    def test_attribute_single_value(self):
+        single_value = self.schema.attribute_single_value
+        assert single_value['c']
+        assert not single_value['commonname']
@@ -0,0 +1,139 @@
+#
+# Copyright (C) 2026  FreeIPA Contributors see COPYING for license
+#
+"""
+Test the per-request ACI index of the permission plugin
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from ipalib import aci, errors
+from ipalib.request import context, destroy_context
+from ipapython.dn import DN
+from ipaserver.plugins import permission as permission_plugin
+
+BASEDN = DN(('dc', 'example'), ('dc', 'test'))
+
+
+def make_aci(name):
+    return (
+        '(targetattr = "cn")(version 3.0;acl "permission:{0}";'
+        'allow (read) groupdn = "ldap:///cn={0},cn=permissions,cn=pbac,'
+        'dc=example,dc=test";)'.format(name)
+    )
+
+
+class FakeEntry(dict):
+    def __init__(self, dn, **attrs):
+        super(FakeEntry, self).__init__(attrs)
+        self.dn = dn
+
+    @property
+    def single_value(self):
+        return {k: v[0] for k, v in self.items() if v}
+
+
+class FakeLDAP:
+    """ldap2 backed by a single entry, counting the reads"""
+
+    def __init__(self, dn, acis):
+        self.entry = FakeEntry(dn, aci=list(acis), entryusn=[1],
+                               modifytimestamp=['20260101000000Z'])
+        self.reads = []
+
+    def change(self, acis):
+        # a modification done by someone else
+        self.entry['aci'] = list(acis)
+        self.entry['entryusn'] = [self.entry['entryusn'][0] + 1]
+
+    def get_entry(self, dn, attrs_list):
+        assert dn == self.entry.dn
+        self.reads.append(sorted(attrs_list))
+        return FakeEntry(dn, **{a: list(self.entry[a]) for a in attrs_list})
+
+    def update_entry(self, entry):
+        self.change(entry['aci'])
+
+    def make_entry(self, dn):
+        return FakeEntry(dn)
+
+
+class FakePermission:
+    _get_aci_entry_and_string = (
+        permission_plugin.permission._get_aci_entry_and_string)
+    _get_aci_index = permission_plugin.permission._get_aci_index
+    _invalidate_aci_index = permission_plugin.permission._invalidate_aci_index
+    _replace_aci = permission_plugin.permission._replace_aci
+
+    def __init__(self, ldap):
+        self.api = SimpleNamespace(
+            Backend=SimpleNamespace(ldap2=ldap),
+            env=SimpleNamespace(basedn=BASEDN))
+
+
+@pytest.mark.tier0
+class TestACIIndex:
+    version_attrs = sorted(permission_plugin.ACI_VERSION_ATTRS)
+    all_attrs = sorted(['aci'] + permission_plugin.ACI_VERSION_ATTRS)
+
+    @pytest.fixture(autouse=True)
+    def index_setup(self, monkeypatch):
+        self.ldap = FakeLDAP(BASEDN, [make_aci('Read'), make_aci('Write')])
+        self.plugin = FakePermission(self.ldap)
+        self.parsed = []
+
+        def counting_aci(acistring):
+            self.parsed.append(acistring)
+            return aci.ACI(acistring)
+
+        monkeypatch.setattr(permission_plugin, 'ACI', counting_aci)
+        yield
+        destroy_context()
+
+    def lookup(self, name, **kw):
+        permission_entry = FakeEntry(None, cn=[name])
+        return self.plugin._get_aci_entry_and_string(
+            permission_entry, notfound_ok=True, **kw)[1]
+
+    def test_hit(self):
+        assert self.lookup('Read') == make_aci('Read')
+        assert self.lookup('Write') == make_aci('Write')
+        # the second lookup reads only the version of the entry
+        assert self.ldap.reads == [self.all_attrs, self.version_attrs]
+        assert len(self.parsed) == 2
+        assert BASEDN in context.permission_aci_index
+
+    def test_replace_aci(self):
+        assert self.lookup('Read') == make_aci('Read')
+        self.plugin._replace_aci(
+            FakeEntry(None, cn=['Read']), new_acistring=make_aci('Read2'))
+        assert BASEDN not in context.permission_aci_index
+        assert self.lookup('Read') is None
+        assert self.lookup('Read2') == make_aci('Read2')
+
+    def test_external_change(self):
+        assert self.lookup('Write') == make_aci('Write')
+        self.ldap.change([make_aci('Read'), make_aci('Delete')])
+        assert self.lookup('Write') is None
+        assert self.lookup('Delete') == make_aci('Delete')
+        assert self.ldap.reads == [
+            self.all_attrs,
+            self.version_attrs, self.all_attrs,  # USN changed, re-read
+            self.version_attrs,
+        ]
+
+    def test_cached_entry_without_version(self):
+        cached = FakeEntry(BASEDN, aci=[make_aci('Legacy')])
+        assert self.lookup('Legacy', cached_acientry=cached) == (
+            make_aci('Legacy'))
+        assert self.ldap.reads == []
+        # an entry of unknown version is not kept in the index
+        assert BASEDN not in context.permission_aci_index
+        assert self.lookup('Legacy') is None
+
+    def test_not_found(self):
+        permission_entry = FakeEntry(None, cn=['Missing'])
+        with pytest.raises(errors.NotFound):
+            self.plugin._get_aci_entry_and_string(permission_entry)
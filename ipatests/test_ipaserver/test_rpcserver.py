@@ -21,7 +21,10 @@
 Test the `ipaserver.rpc` module.
 """
 
+import gzip
 import json
+import zlib
+
 import pytest
 
 import six
@@ -136,6 +139,30 @@ def test_params_2_args_options():
     assert f([args, options]) == (args, options)
 
 
+def test_accepted_content_encoding():
+    """
+    Test the `ipaserver.rpcserver.accepted_content_encoding` function.
+    """
+    f = rpcserver.accepted_content_encoding
+    assert f({}) is None
+    assert f({'HTTP_ACCEPT_ENCODING': 'gzip'}) == 'gzip'
+    assert f({'HTTP_ACCEPT_ENCODING': 'deflate, gzip;q=1.0'}) == 'gzip'
+    assert f({'HTTP_ACCEPT_ENCODING': 'gzip;q=0, deflate'}) == 'deflate'
+    assert f({'HTTP_ACCEPT_ENCODING': 'br, *;q=0.5'}) == 'gzip'
+    assert f({'HTTP_ACCEPT_ENCODING': 'identity, *;q=0'}) is None
+
+
+def test_compress_response():
+    """
+    Test the `ipaserver.rpcserver.compress_response` function.
+    """
+    data = json.dumps({'result': list(range(10000))}).encode('utf-8')
+    compressed = b''.join(rpcserver.compress_response(data, 'gzip', 1000))
+    assert gzip.decompress(compressed) == data
+    compressed = b''.join(rpcserver.compress_response(data, 'deflate'))
+    assert zlib.decompress(compressed) == data
+
+
 class test_session:
     klass = rpcserver.wsgi_dispatch
 
@@ -264,4 +264,52 @@ class test_batch(Declarative):
             ),
         ),
 
+        dict(
+            desc='Run show commands in parallel',
+            command=('batch', [
+                dict(method=u'group_show', params=([group1], dict())),
+                dict(method=u'group_show', params=([u'notfound'], dict())),
+                dict(method=u'group_show', params=([group1], dict())),
+            ], dict(parallel=True)),
+            expected=dict(
+                count=3,
+                results=deepequal_list(
+                    dict(
+                        value=group1,
+                        summary=None,
+                        result=dict(
+                            cn=[group1],
+                            description=[u'Test desc 1'],
+                            gidnumber=[fuzzy_digits],
+                            dn=DN(('cn', 'testgroup1'),
+                                  ('cn', 'groups'),
+                                  ('cn', 'accounts'),
+                                  api.env.basedn),
+                            ),
+                        error=None),
+                    dict(
+                        error=u'notfound: group not found',
+                        error_name=u'NotFound',
+                        error_code=4001,
+                        error_kw=dict(
+                            reason=u'notfound: group not found',
+                        ),
+                    ),
+                    dict(
+                        value=group1,
+                        summary=None,
+                        result=dict(
+                            cn=[group1],
+                            description=[u'Test desc 1'],
+                            gidnumber=[fuzzy_digits],
+                            dn=DN(('cn', 'testgroup1'),
+                                  ('cn', 'groups'),
+                                  ('cn', 'accounts'),
+                                  api.env.basedn),
+                            ),
+                        error=None),
+                ),
+            ),
+        ),
+
     ]
@@ -348,6 +348,42 @@ class TestFindGroup(XMLRPC_test):
                 },
             ]), result)
 
+    @pytest.mark.parametrize('sizelimit', [None, 2])
+    def test_search_paged(self, group, group2, sizelimit):
+        """ Search for all groups one page at a time """
+        group.ensure_exists()
+        group2.ensure_exists()
+        names = []
+        continuation = None
+        while True:
+            options = dict(pkey_only=True, pagesize=4)
+            if sizelimit is not None:
+                # the page size replaces the size limit
+                options['sizelimit'] = sizelimit
+            if continuation is not None:
+                options['continuation'] = continuation
+            result = group.make_command('group_find', **options)()
+            names.extend(entry['cn'][0] for entry in result['result'])
+            messages = [m for m in result.get('messages', ())
+                        if m['name'] == 'SearchResultPaged']
+            if not messages:
+                assert result['truncated'] is False
+                break
+            assert result['count'] == 4
+            assert result['truncated'] is True
+            continuation = messages[0]['data']['continuation']
+
+        assert names == [u'admins', u'editors', u'ipausers', group.cn,
+                         group2.cn, u'trust admins']
+
+    def test_search_invalid_continuation(self, group):
+        """ Try to continue a search with a malformed token """
+        command = group.make_command(
+            'group_find', pagesize=2, continuation=u'invalid')
+        with raises_exact(errors.ValidationError(
+                name='continuation', error=u'invalid continuation token')):
+            command()
+
 
 @pytest.mark.tier1
 class TestNonexistentGroup(XMLRPC_test):
@@ -561,6 +597,30 @@ class TestGroupMember(XMLRPC_test):
         group2.ensure_exists()
         group.remove_member(dict(group=group2.cn))
 
+    def test_add_and_remove_several_members(self, group, group2):
+        """ Add and remove existing, duplicate and non-existent members """
+        group.ensure_exists()
+        group2.ensure_exists()
+        members = [group2.cn, notagroup, group2.cn]
+
+        command = group.make_add_member_command(dict(group=members))
+        result = command()
+        assert result['completed'] == 1
+        assert_deepequal([
+            (notagroup, u'no such entry'),
+            (group2.cn, u'This entry is already a member'),
+        ], result['failed']['member']['group'])
+        assert_deepequal([group2.cn], result['result']['member_group'])
+
+        command = group.make_remove_member_command(dict(group=members))
+        result = command()
+        assert result['completed'] == 1
+        assert_deepequal([
+            (notagroup, u'This entry is not a member'),
+            (group2.cn, u'This entry is not a member'),
+        ], result['failed']['member']['group'])
+        assert 'member_group' not in result['result']
+
     def test_add_and_remove_group_from_admins(self, group, admins):
         """ Add group to protected admins group and then remove it """
         # Test scenario from ticket #4448